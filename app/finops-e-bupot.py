@@ -4,8 +4,12 @@ Demo for e-bukti potong data extraction using Google Vertex AI and Gemini model.
 """
 
 import json
+import time
 import streamlit as st
 from google.genai import types
+from lib.document_handles import get_document_part
+from lib.e_bupot import HEADER, SECTION_A, SECTION_B, parse_e_bupot
+from lib.extraction_store import DOC_TYPE_E_BUPOT, file_hash, get_extraction_store
 from lib.vertex_ai import get_vertex_ai_client
 
 MODEL = "gemini-2.0-flash-001"
@@ -86,7 +90,7 @@ def generate_multimodal(file_content):
             role="user",
             parts=[
                 text1,
-                types.Part.from_bytes(data=file_content, mime_type="application/pdf")
+                get_document_part(file_content, "application/pdf")
             ]
         )
     ]
@@ -118,10 +122,34 @@ def generate_multimodal(file_content):
     )
     return response.text
 
+def save_extraction(p_file_hash, record, raw_output=None):
+    """Writes an extracted e-Bupot to the extraction store and warns about duplicates."""
+    document_number = (record.get(HEADER) or {}).get("NOMOR")
+    duplicates = store.find_by_document_number(DOC_TYPE_E_BUPOT, document_number)
+    if duplicates:
+        st.warning(
+            f"e-Bupot {document_number} was already processed on "
+            f"{duplicates[0]['created_at'][:10]} from another file."
+        )
+    section_b = record.get(SECTION_B) or {}
+    store.save(
+        DOC_TYPE_E_BUPOT,
+        p_file_hash,
+        record,
+        raw_output=raw_output,
+        party=(record.get(SECTION_A) or {}).get("NPWP"),
+        document_number=document_number,
+        document_date=section_b.get("Tanggal Dokumen"),
+    )
+
 st.set_page_config(page_title="E-Bukti Potong", page_icon="💲")
 st.title("E-Bukti Potong 💲")
 st.markdown("Extracting data from electronic bukti potong document.")
 
+store = get_extraction_store()
+if "ebupot_stats" not in st.session_state:
+    st.session_state.ebupot_stats = {"documents": 0, "fast_path": 0, "stored": 0}
+
 uploaded_file = st.file_uploader("Upload e-Bukti Potong", type="pdf")
 
 if uploaded_file is not None:
@@ -129,12 +157,48 @@ if uploaded_file is not None:
     file = uploaded_file.read()
 
     if st.button("Extract Data"):
-        with st.spinner("Extracting data..."):
-            extracted_data = generate_multimodal(file)
-            # Parse the output string to JSON
-            try:
-                extracted_json = json.loads(extracted_data)
-                st.json(extracted_json)
-            except json.JSONDecodeError:
-                st.error("Error: Could not parse extracted data as JSON.")
-                st.write(extracted_data)  # Display the raw output for debugging
+        stats = st.session_state.ebupot_stats
+        stats["documents"] += 1
+        s_time = time.time()
+        uploaded_hash = file_hash(file)
+        stored = store.find_by_hash(DOC_TYPE_E_BUPOT, uploaded_hash)
+
+        if stored:
+            stats["stored"] += 1
+            st.json(stored[0]["record"])
+            st.success(
+                f"Loaded from the extraction store (processed on "
+                f"{stored[0]['created_at'][:10]})."
+            )
+        else:
+            # Fast path: machine-generated e-Bupot PDFs can be parsed from their text layer.
+            local_data, problems = parse_e_bupot(file)
+            if not problems:
+                stats["fast_path"] += 1
+                st.json(local_data)
+                st.success(
+                    f"Parsed locally from the PDF text layer in "
+                    f"{round((time.time() - s_time) * 1000, 1)}ms."
+                )
+                save_extraction(uploaded_hash, local_data)
+            else:
+                with st.spinner("Extracting data..."):
+                    extracted_data = generate_multimodal(file)
+                with st.expander("Why Gemini was used"):
+                    st.write(problems)
+                # Parse the output string to JSON
+                try:
+                    extracted_json = json.loads(extracted_data)
+                    st.json(extracted_json)
+                    st.success(f"Gemini replied in {round(time.time() - s_time, 3)}s.")
+                    save_extraction(uploaded_hash, extracted_json, raw_output=extracted_data)
+                except json.JSONDecodeError:
+                    st.error("Error: Could not parse extracted data as JSON.")
+                    st.write(extracted_data)  # Display the raw output for debugging
+
+        parsed = stats["documents"] - stats["stored"]
+        st.caption(
+            f"Fast-path hit rate: {stats['fast_path']}/{parsed} parsed documents "
+            f"({round(stats['fast_path'] / parsed * 100) if parsed else 0}%), "
+            f"{stats['stored']} loaded from the extraction store."
+        )
@@ -8,6 +8,9 @@ This application uses a context-aware, two-stage process for maximum accuracy:
 2.  **Stage 2 (Classification):** A separate, targeted API call is made for each
     line item, providing it with the global context to make a highly accurate
     classification.
+
+The entity amounts of the line items are then checked against ECB reference rates in one
+batched lookup (see `lib/claim_fx.py`).
 """
 
 import json
@@ -19,12 +22,16 @@ from google.genai import types
 from tqdm import tqdm
 
 from lib.categorize_expense import CATEGORIES_MAP
+from lib.claim_fx import CHECK_NO_RATE, FX_TOLERANCE, flagged_items, validate_items
+from lib.document_handles import get_document_part
+from lib.extraction_store import DOC_TYPE_CLAIM, file_hash, get_extraction_store
 from lib.prompts import PROMPT_STAGE_1_EXTRACTION, get_stage_2_classification_prompt
 from lib.vertex_ai import get_vertex_ai_client
 
 # --- Configuration ---
 MODEL = "gemini-2.5-flash"
 CLIENT = get_vertex_ai_client()
+STORE = get_extraction_store()
 MAX_WORKERS = 10
 
 FINAL_CONTEXT_FIELDS_TO_KEEP = [
@@ -57,6 +64,10 @@ COLUMN_ORDER = [
     "original_amount",
     "entity_currency",
     "entity_amount",
+    "fx_reference_rate",
+    "fx_implied_rate",
+    "fx_deviation",
+    "fx_check",
 ]
 
 
@@ -95,7 +106,7 @@ def call_gemini_api_for_extraction(p_file_bytes: bytes, p_mime_type: str):
             role="user",
             parts=[
                 types.Part.from_text(text=PROMPT_STAGE_1_EXTRACTION),
-                types.Part.from_bytes(data=p_file_bytes, mime_type=p_mime_type),
+                get_document_part(p_file_bytes, p_mime_type),
             ],
         )
     ]
@@ -185,16 +196,35 @@ if uploaded_file is not None and (
     st.session_state.processing_complete = False
     st.session_state.processed_data = None
     st.session_state.raw_stage1_output = None
+    st.session_state.loaded_from_store = None
     st.session_state.uploaded_file_id = uploaded_file.file_id
 
 # --- Processing Logic ---
 if uploaded_file is not None:
     if st.button("Process Document", type="primary"):
+        # Read file bytes once
+        file_bytes = uploaded_file.getvalue()
+        uploaded_hash = file_hash(file_bytes)
+
+        # --- STORED RESULT: skip both stages for files processed before ---
+        stored = STORE.find_by_hash(DOC_TYPE_CLAIM, uploaded_hash)
+        if stored:
+            st.session_state.raw_stage1_output = stored[0]["record"]["raw_stage1_output"]
+            st.session_state.processed_data = stored[0]["record"]["processed_data"]
+            # Reports stored before the check, or while rates were unreachable, are checked now.
+            if any(
+                item.get("fx_check", CHECK_NO_RATE) == CHECK_NO_RATE
+                for item in st.session_state.processed_data
+            ):
+                validate_items(st.session_state.processed_data)
+            st.session_state.processing_complete = True
+            st.session_state.loaded_from_store = stored[0]["created_at"][:10]
+            st.rerun()
+        st.session_state.loaded_from_store = None
+
         # --- STAGE 1: EXTRACTION ---
         with st.spinner("Stage 1: Extracting raw data and global context..."):
             try:
-                # Read file bytes once
-                file_bytes = uploaded_file.getvalue()
                 mime_type = uploaded_file.type
 
                 raw_data_str = call_gemini_api_for_extraction(file_bytes, mime_type)
@@ -253,7 +283,23 @@ if uploaded_file is not None:
                                 f"Error classifying item '{item.get('description')}': {e}"
                             )
 
-            # --- STORE FINAL RESULT IN SESSION STATE ---
+            # --- CURRENCY CHECK: ONE BATCHED RATE LOOKUP FOR ALL ITEMS ---
+            with st.spinner("Checking currency conversions..."):
+                validate_items(final_processed_report)
+
+            # --- STORE FINAL RESULT IN SESSION STATE AND EXTRACTION STORE ---
+            STORE.save(
+                DOC_TYPE_CLAIM,
+                uploaded_hash,
+                {
+                    "raw_stage1_output": raw_data_json,
+                    "processed_data": final_processed_report,
+                },
+                raw_output=raw_data_str,
+                party=global_context.get("employee_id"),
+                document_number=global_context.get("report_title"),
+                document_date=global_context.get("travel_event_start_date"),
+            )
             st.session_state.processed_data = final_processed_report
             st.session_state.processing_complete = True
             st.rerun()  # Force a rerun to jump to the display logic immediately
@@ -273,7 +319,21 @@ if st.session_state.processing_complete:
 
     # Check if there is data to display
     if st.session_state.processed_data:
-        st.success("Document processed successfully!")
+        if st.session_state.get("loaded_from_store"):
+            st.success(
+                "Loaded from the extraction store (processed on "
+                f"{st.session_state.loaded_from_store})."
+            )
+        else:
+            st.success("Document processed successfully!")
+
+        mismatches = flagged_items(st.session_state.processed_data)
+        if mismatches:
+            st.warning(
+                f"{len(mismatches)} item(s) have an entity amount more than "
+                f"{FX_TOLERANCE:.0%} off the ECB reference rate of the transaction date: "
+                + ", ".join(str(item.get("description")) for item in mismatches)
+            )
 
         output_format = st.radio(
             "Select Output Format:",
@@ -0,0 +1,78 @@
+# pylint: disable=invalid-name
+"""
+Search and export documents processed by the finance demos.
+"""
+
+import datetime
+import json
+
+import pandas as pd
+import streamlit as st
+
+from lib.extraction_store import (
+    DOC_TYPE_CLAIM,
+    DOC_TYPE_E_BUPOT,
+    DOC_TYPE_INVOICE,
+    get_extraction_store,
+)
+
+DOC_TYPES = {
+    "Invoice": DOC_TYPE_INVOICE,
+    "E-Bukti Potong": DOC_TYPE_E_BUPOT,
+    "Employee Claim": DOC_TYPE_CLAIM,
+}
+
+st.set_page_config(page_title="Extraction History", page_icon="🗂️", layout="wide")
+st.title("Extraction History 🗂️")
+st.markdown("Search documents that were already extracted by the finance demos.")
+
+col1, col2, col3 = st.columns(3)
+doc_type = col1.selectbox("Document Type", DOC_TYPES)
+party = col2.text_input("Supplier / NPWP / Employee ID")
+document_number = col3.text_input("Document Number")
+date_range = st.date_input(
+    "Document Date",
+    (datetime.date.today() - datetime.timedelta(days=90), datetime.date.today()),
+    format="YYYY-MM-DD",
+)
+date_from, date_to = (date_range + (None, None))[:2]
+include_undated = st.checkbox("Include documents without a readable date", value=True)
+
+rows = get_extraction_store().query(
+    doc_type=DOC_TYPES[doc_type],
+    party=party,
+    document_number=document_number,
+    date_from=date_from,
+    date_to=date_to,
+    include_undated=include_undated,
+)
+st.caption(f"{len(rows)} documents found.")
+
+if rows:
+    df = pd.DataFrame(
+        [
+            {
+                "document_date": row["document_date"],
+                "party": row["party"],
+                "document_number": row["document_number"],
+                "processed_at": row["created_at"],
+                "file_hash": row["file_hash"],
+            }
+            for row in rows
+        ]
+    )
+    st.dataframe(df, use_container_width=True, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    col1.download_button(
+        "Export CSV",
+        pd.json_normalize([row["record"] for row in rows]).to_csv(index=False),
+        file_name=f"{DOC_TYPES[doc_type]}-history.csv",
+        mime="text/csv",
+    )
+    col2.download_button(
+        "Export JSON",
+        json.dumps(rows, ensure_ascii=False, indent=2),
+        file_name=f"{DOC_TYPES[doc_type]}-history.json",
+        mime="application/json",
+    )
@@ -3,126 +3,101 @@
 Demo for multilingual invoice data extraction using Google Vertex AI and Gemini model.
 """
 
-import json
+import time
 import streamlit as st
-from google.genai import types
-from lib.vertex_ai import get_vertex_ai_client
+from lib.extraction_store import DOC_TYPE_INVOICE, file_hash, get_extraction_store
+from lib.invoice_extraction import (
+    DETECTION_FALLBACK,
+    completeness,
+    detect_ranges,
+    extract_invoice,
+    extract_invoices,
+)
 
-MODEL = "gemini-2.0-flash-001"
+MODE_SINGLE = "single"
+MODE_MULTIPLE = "multiple"
 
-def generate_multimodal(file):
-    """Generates extracted data using the Gemini multimodal model."""
-    client = get_vertex_ai_client()
-
-    text1 = types.Part.from_text(text="""
-    Extract the following information from the provided invoice image(s).
-    If a field is not present or cannot be reliably determined, leave it blank.
-    Ensure numerical values are extracted with appropriate decimal precision and presented as number.
-    Follow the output format as indicated in the sample.
-
-    Extracted Information:
-    * Supplier Name: (String) The trading name prominently displayed on the invoice.
-    * Supplier Legal Name: (String) The full, legally registered name of the supplier, including the branch.
-    * Invoice Date: (String) Day, Month, and Year the invoice was issued. Format as DD-MMM-YYYY, e.g., 11-Oct-2023
-    * Invoice No.: (String) The unique identifier for the invoice).
-    * Invoice Currency: (String) The currency the invoice is denominated in, usually follows the language -- VND, THB, IDR, etc.
-    * Invoice Amount (excluding VAT): (Number) The total value of goods/services before VAT/tax.
-    * Invoice Service Charge: (Number) If any, find the service charge amount in the invoice.
-    * Invoice VAT Amount: (Number) The total amount of VAT/tax charged.
-    * Invoice Amount (including VAT): (Number) The final total amount due, including VAT/tax.
-
-    Pay attention to the thousand separators when normalizing string to number.
-
-    Return the result in JSON format.
-    ```
-    {
-        "Supplier Name": "...",
-        "Supplier Legal Name": "...",
-        "Invoice Date": {
-            "extracted_value": "...",
-            "normalized_value": "DD-MMM-YYYY"    
-        },
-        "Invoice No.": "...",
-        "Invoice Currency": "IDR/THB/VND/...",
-        "Invoice Amount (excluding VAT)": {
-            "extracted_value": "...",
-            "normalized_value": "..."  // number
-        },
-        "Invoice Service Charge": {
-            "extracted_value": "...",
-            "normalized_value": "..."  // number
-        },
-        "Invoice VAT Amount": {
-            "extracted_value": "...",
-            "normalized_value": "..."  // number
-        },
-        "Invoice Amount (including VAT)": {
-            "extracted_value": "...",
-            "normalized_value": "..."  // number
-        }
-    }
-    ```
-    
-    Notes on Thai Invoices:
-    * Thai invoices dates might be in Buddhist Era (BE) format, which is 543 years ahead of the Gregorian calendar.
-    * Be mindful of the date format and convert it to DD-MMM-YYYY.
-    """
-    )
-
-    file_content = file.read()
-    mime_type = file.type
-
-    contents = [
-        types.Content(
-            role="user",
-            parts=[
-                text1,
-                types.Part.from_bytes(data=file_content, mime_type=mime_type)
-            ]
+def save_extraction(p_file_hash, record, raw_output, extraction_mode, expected_count):
+    """Writes an extracted invoice to the extraction store and warns about duplicates."""
+    if "error" in record:
+        return
+    invoice_no = record.get("Invoice No.")
+    duplicates = store.find_by_document_number(DOC_TYPE_INVOICE, invoice_no)
+    if duplicates:
+        st.warning(
+            f"Invoice {invoice_no} was already processed on "
+            f"{duplicates[0]['created_at'][:10]}."
         )
-    ]
-    generate_content_config = types.GenerateContentConfig(
-        temperature=0.2,
-        top_p=0.8,
-        max_output_tokens=1024,
-        response_modalities=["TEXT"],
-        safety_settings=[types.SafetySetting(
-            category="HARM_CATEGORY_HATE_SPEECH",
-            threshold="OFF"
-        ), types.SafetySetting(
-            category="HARM_CATEGORY_DANGEROUS_CONTENT",
-            threshold="OFF"
-        ), types.SafetySetting(
-            category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
-            threshold="OFF"
-        ), types.SafetySetting(
-            category="HARM_CATEGORY_HARASSMENT",
-            threshold="OFF"
-        )],
-        response_mime_type = "application/json",
+    store.save(
+        DOC_TYPE_INVOICE,
+        p_file_hash,
+        record,
+        raw_output=raw_output,
+        party=record.get("Supplier Name"),
+        document_number=invoice_no,
+        document_date=(record.get("Invoice Date") or {}).get("normalized_value"),
+        extraction_mode=extraction_mode,
+        expected_count=expected_count,
     )
 
-    response = client.models.generate_content(
-        model=MODEL,
-        contents=contents,
-        config=generate_content_config,
-    )
-    return response.text
-
 st.set_page_config(page_title="Invoice Data Extraction", page_icon="💲")
 st.title("Invoice Data Extraction 💲")
 st.markdown("Extracting data from invoice document.")
 
+store = get_extraction_store()
 uploaded_file = st.file_uploader("Upload Invoice", type=["pdf", "png", "jpg", "jpeg"])
 
 if uploaded_file is not None:
+    multi_invoice = uploaded_file.type == "application/pdf" and st.checkbox(
+        "This PDF contains multiple invoices"
+    )
     if st.button("Extract Data"):
         with st.spinner("Extracting data..."):
-            extracted_data = generate_multimodal(uploaded_file)
-            # Parse the output string to JSON
-            try:
-                extracted_json = json.loads(extracted_data)
-                st.json(extracted_json)
-            except json.JSONDecodeError:
-                st.error("Error: Could not parse extracted data as JSON.")
-                st.write(extracted_data)  # Display the raw output for debugging
+            s_time = time.time()
+            uploaded_content = uploaded_file.read()
+            uploaded_hash = file_hash(uploaded_content)
+            mode = MODE_MULTIPLE if multi_invoice else MODE_SINGLE
+            # Only a complete run in the same mode is reused; a run where some invoices
+            # failed is extracted again and replaced.
+            stored = store.find_complete_run(DOC_TYPE_INVOICE, uploaded_hash, mode)
+            if stored:
+                stored_records = [row["record"] for row in stored]
+                st.json(stored_records if multi_invoice else stored_records[0])
+                st.success(
+                    f"Loaded from the extraction store (processed on "
+                    f"{stored[0]['created_at'][:10]})."
+                )
+            elif multi_invoice:
+                ranges, detection = detect_ranges(uploaded_content)
+                if detection == DETECTION_FALLBACK:
+                    st.error(
+                        "Could not detect the invoice pages, so every page is extracted as "
+                        "a separate invoice."
+                    )
+                invoices, raw_outputs = extract_invoices(uploaded_content, ranges)
+                elapsed = time.time() - s_time
+                st.json(invoices)
+                st.caption(
+                    f"Extracted {len(invoices)} invoices in {round(elapsed, 3)}s "
+                    f"({round(len(invoices) / elapsed, 2)} invoices/s), "
+                    f"{round(completeness(invoices) * 100)}% of required fields filled."
+                )
+                store.delete_run(DOC_TYPE_INVOICE, uploaded_hash, mode)
+                for invoice, invoice_raw in zip(invoices, raw_outputs):
+                    save_extraction(uploaded_hash, invoice, invoice_raw, mode, len(invoices))
+            else:
+                invoice, invoice_response = extract_invoice(uploaded_content, uploaded_file.type)
+                elapsed = time.time() - s_time
+                if "error" in invoice:
+                    st.error(f"Error: {invoice['error']}")
+                    st.write(invoice["raw"])  # Display the raw output for debugging
+                else:
+                    st.json(invoice)
+                    store.delete_run(DOC_TYPE_INVOICE, uploaded_hash, mode)
+                    save_extraction(uploaded_hash, invoice, invoice_response.text, mode, 1)
+                usage = invoice_response.usage_metadata
+                st.caption(
+                    f"Gemini replied in {round(elapsed, 3)}s with "
+                    f"{usage.candidates_token_count} output tokens "
+                    f"({usage.prompt_token_count} input tokens)."
+                )
@@ -4,13 +4,16 @@ Demo for Reasoning Engine use case using Google Vertex AI and Frankfurter API.
 """
 
 import datetime
+import time
 
-import requests
+import pandas as pd
 import streamlit as st
 from currency_codes import get_currency_by_code
 from decouple import config
 from langchain_google_vertexai import HarmBlockThreshold, HarmCategory
 from vertexai import agent_engines
+from lib.exchange_rate import cross_rate_matrix, get_exchange_rate
+from lib.fx_store import load_fx_store
 # from vertexai.preview.reasoning_engines import LangchainAgent
 
 AGENT_ENGINE_ID = config("AGENT_ENGINE_ID", default="YOUR_AGENT_ENGINE_ID")
@@ -25,6 +28,11 @@ currencies = [
     "ILS", "INR", "KRW", "MXN", "MYR",
     "NZD", "PHP", "SGD", "THB", "ZAR"
 ]
+min_date = datetime.date(1999, 1, 4)
+fx_store = load_fx_store()
+if fx_store is not None:
+    currencies = [c for c in fx_store.active_currencies() if c != "EUR"]
+    min_date = fx_store.start
 
 def currency_label(c: str):
     """Return the currency code followed by currency name."""
@@ -46,37 +54,6 @@ model_kwargs = {
     "safety_settings": safety_settings,
 }
 
-def get_exchange_rate(
-    currency_from: str = "USD",
-    currency_to: str = "EUR",
-    currency_date: str = "latest",
-):
-    """Retrieves the exchange rate between two currencies on a specified date.
-
-    Uses the Frankfurter API (https://api.frankfurter.app/) to obtain
-    exchange rate data.
-
-    Args:
-        currency_from: The base currency (3-letter currency code).
-            Defaults to "USD" (US Dollar).
-        currency_to: The target currency (3-letter currency code).
-            Defaults to "EUR" (Euro).
-        currency_date: The date for which to retrieve the exchange rate.
-            Defaults to "latest" for the most recent exchange rate data.
-            Can be specified in YYYY-MM-DD format for historical rates.
-
-    Returns:
-        dict: A dictionary containing the exchange rate information.
-            Example: {"amount": 1.0, "base": "USD", "date": "2023-11-24",
-                "rates": {"EUR": 0.95534}}
-    """
-    response = requests.get(
-        f"https://api.frankfurter.app/{currency_date}",
-        params={"from": currency_from, "to": currency_to},
-        timeout=10
-    )
-    return response.json()
-
 # Development
 # agent = LangchainAgent(
 #     model=model,
@@ -96,28 +73,147 @@ st.markdown(
 )
 st.divider()
 
-col1, col2 = st.columns(2)
-currency_f = col1.selectbox(
-    "From",
-    currencies,
-    format_func=currency_label
-)
-currency_t = col2.selectbox(
-    "To",
-    filter(lambda x: x != currency_f, currencies),
-    format_func=currency_label
-)
-d = st.date_input(
-    "Date", 
-    datetime.date.today(),
-    format="YYYY-MM-DD",
-    max_value=datetime.date.today(),
-    min_value=datetime.date(1999, 1, 4)
+if "fx_latency" not in st.session_state:
+    st.session_state["fx_latency"] = {"direct": [], "agent": []}
+
+
+def format_rate(result: dict, requested_date: datetime.date) -> str:
+    """Renders a rate lookup as a sentence."""
+    (currency_to, rate), = result["rates"].items()
+    text = (
+        f"1 {result['base']} = **{rate:,.6g} {currency_to}** as of {result['date']}, "
+        "based on the ECB reference rate."
+    )
+    if result["date"] != requested_date.isoformat():
+        text += f" No rate was published on {requested_date}, so the previous one is shown."
+    return text
+
+
+def show_rate_matrix():
+    """Shows every cross rate on a date, computed from one fetch of the EUR rates."""
+    matrix_date = st.date_input(
+        "Date",
+        datetime.date.today(),
+        format="YYYY-MM-DD",
+        max_value=datetime.date.today(),
+        min_value=min_date,
+        key="matrix_date",
+    )
+    shown = st.multiselect(
+        "Currencies",
+        ["EUR", *currencies],
+        default=["EUR", *currencies],
+        format_func=currency_label,
+    )
+    start = time.time()
+    eur_rates = get_exchange_rate("EUR", ",".join(currencies), matrix_date.isoformat())
+    if "rates" not in eur_rates:
+        st.error(eur_rates.get("message", "The exchange rates are not available."))
+        return
+    matrix = cross_rate_matrix(eur_rates)
+    shown = [c for c in shown if c in matrix.index]
+    st.caption(
+        f"1 unit of the row currency in the column currency, ECB reference rates of "
+        f"{eur_rates['date']}, computed in {time.time() - start:.3f}s."
+    )
+    st.dataframe(matrix.loc[shown, shown].style.format("{:,.6g}"))
+
+
+def show_time_series():
+    """Charts the rate of one pair over a date range, fetched in one call."""
+    column_f, column_t = st.columns(2)
+    series_f = column_f.selectbox("From", currencies, format_func=currency_label, key="series_f")
+    series_t = column_t.selectbox(
+        "To",
+        filter(lambda x: x != series_f, currencies),
+        format_func=currency_label,
+        key="series_t",
+    )
+    period = st.date_input(
+        "Period",
+        (datetime.date.today() - datetime.timedelta(days=90), datetime.date.today()),
+        format="YYYY-MM-DD",
+        max_value=datetime.date.today(),
+        min_value=min_date,
+        key="series_period",
+    )
+    if len(period) != 2:
+        return
+    series = get_exchange_rate(
+        series_f, series_t, period[0].isoformat(), period[1].isoformat()
+    )
+    if "rates" not in series:
+        st.error(series.get("message", "The exchange rates are not available."))
+        return
+    st.line_chart(pd.DataFrame(series["rates"], index=pd.to_datetime(series["dates"])))
+
+
+def show_latency():
+    """Shows the last and mean latency of both paths."""
+    latency = st.session_state.fx_latency
+    columns = st.columns(2)
+    for column, (path, label) in zip(columns, [("direct", "Direct"), ("agent", "Agent")]):
+        if latency[path]:
+            mean = sum(latency[path]) / len(latency[path])
+            column.metric(
+                f"{label} latency",
+                f"{latency[path][-1]:.3f}s",
+                f"mean {mean:.3f}s over {len(latency[path])}",
+                delta_color="off",
+            )
+
+
+mode = st.radio(
+    "Mode",
+    ["Direct lookup", "Rate matrix", "Ask the agent"],
+    horizontal=True,
+    help="Direct lookups call the rate function without Gemini. "
+    "The rate matrix shows every pair on a date. "
+    "The agent answers free-form questions.",
 )
 
-if st.button("Convert", type="primary"):
-    # pylint: disable=no-member
-    q_response = agent.query(
-        input=f"What is the exchange rate from {currency_f} to {currency_t} currency as of {d}?"
+if mode == "Direct lookup":
+    col1, col2 = st.columns(2)
+    currency_f = col1.selectbox(
+        "From",
+        currencies,
+        format_func=currency_label
+    )
+    currency_t = col2.selectbox(
+        "To",
+        filter(lambda x: x != currency_f, currencies),
+        format_func=currency_label
+    )
+    d = st.date_input(
+        "Date",
+        datetime.date.today(),
+        format="YYYY-MM-DD",
+        max_value=datetime.date.today(),
+        min_value=min_date
+    )
+
+    if st.button("Convert", type="primary"):
+        s_time = time.time()
+        fx_result = get_exchange_rate(currency_f, currency_t, d.isoformat())
+        st.session_state.fx_latency["direct"].append(time.time() - s_time)
+        if "rates" in fx_result:
+            st.write(format_rate(fx_result, d))
+        else:
+            st.error(fx_result.get("message", "The exchange rate is not available."))
+elif mode == "Rate matrix":
+    show_rate_matrix()
+    if st.checkbox("Show a time series for one pair"):
+        show_time_series()
+else:
+    question = st.text_input(
+        "Question",
+        placeholder="How much was 100 USD in IDR on the first day of 2020?",
     )
-    st.write(q_response["output"])
+    if st.button("Ask", type="primary") and question:
+        s_time = time.time()
+        # pylint: disable=no-member
+        q_response = agent.query(input=question)
+        st.session_state.fx_latency["agent"].append(time.time() - s_time)
+        st.write(q_response["output"])
+
+show_latency()
@@ -4,214 +4,142 @@ Demo for Google Gemini use case in hotel inventory management.
 """
 
 import time
-import requests
 import streamlit as st
-from bs4 import BeautifulSoup
 from google.genai import types
-from lib.vertex_ai import get_vertex_ai_client
-
-# Vertex AI Configurations
-client = get_vertex_ai_client()
-generate_content_config = types.GenerateContentConfig(
-    temperature = 1,
-    top_p = 0.95,
-    max_output_tokens = 8192,
-    response_modalities = ["TEXT"],
-    safety_settings = [types.SafetySetting(
-        category="HARM_CATEGORY_HATE_SPEECH",
-        threshold="OFF"
-    ),types.SafetySetting(
-        category="HARM_CATEGORY_DANGEROUS_CONTENT",
-        threshold="OFF"
-    ),types.SafetySetting(
-        category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
-        threshold="OFF"
-    ),types.SafetySetting(
-        category="HARM_CATEGORY_HARASSMENT",
-        threshold="OFF"
-    )],
+from lib.hotel_catalogue import hotel_id
+from lib.hotel_images import covered_urls, prepare_images, to_parts
+from lib.hotel_tags import (
+    MAX_REVIEWS_PER_CALL,
+    get_tags_stream,
+    get_top_tags,
+    parse_tagging,
+    rank_tags,
 )
+from lib.jalan_scraper import REVIEW_BUDGET, get_http_cache, scrape
+from lib.streaming import TimedStream, parse_partial_json, render_stream
+from lib.tag_state import get_tag_state_store
 
-def scrape(url: str):
+def get_image_parts(image_urls: list, optimize: bool):
     """
-    Scrapes hotel information and reviews from Jalan.net.
+    Prepares the gallery images for tagging.
 
     Args:
-        url: The URL of the hotel page on Jalan.net.
+        image_urls: A list of URLs to the hotel's images.
+        optimize: Whether to dedupe, select and downscale the images before sending them.
+            Otherwise every URL is sent as is.
 
     Returns:
-        dict: A dictionary containing the hotel name, image URLs, and reviews.
+        tuple: The image parts, the URLs of the images they hold, and those URLs together
+            with the URLs of the near-duplicates dropped in their favour.
     """
-    reviews_url = url + "kuchikomi/"
-    headers = {
-        'Referer': 'https://www.jalan.net/',
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)'
-            'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.127 Safari/537.36',
-    }
-
-    # Get images
-    html_1 = requests.get(url, headers=headers, timeout=10)
-    html_1.encoding = html_1.apparent_encoding
-    soup_1 = BeautifulSoup(html_1.text, 'html.parser')
-
-    image_urls = []
-    image_comps = soup_1.find_all("p", { 'class': 'jlnpc-slideImage__item--img' })
-    for i in image_comps:
-        image_urls.append(i.find('img')['src'])
-
-    # Get reviews
-    html = requests.get(reviews_url, headers=headers, timeout=10)
-    html.encoding = html.apparent_encoding
-    soup = BeautifulSoup(html.text, 'html.parser')
-
-    # Get data
-    hotel_name = soup.find("div", { 'id': 'yado_header_hotel_name' }).find('a').text
-    reviews = []
-    review_comps = soup.find_all('div', { 'class': "jlnpc-kuchikomiCassette__rightArea" })
-    for i in review_comps:
-        reviews.append({
-            'title': (i.find('p', {'class':'jlnpc-kuchikomiCassette__lead'})).find('a').text,
-            'body': (i.find('p', {'class':'jlnpc-kuchikomiCassette__postBody'})).text,
-        })
-    return { 'hotel_name': hotel_name, 'image_urls': image_urls, 'reviews': reviews }
+    if not optimize:
+        parts = [types.Part.from_uri(file_uri=i, mime_type="image/jpeg") for i in image_urls]
+        return parts, image_urls, image_urls
+
+    s_time = time.time()
+    images, stats = prepare_images(image_urls)
+    st.write(
+        f"Selected {stats['selected']} of {stats['gallery']} images "
+        f"({stats['near_duplicates']} near-duplicates, {round(stats['bytes'] / 1024)} KiB) "
+        f"in {round(time.time() - s_time, 3)}s."
+    )
+    return to_parts(images), [i["url"] for i in images], covered_urls(images)
+
+def show_images(image_urls: list):
+    """Displays the images in 3 columns. If there are more than 3 images, divide them."""
+    col1, col2, col3 = st.columns(3)
+    for i, row in enumerate(image_urls):
+        if i % 3 == 0:
+            col1.image(row)
+        elif i % 3 == 1:
+            col2.image(row)
+        else:
+            col3.image(row)
 
-def get_tags(hotel_name: str, image_urls: list, reviews: list):
+def stream_tags(hotel_name: str, image_parts: list, reviews: list) -> dict:
     """
-    Generates tags for a hotel based on its name, image URLs, and reviews using Google Gemini.
-
-    Args:
-        hotel_name: The name of the hotel.
-        image_urls: A list of URLs to the hotel's images.
-        reviews: A list of reviews for the hotel.
+    Streams the tagging response, showing the tags as they arrive.
 
     Returns:
-        str: A JSON string containing the generated tags.
+        dict: The parsed tagging, or None when the stream ended without any text or with
+            incomplete JSON.
     """
-    text1 = types.Part.from_text(text=f"""
-<instructions>
-あなたは、オンライン旅行代理店 (OTA) でホテル、ヴィラ、リゾートを強調し、宣伝するための説明的なタグを生成する専門の旅行ボットです。
-これらのタグは、レビューの内容と画像に基づいて作成されます。
-あなたのタスクは、関連する日本のホテル関連のタグを抽出し、各タグを、それぞれのソース (レビューまたは画像) 内の感情と詳細に基づいて1から5のスケールで評価することです。
-あなたの応答は常に日本語でなければなりません。以下のタグ付けとスコアリングのルールに従ってください。
-</instructions>
-
-<tags_rules>
-タグの形式: タグは日本語のenum形式でなければなりません（例：朝食、部屋の広さ）。タグ自体は中立でなければならず、感情はスコアで示されます（例：朝食を低いスコアで使用し、不満な朝食は使用しない）。具体的で明確である必要があります（例：ショッピングへの近さをショッピングの代わりに）。粒度が細かく、冗長にならないようにします（例：屋外スイミングプールをスイミングプールの代わりに。プールとスイミングプールは避けてください）。各タグは単独で成立するほど記述的である必要があります。
-
-タグの内容: ホテルの施設、部屋の設備とアメニティ、ホテルのサービス、および部屋から見える特別なアトラクション*（特定のランドマークの眺めを含む）*など、画像と記事からのホテル関連のすべての側面を含めます。旅行の適合性、近さ、雰囲気、デザイン、ホテルの眺め、ユーザーの意図、および外部または季節のイベントを含めます。すべての旅行テーマとセグメント（例：ステイケーション、家族、ビジネス、ロマンチック、季節の旅行）を含めます。非常に具体的またはありそうもない外部イベント（例：テイラースイフトのコンサート）のタグは作成しないでください。
-
-データソースの処理: 画像を視覚的な手がかりとして使用して、注目すべきランドマークや特定の眺めを含む詳細なホテルの特徴を特定します。仮定はしないでください。タグは事実に基づいた観察可能な情報に基づいていなければなりません。不一致の場合には、記事からの情報を優先してください。スコアを含む記事ごとにタグを生成します。すべての画像に対して一度タグを生成します。レビューのタグが記事または画像で説明または表示されている場合は、そのタグを生成します。
-
-タグ生成ロジック: 複数のデータソースで言及または紹介されているタグを特定することを目指します。既存のリストにない、新しい関連タグを生成します。
-</tags_rules>
-
-<tags_scoring_rules>
-スコアリング (1-5):
-1: 非常に否定的/状態が悪い
-2: 否定的
-3: 中立
-4: 肯定的
-5: 素晴らしい
-
-タグは、タグが由来するソースのみに基づいてスコアリングしてください。同じタグであっても、記事と画像ソースに対して別々のスコアを維持してください。
-</tags_scoring_rules>
-
-<output_format>
-出力形式 (JSON):
-```json
-{{
-    "hotel_name": "...",
-    "tags": {{
-        "image": [
-            {{ "tag_name": "...", "tag_score": ... }},
-            {{ "tag_name": "...", "tag_score": ... }}
-        ],
-        "review": [
-            {{ "review_title":"...", "tag_name": "...", "tag_score": ... }},
-            {{ "review_title":"...", "tag_name": "...", "tag_score": ... }}
+    placeholder = st.empty()
+
+    def render(buffer: str):
+        partial = parse_partial_json(buffer) or {}
+        tags = partial.get("tags") or {}
+        names = [
+            mention["tag_name"]
+            for source in ("image", "review")
+            for mention in tags.get(source) or []
+            if isinstance(mention, dict) and mention.get("tag_name")
         ]
-    }}
-}}
-```
-</output_format>
-
-Hotel name: {hotel_name}
-
-Reviews: {reviews}
-
-Images:""")
-
-    image_parts = []
-    for i in image_urls:
-        image_parts.append(types.Part.from_uri(file_uri=i, mime_type="image/jpeg"))
-
-    model = "gemini-2.0-flash-exp"
-    contents = [
-        types.Content(
-            role="user",
-            parts=[
-                text1,
-                *image_parts,
-            ]
-        )
-    ]
-    resp = client.models.generate_content(
-        model=model,
-        contents=contents,
-        config=generate_content_config,
+        placeholder.write(f"Received {len(names)} tags: {', '.join(names[-10:])}")
+
+    stream = TimedStream(get_tags_stream(hotel_name, image_parts, reviews), lambda c: c.text)
+    tagging = parse_tagging(render_stream(stream, render))
+    if tagging is None:
+        st.error("Gemini returned no tags or incomplete tags.")
+        return None
+    usage = getattr(stream.last_chunk, "usage_metadata", None)
+    st.write(
+        f"First tokens in {round(stream.ttft or stream.total, 3)}s, tags generated in "
+        f"{round(stream.total, 3)}s with "
+        f"{usage.prompt_token_count if usage else 'an unknown number of'} input tokens."
     )
-    return resp.text
+    return tagging
 
-def get_top_tags(hotel_name, tags):
+def tag_hotel(url: str, data: dict, optimize_images: bool, incremental: bool):
     """
-    Generates top tags for a hotel based on all generated tags using Google Gemini.
+    Tags a scraped hotel.
 
     Args:
-        hotel_name: The name of the hotel.
-        tags: A JSON string containing all generated tags.
+        url: The URL of the hotel page.
+        data: The scraped hotel name, image URLs and reviews.
+        optimize_images: Whether to dedupe, select and downscale the images.
+        incremental: Whether to only tag the reviews and images not tagged before, and merge
+            the result into the stored tags of the hotel.
 
     Returns:
-        str: A JSON string containing the top tags.
+        tuple: The tagging, with all tag mentions of the hotel, and the URLs of the images sent.
     """
-    text1 = types.Part.from_text(text=f"""
-<instruction>
-あなたは、オンライン旅行代理店 (OTA) 向けの旅行ボットで、ホテル、ヴィラ、リゾートの最も魅力的なセールスポイントを特定することに特化しています。あなたのタスクは、レビューから抽出されたユーザー生成のタグのリストを分析し、ホテルの独自の価値提案を最もよく表し、潜在的な顧客を予約に誘うトップ5のタグを選択することです。選択されたこれらのタグは、モバイルアプリ内の商品カードにラベルとして表示されます。ホテルを特別なものにする本質を捉えることを目指し、際立っていて望ましい特徴を強調するタグを優先してください。ゲストエクスペリエンス、アメニティ、ロケーションの利点、全体的な雰囲気などの要素を考慮してください。より具体的で影響力のある代替案が存在する場合は、一般的なタグの選択を避けてください。
-</instruction>
+    reviews, image_urls = data['reviews'], data['image_urls']
+    if incremental:
+        store = get_tag_state_store()
+        reviews, image_urls = store.new_material(hotel_id(url), reviews, image_urls)
+        st.write(
+            f"{len(reviews)} of {len(data['reviews'])} reviews and {len(image_urls)} of "
+            f"{len(data['image_urls'])} images are new."
+        )
+    if len(reviews) > MAX_REVIEWS_PER_CALL:
+        st.write(
+            f"Tagging the first {MAX_REVIEWS_PER_CALL} of {len(reviews)} reviews, "
+            "the tag output of more would be cut short."
+        )
+        reviews = reviews[:MAX_REVIEWS_PER_CALL]
 
-<output_format>
-出力は、次のJSON形式で記述してください。
-{{
-    "hotel_name": "...",
-    "tags": {{
-        "tag_1": "...",
-        "tag_2": "...",
-        "tag_3": "...",
-        "tag_4": "...",
-        "tag_5": "..."
-    }}
-}}
-JSONの結果のみを出力し、マークダウン形式や余分なテキストは含めないでください。出力タグが入力タグと同じ大文字の列挙形式であることを確認してください。
-</output_format>
+    tagging = {"hotel_name": data['hotel_name'], "tags": {"image": [], "review": []}}
+    sent_image_urls, tagged_image_urls = [], []
+    if reviews or image_urls:
+        image_parts, sent_image_urls, tagged_image_urls = get_image_parts(
+            image_urls, optimize_images
+        )
+        st.write("Generating tags from reviews and images.")
+        streamed = stream_tags(data['hotel_name'], image_parts, reviews)
+        if streamed is None:
+            # Nothing was tagged, so nothing is recorded as tagged either.
+            reviews, tagged_image_urls = [], []
+        else:
+            tagging = streamed
+    else:
+        st.write("Nothing new to tag, reusing the stored tags.")
 
-Hotel name: {hotel_name}
-Tags:
-{tags}
-""")
-    model = "gemini-2.0-flash-exp"
-    contents = [
-        types.Content(
-            role="user",
-            parts=[
-                text1,
-            ]
+    if incremental:
+        tagging = store.merge(
+            hotel_id(url), data['hotel_name'], tagging["tags"], reviews, tagged_image_urls
         )
-    ]
-    resp = client.models.generate_content(
-        model=model,
-        contents=contents,
-        config=generate_content_config,
-    )
-    return resp.text
+    return tagging, sent_image_urls
 
 def main():
     """
@@ -234,6 +162,15 @@ def main():
     )
 
     url = st.text_input("URL", placeholder="https://www.jalan.net/yad306452")
+    review_budget = st.slider(
+        "レビュー数の上限 _Max reviews_", min_value=10, max_value=500, value=REVIEW_BUDGET
+    )
+    optimize_images = st.checkbox(
+        "画像を最適化する _Dedupe and downscale images_", value=True
+    )
+    incremental = st.checkbox(
+        "新しいレビューと画像のみタグ付けする _Only tag new reviews and images_", value=True
+    )
 
     if st.button("タグを生成する _Generate Tags_", type="primary"):
         if url:
@@ -241,38 +178,36 @@ def main():
                 s_time = time.time()
                 # Scraping
                 st.write(f"Getting information from {url}.")
-                data = scrape(url)
-                hotel_name = data['hotel_name']
-                image_urls = data['image_urls']
-                reviews = data['reviews']
+                data = scrape(url, review_budget)
+                st.write(
+                    f"Collected {len(data['reviews'])} reviews and {len(data['image_urls'])} "
+                    f"images in {round(time.time() - s_time, 3)}s."
+                )
+                cache = get_http_cache()
+                st.write(
+                    f"Page cache hit rate {round(cache.hit_rate() * 100)}%, "
+                    f"{round(cache.stats['bytes_saved'] / 1024)} KiB saved, "
+                    f"{cache.stats['parse_hits']} parses skipped."
+                )
 
                 # Tagging
-                st.write("Generating tags from reviews and images.")
-                tags_resp = get_tags(hotel_name, image_urls, reviews)
+                tagging, image_urls = tag_hotel(url, data, optimize_images, incremental)
 
                 # Top tags
-                st.write("Getting top tags from generated tags")
-                top_tags_resp = get_top_tags(hotel_name, tags_resp)
+                top_tags = get_top_tags(tagging)
                 status.update(
                     label=f"Tags generation completed in {round(time.time() - s_time, 3)}s.",
                     state="complete",
                     expanded=False
                 )
 
-            st.write(top_tags_resp)
+            st.write(top_tags)
 
+            with st.expander("Tag ranking"):
+                st.dataframe(rank_tags(tagging["tags"]))
             with st.expander("All generated tags"):
-                st.write(tags_resp)
-            col1, col2, col3 = st.columns(3)
-
-            # Display the images in 3 columns. If there are more than 3 images, divide them
-            for i, row in enumerate(image_urls):
-                if i % 3 == 0:
-                    col1.image(row)
-                elif i % 3 == 1:
-                    col2.image(row)
-                else:
-                    col3.image(row)
+                st.write(tagging)
+            show_images(image_urls or data['image_urls'])
         else:
             st.warning("Please enter a URL.")
 
@@ -0,0 +1,217 @@
+"""
+Retrieval and answer caches for Tanya Pajak.
+
+Tax questions cluster around a few topics (PPh 21 rates, NPWP registration, e-Bupot
+deadlines), so two caches sit in front of Vertex AI Search and Gemini:
+
+1. `CachedRetriever` keeps the documents retrieved for a query, keyed by the normalized query
+   text, for RETRIEVAL_CACHE_TTL seconds.
+2. `SemanticAnswerCache` keeps answers with their source documents in a vector index of
+   hashed character n-grams. A question is answered from the cache when its cosine
+   similarity to a cached question is at least ANSWER_CACHE_THRESHOLD and both have the
+   same content terms: stemmed words other than stopwords, numbers, and negators. So
+   "PPh 21" never answers "PPh 23", "pegawai tidak tetap" never answers "pegawai tetap",
+   and "membatalkan bukti potong" never answers "membuat bukti potong", while reworded
+   questions such as "cara daftar NPWP" and "cara mendaftar NPWP" still match.
+
+Entries carry a version, built from the data store ID and ANSWER_CACHE_VERSION, and are only
+served to lookups of the same version: bump ANSWER_CACHE_VERSION after re-indexing the data
+store. Both caches count hits and misses and the seconds they saved.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from typing import Any
+
+import numpy as np
+import streamlit as st
+from decouple import config
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+from lib.indonesian_text import tokenize
+from lib.trip_cache import ResponseCache
+
+RETRIEVAL_CACHE_TTL = config("RETRIEVAL_CACHE_TTL", default=3600, cast=int)
+RETRIEVAL_CACHE_SIZE = config("RETRIEVAL_CACHE_SIZE", default=1000, cast=int)
+ANSWER_CACHE_TTL = config("ANSWER_CACHE_TTL", default=86400, cast=int)
+ANSWER_CACHE_SIZE = config("ANSWER_CACHE_SIZE", default=1000, cast=int)
+ANSWER_CACHE_THRESHOLD = config("ANSWER_CACHE_THRESHOLD", default=0.8, cast=float)
+ANSWER_CACHE_VERSION = config("ANSWER_CACHE_VERSION", default="1")
+DIMENSIONS = 2**12
+NGRAM_SIZES = (3, 4, 5)
+SAME_QUESTION = 0.999  # similarity of questions differing only in case or punctuation
+NEGATORS = frozenset(["tidak", "tak", "bukan", "non", "belum", "tanpa"])
+
+_NON_WORD = re.compile(r"[^\w]+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_GROUPING = re.compile(r"[.,](?=\d{3}(?!\d))")
+
+
+def normalize_query(text: str) -> str:
+    """Folds case, width and punctuation of a query and collapses whitespace."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def embed(text: str) -> np.ndarray:
+    """
+    Embeds a text as L2-normalized counts of hashed character n-grams of its words.
+
+    Returns:
+        np.ndarray: A float32 vector of DIMENSIONS values.
+    """
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for word in normalize_query(text).split():
+        padded = f" {word} "
+        vector[zlib.crc32(padded.encode()) % DIMENSIONS] += 1
+        for size in NGRAM_SIZES:
+            for i in range(len(padded) - size + 1):
+                vector[zlib.crc32(padded[i:i + size].encode()) % DIMENSIONS] += 1
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def numbers(text: str) -> frozenset:
+    """
+    Returns the numbers mentioned in a text, such as the article of a tax or an amount.
+
+    Thousands separators are removed and a decimal comma becomes a point, so "5.000.000" and
+    "5,000,000" are the same number, but "5.000" is a different one.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return frozenset(
+        _GROUPING.sub("", number).replace(",", ".") for number in _NUMBER.findall(text)
+    )
+
+
+def content_terms(text: str) -> frozenset:
+    """Returns the stemmed content words, numbers and negators of a text."""
+    words = normalize_query(text).split()
+    return frozenset(tokenize(text)) | numbers(text) | NEGATORS.intersection(words)
+
+
+class SemanticAnswerCache:
+    """Thread-safe answer cache looked up by cosine similarity of questions."""
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_SIZE,
+        ttl_seconds: int = ANSWER_CACHE_TTL,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+    ):
+        self._threshold = threshold
+        self._ttl_seconds = ttl_seconds
+        self._vectors = np.zeros((max_entries, DIMENSIONS), dtype=np.float32)
+        self._entries = [None] * max_entries
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "seconds_saved": 0.0}
+
+    def _valid(self, version: str, now: float) -> np.ndarray:
+        """Returns a mask of the slots holding fresh entries of a version."""
+        return np.array(
+            [
+                entry is not None
+                and entry["version"] == version
+                and now - entry["created_at"] < self._ttl_seconds
+                for entry in self._entries
+            ]
+        )
+
+    def get(self, question: str, version: str):
+        """
+        Returns the entry of the most similar cached question, or None below the threshold.
+
+        Returns:
+            dict: The cached `question`, `answer` and `sources`, the `similarity` to the
+                question asked and the `generation_seconds` the answer took.
+        """
+        vector = embed(question)
+        terms = content_terms(question)
+        now = time.time()
+        with self._lock:
+            scores = self._vectors @ vector
+            valid = self._valid(version, now)
+            valid &= [entry is not None and entry["terms"] == terms for entry in self._entries]
+            scores[~valid] = -1.0
+            slot = int(np.argmax(scores))
+            entry = self._entries[slot]
+            if scores[slot] < self._threshold:
+                self.stats["misses"] += 1
+                return None
+            entry["last_used"] = now
+            self.stats["hits"] += 1
+            self.stats["seconds_saved"] += entry["generation_seconds"]
+            return {**entry, "similarity": float(scores[slot])}
+
+    def put(
+        self, question: str, version: str, answer: str, sources: list, generation_seconds: float
+    ):
+        """
+        Stores an answer. It replaces the entry of the same question, or when full an expired
+        or the least recently used entry.
+        """
+        vector = embed(question)
+        now = time.time()
+        with self._lock:
+            valid = self._valid(version, now)
+            scores = self._vectors @ vector
+            scores[~valid] = -1.0
+            free = [i for i, entry in enumerate(self._entries) if entry is None]
+            if scores.max() >= SAME_QUESTION:
+                slot = int(np.argmax(scores))
+            elif free:
+                slot = free[0]
+            else:
+                last_used = np.array([entry["last_used"] for entry in self._entries])
+                slot = int(np.argmin(valid)) if not valid.all() else int(np.argmin(last_used))
+                self.stats["evictions"] += 1
+            self._vectors[slot] = vector
+            self._entries[slot] = {
+                "question": question,
+                "version": version,
+                "terms": content_terms(question),
+                "answer": answer,
+                "sources": sources,
+                "generation_seconds": generation_seconds,
+                "created_at": now,
+                "last_used": now,
+            }
+
+    def __len__(self) -> int:
+        return sum(entry is not None for entry in self._entries)
+
+
+class CachedRetriever(BaseRetriever):
+    """Retriever returning cached documents for queries seen before."""
+
+    retriever: BaseRetriever
+    cache: Any
+    version: str
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list:
+        key = (self.version, normalize_query(query))
+        entry = self.cache.get(key)
+        if entry is not None:
+            return list(entry["content"])
+        s_time = time.time()
+        documents = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        self.cache.put(key, documents, time.time() - s_time)
+        return documents
+
+
+@st.cache_resource
+def get_retrieval_cache():
+    """Returns the process-wide retrieval cache."""
+    return ResponseCache(RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL)
+
+
+@st.cache_resource
+def get_answer_cache():
+    """Returns the process-wide semantic answer cache."""
+    return SemanticAnswerCache()
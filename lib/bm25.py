@@ -0,0 +1,330 @@
+"""
+Local BM25 index of the Tanya Pajak knowledge base.
+
+The tax corpus (regulations, PMK and PER documents) is small and changes rarely, so it can be
+searched in process instead of over the network. `BM25Index.build` splits an export of the
+data store into passages of CHUNK_WORDS words, tokenizes them with the Indonesian stemmer of
+`lib.indonesian_text`, and stores an inverted index whose postings already hold the BM25
+weight of each term in each passage. A search then adds a few NumPy slices, which takes
+well under a millisecond for thousands of passages.
+
+`LocalBM25Retriever` exposes the index as a LangChain retriever, which works offline.
+`HybridRetriever` merges its results with those of Vertex AI Search by reciprocal rank
+fusion over document sources. Build the index with `scripts/build_tax_index.py`.
+"""
+
+import base64
+import collections
+import functools
+import json
+import pathlib
+from typing import Any
+
+import numpy as np
+from bs4 import BeautifulSoup
+from decouple import config
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pypdf import PdfReader
+
+from lib.indonesian_text import tokenize
+
+BM25_INDEX_DIR = config("BM25_INDEX_DIR", default=".cache/bm25")
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+K1 = 1.5
+B = 0.75
+RRF_K = 60
+
+_DOCUMENTS_FILE = "documents.jsonl"
+_VOCABULARY_FILE = "vocabulary.json"
+_POSTINGS_FILE = "postings.npz"
+_TEXT_SUFFIXES = (".txt", ".md")
+_HTML_SUFFIXES = (".html", ".htm")
+_RECORD_SUFFIXES = (".json", ".jsonl", ".ndjson")
+
+
+def _record_text(record: dict) -> str:
+    """
+    Returns the text of a record. In a Vertex AI Search document export, `content` is an
+    object with a `mimeType` and either a `uri` or base64 `rawBytes`; only inline text can be
+    read, other content yields no text.
+    """
+    content = record.get("content") or record.get("text") or ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, dict) and content.get("rawBytes"):
+        if str(content.get("mimeType", "")).startswith("text/"):
+            return base64.b64decode(content["rawBytes"]).decode("utf-8", errors="replace")
+    return ""
+
+
+def _record_source(record: dict):
+    """Returns the source of a record: its source or URI, or else its ID, or None."""
+    content = record.get("content")
+    uri = content.get("uri") if isinstance(content, dict) else None
+    for value in (record.get("source"), record.get("uri"), uri, record.get("id")):
+        if value is not None and value != "":
+            return str(value)
+    return None
+
+
+def _read_records(path: pathlib.Path) -> list:
+    """Reads JSON or JSON Lines records with a text and an optional source."""
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        records = json.loads(text)
+        records = records if isinstance(records, list) else [records]
+    else:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return [(_record_text(record), _record_source(record)) for record in records]
+
+
+def _prefixed(source: str, source_prefix: str) -> str:
+    """Prepends the source prefix to a source that is not already a URI."""
+    return source if "://" in source else source_prefix + source
+
+
+def read_export(path: str, source_prefix: str = "") -> list:
+    """
+    Reads an export of the data store: PDF, text, Markdown and HTML files, and JSON records
+    with a `content` or `text` field and an optional `source`, `uri` or `id`. Records of a
+    Vertex AI Search document export that only point to a file (`content.uri`) hold no text
+    and are skipped; put the files they point to in the export directory instead.
+
+    Args:
+        path: The export directory, or a single file.
+        source_prefix: Prepended to the relative file paths and record IDs used as sources,
+            e.g. the gs:// URI of the bucket the data store was imported from, so sources
+            match the ones Vertex AI Search returns. Sources that are URIs are kept as is.
+
+    Returns:
+        list: One Document per file or record, with its `source` in the metadata.
+    """
+    root = pathlib.Path(path)
+    files = sorted(p for p in root.rglob("*") if p.is_file()) if root.is_dir() else [root]
+    documents = []
+    for file in files:
+        relative = file.relative_to(root).as_posix() if root.is_dir() else file.name
+        source = source_prefix + relative
+        suffix = file.suffix.lower()
+        if suffix == ".pdf":
+            pages = PdfReader(file).pages
+            texts = [("\n".join(page.extract_text() or "" for page in pages), source)]
+        elif suffix in _TEXT_SUFFIXES:
+            texts = [(file.read_text(encoding="utf-8"), source)]
+        elif suffix in _HTML_SUFFIXES:
+            html = file.read_text(encoding="utf-8")
+            texts = [(BeautifulSoup(html, "html.parser").get_text(" "), source)]
+        elif suffix in _RECORD_SUFFIXES:
+            texts = [
+                (text, source if origin is None else _prefixed(origin, source_prefix))
+                for text, origin in _read_records(file)
+            ]
+        else:
+            continue
+        documents.extend(
+            Document(page_content=text, metadata={"source": text_source})
+            for text, text_source in texts
+            if text.strip()
+        )
+    return documents
+
+
+def chunk(documents: list, words: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP) -> list:
+    """Splits documents into overlapping passages of a number of words."""
+    passages = []
+    for document in documents:
+        tokens = document.page_content.split()
+        step = max(words - overlap, 1)
+        for number, start in enumerate(range(0, max(len(tokens) - overlap, 1), step)):
+            passages.append(
+                Document(
+                    page_content=" ".join(tokens[start:start + words]),
+                    metadata={**document.metadata, "chunk": number},
+                )
+            )
+    return passages
+
+
+def _postings(counts: list, term_ids: dict) -> tuple:
+    """Returns the term, passage and frequency of every posting, sorted by term."""
+    terms, doc_ids, frequencies = [], [], []
+    for doc_id, count in enumerate(counts):
+        for term, frequency in count.items():
+            terms.append(term_ids[term])
+            doc_ids.append(doc_id)
+            frequencies.append(frequency)
+    terms = np.array(terms, dtype=np.int32)
+    order = np.argsort(terms, kind="stable")
+    return (
+        terms[order],
+        np.array(doc_ids, dtype=np.int32)[order],
+        np.array(frequencies, dtype=np.float32)[order],
+    )
+
+
+class BM25Index:
+    """Inverted index of passages with precomputed BM25 weights."""
+
+    def __init__(self, documents: list, vocabulary: list, offsets, doc_ids, weights):
+        """
+        Args:
+            documents: The indexed passages.
+            vocabulary: The terms, in the order of `offsets`.
+            offsets: The start of the postings of each term, plus the end of the last.
+            doc_ids: The passage of each posting.
+            weights: The BM25 weight of each posting.
+        """
+        self.documents = documents
+        self._terms = {term: i for i, term in enumerate(vocabulary)}
+        self._offsets = offsets
+        self._doc_ids = doc_ids
+        self._weights = weights
+
+    @classmethod
+    def build(cls, documents: list, k1: float = K1, b: float = B):
+        """Indexes passages, e.g. the result of `chunk(read_export(path))`."""
+        counts = [collections.Counter(tokenize(document.page_content)) for document in documents]
+        vocabulary = sorted({term for count in counts for term in count})
+        term_ids = {term: i for i, term in enumerate(vocabulary)}
+        lengths = np.array([sum(count.values()) for count in counts], dtype=np.float32)
+        lengths /= (lengths.mean() if len(lengths) else 0.0) or 1.0
+
+        terms, doc_ids, frequencies = _postings(counts, term_ids)
+        document_frequency = np.bincount(terms, minlength=len(vocabulary))
+        offsets = np.concatenate([[0], np.cumsum(document_frequency)]).astype(np.int64)
+        idf = np.log(1 + (len(documents) - document_frequency + 0.5) / (document_frequency + 0.5))
+        weights = idf[terms] * frequencies * (k1 + 1) / (
+            frequencies + k1 * (1 - b + b * lengths[doc_ids])
+        )
+        return cls(documents, vocabulary, offsets, doc_ids, weights.astype(np.float32))
+
+    def scores(self, query: str) -> np.ndarray:
+        """Returns the BM25 score of every passage for a query."""
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term, count in collections.Counter(tokenize(query)).items():
+            term_id = self._terms.get(term)
+            if term_id is not None:
+                start, end = self._offsets[term_id], self._offsets[term_id + 1]
+                scores[self._doc_ids[start:end]] += count * self._weights[start:end]
+        return scores
+
+    def search(self, query: str, k: int = 10) -> list:
+        """
+        Returns the passages best matching a query.
+
+        Returns:
+            list: Up to `k` (Document, score) pairs, best first, only with a positive score.
+        """
+        scores = self.scores(query)
+        matches = np.flatnonzero(scores)
+        if len(matches) > k:
+            matches = matches[np.argpartition(-scores[matches], k - 1)[:k]]
+        matches = matches[np.argsort(-scores[matches], kind="stable")]
+        return [(self.documents[i], float(scores[i])) for i in matches]
+
+    def save(self, directory: str = BM25_INDEX_DIR):
+        """Writes the index to a directory."""
+        directory = pathlib.Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / _DOCUMENTS_FILE, "w", encoding="utf-8") as file:
+            for document in self.documents:
+                record = {"page_content": document.page_content, "metadata": document.metadata}
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        (directory / _VOCABULARY_FILE).write_text(
+            json.dumps(list(self._terms), ensure_ascii=False), encoding="utf-8"
+        )
+        np.savez(
+            directory / _POSTINGS_FILE,
+            offsets=self._offsets,
+            doc_ids=self._doc_ids,
+            weights=self._weights,
+        )
+        load_bm25_index.cache_clear()
+
+    @classmethod
+    def load(cls, directory: str = BM25_INDEX_DIR):
+        """Reads an index written by `save`."""
+        directory = pathlib.Path(directory)
+        with open(directory / _DOCUMENTS_FILE, encoding="utf-8") as file:
+            documents = [Document(**json.loads(line)) for line in file]
+        vocabulary = json.loads((directory / _VOCABULARY_FILE).read_text(encoding="utf-8"))
+        with np.load(directory / _POSTINGS_FILE) as postings:
+            return cls(
+                documents,
+                vocabulary,
+                postings["offsets"],
+                postings["doc_ids"],
+                postings["weights"],
+            )
+
+
+@functools.cache
+def load_bm25_index(directory: str = BM25_INDEX_DIR):
+    """Returns the index in a directory, loaded once per process, or None if there is none."""
+    if not (pathlib.Path(directory) / _POSTINGS_FILE).exists():
+        return None
+    return BM25Index.load(directory)
+
+
+class LocalBM25Retriever(BaseRetriever):
+    """Retriever searching a local BM25 index, without any network call."""
+
+    index: Any
+    k: int = 10
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list:
+        return [
+            Document(
+                page_content=document.page_content,
+                metadata={**document.metadata, "bm25_score": round(score, 4)},
+            )
+            for document, score in self.index.search(query, self.k)
+        ]
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 10, rrf_k: int = RRF_K) -> list:
+    """
+    Merges ranked document lists by reciprocal rank fusion over document sources.
+
+    A source scores 1 / (rrf_k + rank) in every list it appears in, at the rank of its first
+    document there. Sources are returned by total score, each with its best document from
+    every list, up to `k` documents.
+    """
+    scores = collections.defaultdict(float)
+    best = collections.defaultdict(list)
+    for ranking in rankings:
+        seen = set()
+        for rank, document in enumerate(ranking, start=1):
+            source = document.metadata.get("source", document.page_content)
+            if source in seen:
+                continue
+            seen.add(source)
+            scores[source] += 1 / (rrf_k + rank)
+            best[source].append(document)
+    fused = [
+        document
+        for source in sorted(scores, key=scores.get, reverse=True)
+        for document in best[source]
+    ]
+    return fused[:k]
+
+
+class HybridRetriever(BaseRetriever):
+    """Retriever merging the results of several retrievers by reciprocal rank fusion."""
+
+    retrievers: list
+    k: int = 10
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list:
+        rankings = [
+            retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+            for retriever in self.retrievers
+        ]
+        return reciprocal_rank_fusion(rankings, self.k)
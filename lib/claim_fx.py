@@ -0,0 +1,160 @@
+"""
+Checks the currency conversion of employee claim items against ECB reference rates.
+
+Stage 1 of the claim pipeline extracts both the original amount and the amount in the entity
+currency of each item. The implied rate (entity_amount / original_amount) is compared with
+the reference rate of the transaction date, and items deviating by more than FX_TOLERANCE
+are flagged, catching extraction errors without a second model pass.
+
+All distinct (original currency, transaction date) combinations of a report are resolved
+in one batch: one `get_exchange_rate` call per combination, covering every entity currency
+at once, run concurrently. The rates come from the same source as the exchange rate agent,
+the local ECB store or the Frankfurter API, and repeated dates are served from its cache.
+The check is advisory: a lookup that fails, e.g. while offline, leaves its items unchecked
+("no rate") instead of failing the claim.
+"""
+
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from decouple import config
+from requests import RequestException
+
+from lib.exchange_rate import get_exchange_rate
+from lib.fx_store import significant
+
+FX_TOLERANCE = config("FX_TOLERANCE", default=0.03, cast=float)
+MAX_WORKERS = 8
+
+CHECK_OK = "ok"
+CHECK_MISMATCH = "mismatch"
+CHECK_SAME_CURRENCY = "same currency"
+CHECK_NO_RATE = "no rate"
+CHECK_INCOMPLETE = "incomplete"
+
+
+def _amount(value):
+    """Converts an extracted amount to a float, or None if it is not a number."""
+    if isinstance(value, str):
+        value = value.replace(",", "").strip()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _conversion(item: dict):
+    """
+    Returns the conversion of an item as (from, to, date, original, converted), or None
+    when a field is missing or invalid.
+    """
+    currency_from = (item.get("original_currency") or "").strip().upper()
+    currency_to = (item.get("entity_currency") or "").strip().upper()
+    original = _amount(item.get("original_amount"))
+    converted = _amount(item.get("entity_amount"))
+    try:
+        date = datetime.date.fromisoformat(str(item.get("transaction_date"))).isoformat()
+    except ValueError:
+        return None
+    if len(currency_from) != 3 or len(currency_to) != 3 or not original or converted is None:
+        return None
+    return currency_from, currency_to, date, original, converted
+
+
+def rate_requests(items: list) -> dict:
+    """
+    Groups the conversions of claim items into rate requests.
+
+    Returns:
+        dict: The entity currencies needed per (original currency, transaction date).
+    """
+    requests = {}
+    for item in items:
+        conversion = _conversion(item)
+        if conversion and conversion[0] != conversion[1]:
+            currency_from, currency_to, date = conversion[:3]
+            requests.setdefault((currency_from, date), set()).add(currency_to)
+    return requests
+
+
+def fetch_rates(requests: dict, get_rates=get_exchange_rate) -> dict:
+    """
+    Resolves rate requests, one call per (currency, date), concurrently.
+
+    Args:
+        requests: The entity currencies per (original currency, date), as returned by
+            `rate_requests`.
+        get_rates: A function with the signature and result format of `get_exchange_rate`.
+            Replace it with a local stand-in to check claims offline.
+
+    Returns:
+        dict: The reference rate per (original currency, entity currency, date). Pairs
+            without a published rate, or whose lookup failed, are missing.
+    """
+
+    def fetch(key):
+        currency_from, date = key
+        try:
+            return key, get_rates(currency_from, ",".join(sorted(requests[key])), date)
+        except (RequestException, ValueError):  # unreachable API or a non-JSON error page
+            return key, {}
+
+    rates = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for (currency_from, date), result in executor.map(fetch, requests):
+            for currency_to, rate in result.get("rates", {}).items():
+                rates[(currency_from, currency_to, date)] = rate
+    return rates
+
+
+def validate_items(
+    items: list, tolerance: float = FX_TOLERANCE, get_rates=get_exchange_rate
+) -> list:
+    """
+    Adds the result of the currency conversion check to claim items.
+
+    Each item gets `fx_reference_rate`, `fx_implied_rate`, `fx_deviation` (the relative
+    difference of the implied rate from the reference rate) and `fx_check`, one of "ok",
+    "mismatch", "same currency", "no rate" or "incomplete".
+
+    Args:
+        items: The claim items, updated in place.
+        tolerance: The largest accepted relative deviation, e.g. 0.03 for 3%.
+        get_rates: The rate source, see `fetch_rates`.
+
+    Returns:
+        list: The updated items.
+    """
+    rates = fetch_rates(rate_requests(items), get_rates)
+    for item in items:
+        conversion = _conversion(item)
+        result = {
+            "fx_reference_rate": None,
+            "fx_implied_rate": None,
+            "fx_deviation": None,
+            "fx_check": CHECK_INCOMPLETE,
+        }
+        if conversion:
+            currency_from, currency_to, date, original, converted = conversion
+            implied = converted / original
+            reference = 1.0 if currency_from == currency_to else rates.get(
+                (currency_from, currency_to, date)
+            )
+            result["fx_implied_rate"] = significant(implied)
+            result["fx_check"] = CHECK_NO_RATE
+            if reference:
+                deviation = implied / reference - 1
+                result.update(
+                    fx_reference_rate=reference,
+                    fx_deviation=round(deviation, 4),
+                    fx_check=CHECK_OK if abs(deviation) <= tolerance else CHECK_MISMATCH,
+                )
+                if currency_from == currency_to and result["fx_check"] == CHECK_OK:
+                    result["fx_check"] = CHECK_SAME_CURRENCY
+        item.update(result)
+    return items
+
+
+def flagged_items(items: list) -> list:
+    """Returns the items whose conversion check did not pass."""
+    return [item for item in items if item.get("fx_check") == CHECK_MISMATCH]
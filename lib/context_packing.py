@@ -0,0 +1,138 @@
+"""
+Reranking and packing of retrieved passages into the Tanya Pajak prompt.
+
+The retriever returns up to 10 passages and the chain stuffs all of them into `{context}`.
+`PackingRetriever` sits between the two:
+
+1. Rerank: the passages are scored against the question with BM25 over just the retrieved
+   passages, using the Indonesian tokenizer of `lib.indonesian_text`. Ties, including
+   passages sharing no term with the question, keep the retriever's order.
+2. Deduplicate: a passage whose word 3-shingles overlap an already packed passage by
+   NEAR_DUPLICATE (Jaccard) or more is dropped.
+3. Pack: passages are added best first while they fit CONTEXT_TOKEN_BUDGET, estimated at
+   CHARS_PER_TOKEN characters per token. The best passage is truncated if it alone is over
+   the budget, so the context is never empty.
+
+The retriever counts the passages and estimated tokens it received and kept.
+"""
+
+import math
+import threading
+from typing import Any
+
+from decouple import config
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import Field, PrivateAttr
+
+from lib.bm25 import BM25Index
+from lib.indonesian_text import tokenize
+
+CONTEXT_TOKEN_BUDGET = config("CONTEXT_TOKEN_BUDGET", default=1500, cast=int)
+NEAR_DUPLICATE = 0.7
+CHARS_PER_TOKEN = 4
+SHINGLE_SIZE = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of Gemini tokens of a text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def shingles(text: str) -> frozenset:
+    """Returns the word 3-grams of the stemmed terms of a text."""
+    terms = tokenize(text)
+    if len(terms) < SHINGLE_SIZE:
+        return frozenset([tuple(terms)])
+    return frozenset(zip(*(terms[i:] for i in range(SHINGLE_SIZE))))
+
+
+def jaccard(first: frozenset, second: frozenset) -> float:
+    """Returns the Jaccard similarity of two sets."""
+    union = len(first | second)
+    return len(first & second) / union if union else 1.0
+
+
+def rerank(question: str, documents: list) -> list:
+    """
+    Orders passages by their BM25 score against a question.
+
+    Returns:
+        list: (Document, score) pairs, best first, in retriever order among equal scores.
+    """
+    if not documents:
+        return []
+    scores = BM25Index.build(documents).scores(question)
+    order = sorted(range(len(documents)), key=lambda i: (-scores[i], i))
+    return [(documents[i], float(scores[i])) for i in order]
+
+
+def pack(question: str, documents: list, budget: int = CONTEXT_TOKEN_BUDGET) -> tuple:
+    """
+    Reranks, deduplicates and packs passages into a token budget.
+
+    Args:
+        question: The question the passages answer.
+        documents: The retrieved passages.
+        budget: The estimated number of tokens the packed passages may take.
+
+    Returns:
+        tuple: The packed passages, best first, and the number of near-duplicates dropped.
+    """
+    packed, packed_shingles = [], []
+    duplicates = 0
+    remaining = budget
+    for document, score in rerank(question, documents):
+        passage_shingles = shingles(document.page_content)
+        if any(jaccard(passage_shingles, other) >= NEAR_DUPLICATE for other in packed_shingles):
+            duplicates += 1
+            continue
+        tokens = estimate_tokens(document.page_content)
+        content = document.page_content
+        if tokens > remaining:
+            if packed:
+                continue
+            content = content[: remaining * CHARS_PER_TOKEN]
+            tokens = remaining
+        packed.append(
+            Document(
+                page_content=content,
+                metadata={**document.metadata, "rerank_score": round(score, 4)},
+            )
+        )
+        packed_shingles.append(passage_shingles)
+        remaining -= tokens
+    return packed, duplicates
+
+
+class PackingRetriever(BaseRetriever):
+    """Retriever reranking, deduplicating and packing the passages of another retriever."""
+
+    retriever: Any
+    budget: int = CONTEXT_TOKEN_BUDGET
+    stats: dict = Field(
+        default_factory=lambda: {
+            "retrievals": 0,
+            "passages_in": 0,
+            "passages_out": 0,
+            "duplicates": 0,
+            "tokens_in": 0,
+            "tokens_out": 0,
+        }
+    )
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list:
+        documents = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        packed, duplicates = pack(query, documents, self.budget)
+        with self._lock:
+            self.stats["retrievals"] += 1
+            self.stats["passages_in"] += len(documents)
+            self.stats["passages_out"] += len(packed)
+            self.stats["duplicates"] += duplicates
+            self.stats["tokens_in"] += sum(estimate_tokens(d.page_content) for d in documents)
+            self.stats["tokens_out"] += sum(estimate_tokens(d.page_content) for d in packed)
+        return packed
@@ -0,0 +1,142 @@
+"""
+Upload-once document handles for the finance demos.
+
+Inlining a document with `types.Part.from_bytes` re-sends the whole file on every call, retry
+and re-click. When DOCUMENT_BUCKET is set, documents are uploaded once to Cloud Storage, keyed
+by file hash, and every later call on the same file refers to them with
+`types.Part.from_uri`. DOCUMENT_HANDLE_TTL should match the age after which the lifecycle
+rule of the bucket deletes objects: a handle expires that long after its object was created,
+not after the handle was. An object found in the bucket with less than MIN_HANDLE_LIFETIME
+left is uploaded again, which resets its age. Without a bucket, documents are inlined as
+before.
+"""
+
+import dataclasses
+import pathlib
+import threading
+import time
+
+import streamlit as st
+from decouple import config
+from google.cloud import storage
+from google.genai import types
+
+from lib.extraction_store import file_hash
+from lib.vertex_ai import PROJECT_ID
+
+DOCUMENT_BUCKET = config("DOCUMENT_BUCKET", default="")
+DOCUMENT_HANDLE_TTL = config("DOCUMENT_HANDLE_TTL", default=24 * 60 * 60, cast=int)
+MIN_HANDLE_LIFETIME = 60 * 60
+
+
+@dataclasses.dataclass(frozen=True)
+class DocumentHandle:
+    """A reference to an uploaded document."""
+
+    uri: str
+    mime_type: str
+    expires_at: float
+
+    def is_expired(self) -> bool:
+        """Returns True when the uploaded document may no longer exist."""
+        return time.time() >= self.expires_at
+
+
+class GcsUploader:  # pylint: disable=too-few-public-methods
+    """Uploads documents to a Cloud Storage bucket."""
+
+    def __init__(self, bucket_name: str, prefix: str = "documents"):
+        self._bucket = storage.Client(project=PROJECT_ID).bucket(bucket_name)
+        self._prefix = prefix
+
+    def upload(self, key: str, file_content: bytes, mime_type: str, not_before: float):
+        """
+        Uploads a document unless the bucket holds it from `not_before` or later.
+
+        Returns:
+            tuple: The URI of the object and the time it was created.
+        """
+        name = f"{self._prefix}/{key}"
+        blob = self._bucket.get_blob(name)
+        if blob is None or blob.time_created.timestamp() < not_before:
+            blob = self._bucket.blob(name)
+            blob.upload_from_string(file_content, content_type=mime_type)
+            blob.reload()
+        return f"gs://{self._bucket.name}/{blob.name}", blob.time_created.timestamp()
+
+
+class LocalUploader:  # pylint: disable=too-few-public-methods
+    """Local stand-in for `GcsUploader`, used for offline tests and benchmarks."""
+
+    def __init__(self, directory: str):
+        self._directory = pathlib.Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self.uploads = 0
+
+    def upload(self, key: str, file_content: bytes, _mime_type: str, not_before: float):
+        """Writes a document to the local directory and returns its file URI and mtime."""
+        path = self._directory / key
+        if not path.exists() or path.stat().st_mtime < not_before:
+            path.write_bytes(file_content)
+            self.uploads += 1
+        return path.resolve().as_uri(), path.stat().st_mtime
+
+
+class DocumentHandleRegistry:
+    """Tracks uploaded documents by file hash and reuses them until they expire."""
+
+    def __init__(self, uploader, ttl_seconds: int = DOCUMENT_HANDLE_TTL):
+        self._uploader = uploader
+        self._ttl_seconds = ttl_seconds
+        self._handles = {}
+        self._lock = threading.Lock()
+        self.stats = {"uploads": 0, "reused": 0}
+
+    def get_handle(self, file_content: bytes, mime_type: str) -> DocumentHandle:
+        """Returns a live handle for a document, uploading it only when needed."""
+        key = file_hash(file_content)
+        with self._lock:
+            handle = self._handles.get((key, mime_type))
+            if handle is not None and not handle.is_expired():
+                self.stats["reused"] += 1
+                return handle
+
+        # Objects that would be deleted too soon after this call are uploaded again.
+        min_lifetime = min(MIN_HANDLE_LIFETIME, self._ttl_seconds // 2)
+        not_before = time.time() - self._ttl_seconds + min_lifetime
+        uri, created_at = self._uploader.upload(key, file_content, mime_type, not_before)
+        handle = DocumentHandle(uri, mime_type, created_at + self._ttl_seconds)
+        with self._lock:
+            self._handles[(key, mime_type)] = handle
+            self.stats["uploads"] += 1
+        return handle
+
+    def get_part(self, file_content: bytes, mime_type: str) -> types.Part:
+        """Returns a URI part referring to the uploaded document."""
+        handle = self.get_handle(file_content, mime_type)
+        return types.Part.from_uri(file_uri=handle.uri, mime_type=handle.mime_type)
+
+
+@st.cache_resource
+def get_document_registry():
+    """Returns a cached registry, or None when no document bucket is configured."""
+    if not DOCUMENT_BUCKET:
+        return None
+    return DocumentHandleRegistry(GcsUploader(DOCUMENT_BUCKET))
+
+
+def get_document_part(file_content: bytes, mime_type: str) -> types.Part:
+    """
+    Returns the part to send for a document.
+
+    Args:
+        file_content: The document content as bytes.
+        mime_type: The mime type of the document.
+
+    Returns:
+        types.Part: A URI part when a document bucket is configured, an inline part otherwise.
+    """
+    registry = get_document_registry()
+    if registry is None:
+        return types.Part.from_bytes(data=file_content, mime_type=mime_type)
+    return registry.get_part(file_content, mime_type)
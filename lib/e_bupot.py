@@ -0,0 +1,211 @@
+"""
+Local text-layer parser for machine-generated e-Bupot (Bukti Pemotongan/Pemungutan) PDFs.
+
+Official e-Bupot documents issued by DJP have a real text layer and a fixed layout, so most
+fields can be read with layout-anchored patterns without calling Gemini. The parser fills the
+same JSON structure as the multimodal prompt in `app/finops-e-bupot.py` and reports which
+required fields are missing or invalid, so the caller can decide to fall back to the model.
+"""
+
+import io
+import re
+
+from pypdf import PdfReader
+from pypdf.errors import PdfReadError
+
+HEADER = "Header"
+SECTION_A = "Section A - IDENTITAS WAJIB PAJAK YANG DIPOTONG/DIPUNGUT"
+SECTION_B = "Section B - PAJAK PENGHASILAN YANG DIPOTONG/DIPUNGUT"
+SECTION_C = "Section C - IDENTITAS PEMOTONG/PEMUNGUT"
+
+# (section, field) pairs that must be present and valid to skip the model call.
+REQUIRED_FIELDS = [
+    (HEADER, "NOMOR"),
+    (SECTION_A, "NPWP"),
+    (SECTION_B, "MASA PAJAK"),
+    (SECTION_B, "DPP"),
+    (SECTION_B, "TARIF"),
+    (SECTION_B, "PPh DTP"),
+    (SECTION_C, "NPWP Pemotong"),
+]
+
+MONTHS_ID = {
+    "januari": 1, "februari": 2, "maret": 3, "april": 4, "mei": 5, "juni": 6,
+    "juli": 7, "agustus": 8, "september": 9, "oktober": 10, "november": 11, "desember": 12,
+}
+
+# Layout anchors. Labels are matched case-insensitively and values are read up to the end of
+# the line, which is how pypdf lays out the label/value pairs of the DJP template.
+# The bukti potong number holds digits, which keeps "Nomor Dokumen" from matching.
+_NOMOR = re.compile(r"\bNOMOR\s*:?\s*(?!DOKUMEN\b)(?=[A-Z]*\d)([A-Z0-9]{6,})", re.IGNORECASE)
+_NPWP_A = re.compile(r"A\.1\s+NPWP(?:\s*/\s*NIK)?\s*:?\s*([\d.\- ]{15,24})", re.IGNORECASE)
+_NIK_A = re.compile(r"A\.2\s+NIK\s*:?\s*(\d{16})", re.IGNORECASE)
+_NAMA_A = re.compile(r"A\.3\s+NAMA\s*:?\s*(.+)", re.IGNORECASE)
+_TAX_ROW = re.compile(
+    r"(\d{2}-\d{4})\s+(\d{2}-\d{3}-\d{2})\s+([\d.,]+)\s+([\d.,]+)\s+([\d.,]+)"
+)
+_KETERANGAN = re.compile(r"\d{2}-\d{3}-\d{2}\s*:\s*(.+)")
+_NAMA_DOKUMEN = re.compile(
+    r"Jenis\s+Dokumen\s*:?\s*(.+?)(?:\s+Tanggal\b|$)", re.IGNORECASE | re.MULTILINE
+)
+_NOMOR_DOKUMEN = re.compile(r"Nomor\s+Dokumen\s*:?\s*(\S+)", re.IGNORECASE)
+_TANGGAL_DOKUMEN = re.compile(r"B\.\d+.*?Tanggal\s*:?\s*(.+)", re.IGNORECASE)
+_NPWP_C = re.compile(r"C\.1\s+NPWP(?:\s*/\s*NIK)?\s*:?\s*([\d.\- ]{15,24})", re.IGNORECASE)
+_NAMA_C = re.compile(r"C\.3\s+NAMA(?:\s+PEMOTONG/PEMUNGUT)?\s*:?\s*(.+)", re.IGNORECASE)
+_TANGGAL_C = re.compile(r"C\.4\s+TANGGAL\s*:?\s*(.+)", re.IGNORECASE)
+
+
+def extract_text(file_content: bytes) -> str:
+    """Returns the concatenated text layer of all pages in a PDF."""
+    reader = PdfReader(io.BytesIO(file_content))
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def parse_number(value: str):
+    """
+    Parses an Indonesian formatted number ("1.234.567,89") to a float.
+
+    Returns None when the value cannot be parsed.
+    """
+    if value is None:
+        return None
+    cleaned = value.strip().replace(".", "").replace(",", ".")
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def parse_date(value: str):
+    """
+    Normalizes "dd-mm-yyyy", "dd/mm/yyyy" or "dd <Indonesian month> yyyy" to dd-mm-yyyy.
+
+    Returns None when the value does not look like a date.
+    """
+    if value is None:
+        return None
+    match = re.search(r"(\d{1,2})[-/](\d{1,2})[-/](\d{4})", value)
+    if match:
+        day, month, year = match.groups()
+        return f"{int(day):02d}-{int(month):02d}-{year}"
+    match = re.search(r"(\d{1,2})\s+([A-Za-z]+)\s+(\d{4})", value)
+    if match and match.group(2).lower() in MONTHS_ID:
+        day, month, year = match.groups()
+        return f"{int(day):02d}-{MONTHS_ID[month.lower()]:02d}-{year}"
+    return None
+
+
+def _digits(value: str):
+    """Strips spaces, dots and dashes from an identifier such as NPWP."""
+    return re.sub(r"\D", "", value) if value else None
+
+
+def _search(pattern: re.Pattern, text: str):
+    """Returns the stripped first group of a pattern, or None."""
+    match = pattern.search(text)
+    return match.group(1).strip() if match else None
+
+
+def parse_e_bupot_text(text: str) -> dict:
+    """
+    Fills the e-Bupot JSON structure from the text layer of the document.
+
+    Args:
+        text: The text layer as returned by `extract_text`.
+
+    Returns:
+        dict: The same structure the Gemini prompt produces, with None for missing fields.
+    """
+    row = _TAX_ROW.search(text)
+    masa_pajak, dpp, tarif, pph = (None, None, None, None)
+    if row:
+        masa_pajak = row.group(1)
+        dpp = parse_number(row.group(3))
+        tarif = parse_number(row.group(4))
+        pph = parse_number(row.group(5))
+
+    return {
+        HEADER: {
+            "NOMOR": _search(_NOMOR, text),
+        },
+        SECTION_A: {
+            "NPWP": _digits(_search(_NPWP_A, text)),
+            "NIK": _search(_NIK_A, text),
+            "NAMA": _search(_NAMA_A, text),
+        },
+        SECTION_B: {
+            "MASA PAJAK": masa_pajak,
+            "DPP": dpp,
+            "TARIF": tarif,
+            "PPh DTP": pph,
+            "Keterangan Kode Objek Pajak": _search(_KETERANGAN, text),
+            "Nomor Dokumen Referensi": _search(_NOMOR_DOKUMEN, text),
+            "Nama Dokumen": _search(_NAMA_DOKUMEN, text),
+            "Tanggal Dokumen": parse_date(_search(_TANGGAL_DOKUMEN, text)),
+        },
+        SECTION_C: {
+            "NPWP Pemotong": _digits(_search(_NPWP_C, text)),
+            "NAMA Pemotong": _search(_NAMA_C, text),
+            "Tanggal": parse_date(_search(_TANGGAL_C, text)),
+        },
+    }
+
+
+def validate_e_bupot(data: dict) -> list:
+    """
+    Checks the required fields of a parsed e-Bupot.
+
+    Args:
+        data: The parsed e-Bupot structure.
+
+    Returns:
+        list: Human readable problems. An empty list means the record can be trusted.
+    """
+    problems = []
+    for section, field in REQUIRED_FIELDS:
+        if data.get(section, {}).get(field) in (None, ""):
+            problems.append(f"{field} is missing")
+    if problems:
+        return problems
+
+    for section, field in [(SECTION_A, "NPWP"), (SECTION_C, "NPWP Pemotong")]:
+        if len(data[section][field]) not in (15, 16):
+            problems.append(f"{field} must have 15 or 16 digits")
+
+    nik = data[SECTION_A].get("NIK")
+    if nik and len(nik) != 16:
+        problems.append("NIK must have 16 digits")
+
+    if not re.fullmatch(r"(0[1-9]|1[0-2])-\d{4}", data[SECTION_B]["MASA PAJAK"]):
+        problems.append("MASA PAJAK must be in mm-yyyy format")
+
+    dpp = data[SECTION_B]["DPP"]
+    tarif = data[SECTION_B]["TARIF"]
+    pph = data[SECTION_B]["PPh DTP"]
+    if not 0 <= tarif <= 100:
+        problems.append("TARIF must be a percentage")
+    elif abs(dpp * tarif / 100 - pph) > 1:
+        problems.append("PPh DTP does not match DPP x TARIF")
+    return problems
+
+
+def parse_e_bupot(file_content: bytes):
+    """
+    Runs the local fast path on an e-Bupot PDF.
+
+    Args:
+        file_content: The PDF file content as bytes.
+
+    Returns:
+        tuple: The parsed structure (or None when the PDF has no usable text layer) and the
+            list of validation problems.
+    """
+    try:
+        text = extract_text(file_content)
+    except (PdfReadError, ValueError):
+        return None, ["PDF text layer could not be read"]
+    if not text.strip():
+        return None, ["PDF has no text layer"]
+
+    data = parse_e_bupot_text(text)
+    return data, validate_e_bupot(data)
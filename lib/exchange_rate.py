@@ -0,0 +1,211 @@
+"""
+The `get_exchange_rate` tool of the exchange rate agent.
+
+One call answers a basket of target currencies on one date or over a date range, so the agent
+needs a single tool hop for questions like "IDR against USD, SGD and JPY over the last 30
+days". Rates come from the local ECB store when it covers the request (see `lib.fx_store`),
+otherwise from one Frankfurter request: the multi-symbol endpoint for a date, the time series
+endpoint for a range.
+
+Requests go through one pooled keep-alive session per process, which retries connection
+errors and 429/5xx responses with exponential backoff. Responses are cached in process:
+published fixings (dates before today) never change and are kept until evicted, while
+"latest" and ranges ending today are kept for FX_LATEST_TTL seconds. The session and the
+caches are created on first use and are not referenced by the tool function, so a
+LangchainAgent with this tool still pickles and deploys with `agent_engines.create`.
+
+Ranges are returned column-wise to keep the payload small for the model:
+{"amount": 1.0, "base": "IDR", "dates": ["2024-01-02", ...],
+ "rates": {"USD": [0.000064, ...], "SGD": [...]}}
+"""
+
+import datetime
+import functools
+import time
+
+import numpy as np
+import pandas as pd
+import requests
+from decouple import config
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from lib.fx_store import FRANKFURTER_URL, lookup, lookup_series, split_codes
+
+TIMEOUT = 10
+CACHE_SIZE = 512
+LATEST_TTL = config("FX_LATEST_TTL", default=300, cast=int)
+RETRIES = 3
+BACKOFF_FACTOR = 0.3
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+_sessions = {}
+_recent = {}
+
+
+def _get_session() -> requests.Session:
+    """Returns the pooled session, created on first use so the tool stays picklable."""
+    if "session" not in _sessions:
+        retry = Retry(
+            total=RETRIES,
+            backoff_factor=BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=["GET"],
+            raise_on_status=False,
+        )
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _sessions["session"] = session
+    return _sessions["session"]
+
+
+def _send(period: str, base: str, symbols: str) -> requests.Response:
+    """Sends one Frankfurter request."""
+    return _get_session().get(
+        f"{FRANKFURTER_URL}/{period}", params={"from": base, "to": symbols}, timeout=TIMEOUT
+    )
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _fetch_published(period: str, base: str, symbols: str) -> dict:
+    """Fetches rates that can no longer change. Errors are raised, so they are not cached."""
+    response = _send(period, base, symbols)
+    response.raise_for_status()
+    return response.json()
+
+
+def _fetch_recent(period: str, base: str, symbols: str) -> dict:
+    """Fetches rates that may still change, kept for LATEST_TTL seconds when successful."""
+    key = (period, base, symbols)
+    now = time.monotonic()
+    cached = _recent.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+    response = _send(period, base, symbols)
+    data = response.json()
+    if response.ok:
+        for expired in [k for k, (expires, _) in _recent.items() if expires <= now]:
+            _recent.pop(expired, None)
+        _recent[key] = (now + LATEST_TTL, data)
+    return data
+
+
+def clear_cache():
+    """Empties the response caches."""
+    _fetch_published.cache_clear()
+    _recent.clear()
+
+
+def _fetch(period: str, base: str, symbols: str, published: bool) -> dict:
+    """Fetches rates through the cache matching whether they are published."""
+    if not published:
+        return _fetch_recent(period, base, symbols)
+    try:
+        return _fetch_published(period, base, symbols)
+    except requests.HTTPError as error:
+        try:
+            return error.response.json()
+        except ValueError:
+            return {"message": str(error)}
+
+
+def to_columnar(time_series: dict) -> dict:
+    """Converts a Frankfurter time series response to the columnar format."""
+    if "rates" not in time_series:
+        return time_series
+    dates = sorted(time_series["rates"])
+    symbols = sorted({code for day in time_series["rates"].values() for code in day})
+    return {
+        "amount": time_series.get("amount", 1.0),
+        "base": time_series.get("base"),
+        "dates": dates,
+        "rates": {
+            code: [time_series["rates"][date].get(code) for date in dates] for code in symbols
+        },
+    }
+
+
+def cross_rate_matrix(result: dict) -> pd.DataFrame:
+    """
+    Computes every cross rate from the rates of one base currency.
+
+    Args:
+        result: The rates of one base currency on one date, as returned by
+            `get_exchange_rate`.
+
+    Returns:
+        pd.DataFrame: The rate converting one unit of the row currency to the column
+            currency, for the base and every currency in `result`.
+    """
+    codes = [result["base"], *result["rates"]]
+    values = np.array([1.0, *result["rates"].values()])
+    return pd.DataFrame(np.divide.outer(values, values).T, index=codes, columns=codes)
+
+
+def _to_date(value: str) -> datetime.date:
+    """Converts "latest" or a YYYY-MM-DD string to a date."""
+    if value in ("", "latest"):
+        return datetime.date.today()
+    return datetime.date.fromisoformat(value)
+
+
+def get_exchange_rate(
+    currency_from: str = "USD",
+    currency_to: str = "EUR",
+    currency_date: str = "latest",
+    end_date: str = "",
+    days: int = 0,
+):
+    """Retrieves exchange rates from one currency to one or more currencies.
+
+    Answers a single date, or every business day of a date range in one call.
+    Use one call for a whole basket of currencies or a whole period instead of
+    one call per currency or per day.
+
+    Args:
+        currency_from: The base currency (3-letter currency code).
+            Defaults to "USD" (US Dollar).
+        currency_to: The target currencies, as one 3-letter currency code or
+            several separated by commas, e.g. "USD,SGD,JPY".
+            Defaults to "EUR" (Euro).
+        currency_date: The date for which to retrieve the exchange rate, or the
+            first date of a range. Defaults to "latest" for the most recent
+            exchange rate data. Can be specified in YYYY-MM-DD format for
+            historical rates.
+        end_date: The last date of a range in YYYY-MM-DD format, or "latest".
+            Leave empty for a single date.
+        days: The length of a range in calendar days, ending on and
+            including `currency_date` ("latest" for today). Use it for questions like "over the last
+            30 days". Leave 0 for a single date.
+
+    Returns:
+        dict: For a single date, the rates on that date.
+            Example: {"amount": 1.0, "base": "USD", "date": "2023-11-24",
+                "rates": {"EUR": 0.95534, "JPY": 149.5}}
+            For a range, the business days and one list of rates per currency.
+            Example: {"amount": 1.0, "base": "USD",
+                "dates": ["2023-11-23", "2023-11-24"],
+                "rates": {"EUR": [0.9154, 0.95534]}}
+    """
+    symbols = ",".join(split_codes(currency_to))
+    today = datetime.date.today()
+
+    if days or end_date:
+        if days:
+            end = _to_date(currency_date)
+            start = end - datetime.timedelta(days=int(days) - 1)
+        else:
+            start, end = _to_date(currency_date), _to_date(end_date)
+        end = min(end, today)
+        rates = lookup_series(currency_from, symbols, start, end)
+        if rates is not None:
+            return rates
+        period = f"{start.isoformat()}..{end.isoformat()}"
+        return to_columnar(_fetch(period, currency_from, symbols, end < today))
+
+    rates = lookup(currency_from, symbols, currency_date)
+    if rates is not None:
+        return rates
+    published = currency_date != "latest" and _to_date(currency_date) < today
+    return _fetch(currency_date, currency_from, symbols, published)
@@ -0,0 +1,224 @@
+"""
+Persistent store for documents extracted by the finance demos.
+
+Every extraction is written to an embedded SQLite database, indexed by file hash, party
+(supplier name, NPWP or employee ID), document number and document date. The raw model output
+is kept next to the normalized record, so pages can skip Gemini for files they have already
+seen and the history can be queried and exported without re-extracting anything.
+
+A file can be extracted in several modes, e.g. as one invoice or split into several. Each row
+records its mode and the number of records the run expected, so a page only reuses a run of
+the same mode that stored every record, see `find_complete_run`.
+"""
+
+import datetime
+import hashlib
+import json
+import sqlite3
+import threading
+
+import streamlit as st
+from decouple import config
+
+EXTRACTION_STORE_PATH = config("EXTRACTION_STORE_PATH", default="extractions.db")
+
+DOC_TYPE_INVOICE = "invoice"
+DOC_TYPE_E_BUPOT = "e-bupot"
+DOC_TYPE_CLAIM = "employee-claim"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extractions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    doc_type TEXT NOT NULL,
+    file_hash TEXT NOT NULL,
+    party TEXT,
+    document_number TEXT,
+    document_date TEXT,
+    extraction_mode TEXT,
+    expected_count INTEGER,
+    raw_output TEXT,
+    record TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_extractions_hash ON extractions (doc_type, file_hash);
+CREATE INDEX IF NOT EXISTS idx_extractions_party ON extractions (doc_type, party);
+CREATE INDEX IF NOT EXISTS idx_extractions_number ON extractions (doc_type, document_number);
+CREATE INDEX IF NOT EXISTS idx_extractions_date ON extractions (doc_type, document_date);
+"""
+
+_DATE_FORMATS = ["%Y-%m-%d", "%d-%b-%Y", "%d-%m-%Y"]
+
+
+def file_hash(file_content: bytes) -> str:
+    """Returns the SHA-256 hex digest used to recognize a file."""
+    return hashlib.sha256(file_content).hexdigest()
+
+
+def to_iso_date(value):
+    """
+    Converts the date formats produced by the finance demos to YYYY-MM-DD.
+
+    Returns None when the value is missing or not a known date format.
+    """
+    if not value:
+        return None
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(str(value), date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+class ExtractionStore:
+    """Thread-safe wrapper around the SQLite extraction database."""
+
+    def __init__(self, path: str = EXTRACTION_STORE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def save(
+        self,
+        doc_type: str,
+        p_file_hash: str,
+        record: dict,
+        raw_output: str = None,
+        party: str = None,
+        document_number: str = None,
+        document_date: str = None,
+        extraction_mode: str = None,
+        expected_count: int = None,
+    ) -> int:
+        """
+        Writes one extracted record.
+
+        Args:
+            doc_type: One of the DOC_TYPE_* constants.
+            p_file_hash: The hash of the source file, see `file_hash`.
+            record: The normalized record shown to the user.
+            raw_output: The raw model output, if the record came from Gemini.
+            party: Supplier name, NPWP or employee ID.
+            document_number: Invoice number, e-Bupot number or report title.
+            document_date: The document date, in any format accepted by `to_iso_date`.
+            extraction_mode: How the file was extracted, e.g. "single" or "multiple".
+            expected_count: The number of records the extraction run produced, including
+                failed ones that are not stored.
+
+        Returns:
+            int: The row ID of the stored record.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO extractions (doc_type, file_hash, party, document_number, "
+                "document_date, extraction_mode, expected_count, raw_output, record, "
+                "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    doc_type,
+                    p_file_hash,
+                    party,
+                    document_number,
+                    to_iso_date(document_date),
+                    extraction_mode,
+                    expected_count,
+                    raw_output,
+                    json.dumps(record, ensure_ascii=False),
+                    datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                ),
+            )
+            return cursor.lastrowid
+
+    def find_by_hash(self, doc_type: str, p_file_hash: str) -> list:
+        """Returns the records previously extracted from the same file, in document order."""
+        return self._select(
+            "doc_type = ? AND file_hash = ? ORDER BY id ASC", (doc_type, p_file_hash)
+        )
+
+    def find_complete_run(self, doc_type: str, p_file_hash: str, extraction_mode: str) -> list:
+        """
+        Returns the records of an earlier extraction of the same file in the same mode, or an
+        empty list when there is none or some of its records failed and were not stored.
+        """
+        rows = self._select(
+            "doc_type = ? AND file_hash = ? AND extraction_mode = ? ORDER BY id ASC",
+            (doc_type, p_file_hash, extraction_mode),
+        )
+        if not rows or len(rows) != rows[0]["expected_count"]:
+            return []
+        return rows
+
+    def delete_run(self, doc_type: str, p_file_hash: str, extraction_mode: str):
+        """Deletes the records of earlier extractions of a file in a mode, before a new run."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM extractions WHERE doc_type = ? AND file_hash = ? "
+                "AND extraction_mode = ?",
+                (doc_type, p_file_hash, extraction_mode),
+            )
+
+    def find_by_document_number(self, doc_type: str, document_number: str) -> list:
+        """Returns the records previously extracted with exactly the same document number."""
+        if not document_number:
+            return []
+        return self._select(
+            "doc_type = ? AND document_number = ? ORDER BY id DESC", (doc_type, document_number)
+        )
+
+    def query(
+        self,
+        doc_type: str = None,
+        party: str = None,
+        document_number: str = None,
+        date_from: datetime.date = None,
+        date_to: datetime.date = None,
+        include_undated: bool = True,
+        limit: int = 1000,
+    ) -> list:
+        """
+        Runs a filtered query over the stored records.
+
+        Text filters on party and document number match substrings, case-insensitively.
+        Records whose document date could not be parsed match any date range unless
+        `include_undated` is False.
+
+        Returns:
+            list: Dictionaries with the indexed columns and the decoded `record`.
+        """
+        clauses, params = [], []
+        if doc_type:
+            clauses.append("doc_type = ?")
+            params.append(doc_type)
+        if party:
+            clauses.append("party LIKE ?")
+            params.append(f"%{party}%")
+        if document_number:
+            clauses.append("document_number LIKE ?")
+            params.append(f"%{document_number}%")
+        undated = " OR document_date IS NULL" if include_undated else ""
+        if date_from:
+            clauses.append(f"(document_date >= ?{undated})")
+            params.append(date_from.isoformat())
+        if date_to:
+            clauses.append(f"(document_date <= ?{undated})")
+            params.append(date_to.isoformat())
+        where = " AND ".join(clauses) if clauses else "1 = 1"
+        return self._select(
+            f"{where} ORDER BY document_date DESC, id DESC LIMIT ?", (*params, limit)
+        )
+
+    def _select(self, condition: str, params: tuple) -> list:
+        """Selects rows matching a condition and decodes the stored records."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM extractions WHERE {condition}", params
+            ).fetchall()
+        return [{**dict(row), "record": json.loads(row["record"])} for row in rows]
+
+
+@st.cache_resource
+def get_extraction_store():
+    """Returns a cached, process-wide extraction store."""
+    return ExtractionStore()
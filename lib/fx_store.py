@@ -0,0 +1,325 @@
+"""
+Local store of historical ECB reference rates.
+
+Rates are kept as a dense calendar-date x currency array of EUR-based rates, saved with NumPy
+and memory-mapped on load, so a lookup is two array reads and a division. Every calendar day
+holds the latest ECB fixing on or before it, as the Frankfurter API answers, up to
+MAX_FILL_DAYS after the fixing, which covers weekends and holidays without reviving
+discontinued currencies. Cross rates are computed through EUR and rounded to
+SIGNIFICANT_DIGITS significant digits, so small rates such as IDR to USD keep their precision.
+
+The store is filled once from the ECB history file (`bulk_load`) and kept current with the
+Frankfurter time series API (`update`), see `scripts/update_fx_store.py`. Lookups outside the
+stored range return None, so callers can fall back to the API.
+"""
+
+import datetime
+import functools
+import io
+import json
+import os
+import pathlib
+import zipfile
+
+import numpy as np
+import pandas as pd
+import requests
+from decouple import config
+
+FX_STORE_DIR = config("FX_STORE_DIR", default=".cache/fx")
+ECB_HISTORY_URL = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-hist.zip"
+FRANKFURTER_URL = config("FRANKFURTER_URL", default="https://api.frankfurter.app")
+BASE = "EUR"
+MAX_FILL_DAYS = 7
+LATEST_MAX_AGE_DAYS = 4  # "latest" is answered locally only from a store this recent
+TIMEOUT = 30
+SIGNIFICANT_DIGITS = 6
+
+_RATES_FILE = "rates.npy"
+_OBSERVED_FILE = "observed.npy"
+_META_FILE = "meta.json"
+
+
+def read_ecb_history(source) -> pd.DataFrame:
+    """
+    Reads the ECB history file, zipped or not, from a URL, a path or bytes.
+
+    Returns:
+        pd.DataFrame: EUR-based rates indexed by fixing date, one column per currency, with
+            NaN where the ECB published no rate.
+    """
+    if isinstance(source, str) and source.startswith(("http://", "https://")):
+        response = requests.get(source, timeout=TIMEOUT)
+        response.raise_for_status()
+        source = response.content
+    if isinstance(source, (str, pathlib.Path)):
+        source = pathlib.Path(source).read_bytes()
+    if zipfile.is_zipfile(io.BytesIO(source)):
+        with zipfile.ZipFile(io.BytesIO(source)) as archive:
+            source = archive.read(archive.namelist()[0])
+    frame = pd.read_csv(io.BytesIO(source), na_values=["N/A"], skipinitialspace=True)
+    frame = frame.loc[:, ~frame.columns.str.startswith("Unnamed")]
+    frame.columns = [column.strip() for column in frame.columns]
+    frame["Date"] = pd.to_datetime(frame["Date"]).dt.date
+    return frame.set_index("Date").sort_index().astype(float)
+
+
+def split_codes(codes: str) -> list:
+    """Splits a comma-separated list of currency codes."""
+    return [code.strip().upper() for code in codes.split(",") if code.strip()]
+
+
+def significant(value: float, digits: int = SIGNIFICANT_DIGITS) -> float:
+    """Rounds a rate to a number of significant digits."""
+    return float(f"{value:.{digits}g}")
+
+
+def _to_date(value) -> datetime.date:
+    """Converts a YYYY-MM-DD string or a date to a date."""
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value))
+
+
+class FxStore:
+    """Memory-mapped EUR-based reference rates, one row per calendar day."""
+
+    def __init__(self, directory: str = FX_STORE_DIR):
+        self._directory = pathlib.Path(directory)
+        meta = json.loads((self._directory / _META_FILE).read_text(encoding="utf-8"))
+        self.start = datetime.date.fromisoformat(meta["start"])
+        self.currencies = meta["currencies"]
+        self._columns = {code: i for i, code in enumerate(self.currencies)}
+        self._rates = np.load(self._directory / _RATES_FILE, mmap_mode="r")
+        self._observed = np.load(self._directory / _OBSERVED_FILE, mmap_mode="r")
+        self.end = self.start + datetime.timedelta(days=len(self._rates) - 1)
+
+    @staticmethod
+    def exists(directory: str = FX_STORE_DIR) -> bool:
+        """Returns True when a store has been written to the directory."""
+        return (pathlib.Path(directory) / _META_FILE).exists()
+
+    def _row(self, date) -> int:
+        """Returns the row of a date, or -1 outside the stored range."""
+        offset = (_to_date(date) - self.start).days
+        return offset if 0 <= offset < len(self._rates) else -1
+
+    def rate(self, currency_from: str, currency_to: str, date):
+        """
+        Returns the rate converting one unit of `currency_from` to `currency_to`.
+
+        Args:
+            currency_from: The base currency code.
+            currency_to: The target currency code.
+            date: The date, as a date or YYYY-MM-DD string.
+
+        Returns:
+            tuple: The rate and the date of the fixing it comes from, or None if the store
+                has no rate for either currency on that date.
+        """
+        row = self._row(date)
+        column_from = self._columns.get(currency_from.upper())
+        column_to = self._columns.get(currency_to.upper())
+        if row < 0 or column_from is None or column_to is None:
+            return None
+        value = self._rates[row, column_to] / self._rates[row, column_from]
+        if np.isnan(value):
+            return None
+        observed = self.start + datetime.timedelta(days=int(self._observed[row]))
+        return float(value), observed
+
+    def rates(self, base: str, targets: list, date):
+        """
+        Returns rates in the format of the Frankfurter API, or None if any is missing.
+
+        Example: {"amount": 1.0, "base": "USD", "date": "2023-11-24", "rates": {"EUR": 0.9}}
+        """
+        found = {}
+        observed = None
+        for target in targets:
+            result = self.rate(base, target, date)
+            if result is None:
+                return None
+            found[target.upper()] = significant(result[0])
+            observed = result[1]
+        return {
+            "amount": 1.0,
+            "base": base.upper(),
+            "date": observed.isoformat() if observed else str(date),
+            "rates": found,
+        }
+
+    def series(self, base: str, targets: list, start, end):
+        """
+        Returns the fixings between two dates, in the columnar format of `lib.exchange_rate`.
+
+        Returns:
+            dict: The fixing dates and one list of rates per target, or None if the store
+                does not cover the whole range for every currency.
+        """
+        first, last = self._row(start), self._row(end)
+        columns = [self._columns.get(code.upper()) for code in [base, *targets]]
+        if first < 0 or last < 0 or first > last or None in columns:
+            return None
+        rows = np.arange(first, last + 1)
+        fixed = rows[np.asarray(self._observed[first:last + 1]) == rows]
+        block = self._rates[fixed][:, columns]
+        values = block[:, 1:] / block[:, :1]
+        if np.isnan(values).any():
+            return None
+        return {
+            "amount": 1.0,
+            "base": base.upper(),
+            "dates": [(self.start + datetime.timedelta(days=int(i))).isoformat() for i in fixed],
+            "rates": {
+                code.upper(): [significant(value) for value in values[:, i]]
+                for i, code in enumerate(targets)
+            },
+        }
+
+    def active_currencies(self) -> list:
+        """Returns the currencies with a rate on the last stored day."""
+        last = np.asarray(self._rates[-1])
+        return [code for code, value in zip(self.currencies, last) if not np.isnan(value)]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Returns the fixings in the store, as read by `read_ecb_history`."""
+        fixed = np.asarray(self._observed) == np.arange(len(self._observed))
+        dates = [self.start + datetime.timedelta(days=int(i)) for i in np.flatnonzero(fixed)]
+        frame = pd.DataFrame(
+            np.asarray(self._rates)[fixed], index=dates, columns=self.currencies
+        )
+        return frame.drop(columns=[BASE])
+
+
+def _write_atomic(path: pathlib.Path, write):
+    """Writes a file through a temporary file so readers never see partial content."""
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "wb") as file:
+        write(file)
+    os.replace(tmp, path)
+
+
+def write_store(fixings: pd.DataFrame, directory: str = FX_STORE_DIR):
+    """
+    Writes EUR-based fixings to a store, forward-filling the days between fixings.
+
+    Args:
+        fixings: Rates indexed by fixing date, one column per currency, as returned by
+            `read_ecb_history`.
+        directory: The store directory.
+    """
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    fixings = fixings.sort_index()
+    fixings = fixings.loc[:, fixings.columns != BASE]
+    currencies = [BASE, *fixings.columns]
+    start, end = fixings.index[0], fixings.index[-1]
+    days = (end - start).days + 1
+
+    offsets = np.array([(date - start).days for date in fixings.index])
+    values = np.column_stack([np.ones(len(fixings)), fixings.to_numpy(dtype=float)])
+    # Each calendar day points to the latest fixing on or before it.
+    latest = np.searchsorted(offsets, np.arange(days), side="right") - 1
+    observed = offsets[latest].astype(np.int32)
+    rates = values[latest]
+    rates[np.arange(days) - observed > MAX_FILL_DAYS] = np.nan
+
+    meta = {"start": start.isoformat(), "currencies": currencies, "last_fixing": end.isoformat()}
+    _write_atomic(directory / _RATES_FILE, lambda file: np.save(file, rates))
+    _write_atomic(directory / _OBSERVED_FILE, lambda file: np.save(file, observed))
+    _write_atomic(directory / _META_FILE, lambda file: file.write(json.dumps(meta).encode()))
+    _load_fx_store.cache_clear()
+
+
+def bulk_load(source: str = ECB_HISTORY_URL, directory: str = FX_STORE_DIR):
+    """Builds the store from the full ECB history file."""
+    write_store(read_ecb_history(source), directory)
+
+
+def fetch_fixings(start: datetime.date, end: datetime.date = None) -> pd.DataFrame:
+    """Fetches EUR-based fixings for a date range from the Frankfurter time series API."""
+    period = f"{start.isoformat()}..{end.isoformat() if end else ''}"
+    response = requests.get(
+        f"{FRANKFURTER_URL}/{period}", params={"from": BASE}, timeout=TIMEOUT
+    )
+    response.raise_for_status()
+    rates = response.json()["rates"]
+    frame = pd.DataFrame.from_dict(rates, orient="index").astype(float)
+    frame.index = [datetime.date.fromisoformat(date) for date in frame.index]
+    return frame
+
+
+def update(directory: str = FX_STORE_DIR) -> int:
+    """
+    Appends the fixings published since the last one in the store.
+
+    Returns:
+        int: The number of new fixings.
+    """
+    store = FxStore(directory)
+    existing = store.to_frame()
+    last = existing.index[-1]
+    new = fetch_fixings(last + datetime.timedelta(days=1))
+    new = new[new.index > last]
+    if new.empty:
+        return 0
+    write_store(pd.concat([existing, new]), directory)
+    return len(new)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_fx_store(directory: str, _modified: int) -> FxStore:
+    """Loads a store, once per directory and modification time of its metadata."""
+    return FxStore(directory)
+
+
+def load_fx_store(directory: str = FX_STORE_DIR):
+    """
+    Returns the store in a directory, or None if there is none. The store is loaded once and
+    reloaded after `scripts/update_fx_store.py` rewrites it, also in another process.
+    """
+    if not FxStore.exists(directory):
+        return None
+    return _load_fx_store(directory, (pathlib.Path(directory) / _META_FILE).stat().st_mtime_ns)
+
+
+def lookup(currency_from: str, currency_to: str, currency_date: str):
+    """
+    Looks up a rate in the local store.
+
+    Args:
+        currency_from: The base currency code.
+        currency_to: One target currency code, or several separated by commas.
+        currency_date: "latest" or a date in YYYY-MM-DD format.
+
+    Returns:
+        dict: The rates in the format of the Frankfurter API, or None when the store is
+            missing or does not cover the request.
+    """
+    store = load_fx_store()
+    if store is None:
+        return None
+    today = datetime.date.today()
+    date = today if currency_date == "latest" else _to_date(currency_date)
+    if store.end < date <= today:
+        # Days after the last fixing are only answered while the store is current, otherwise
+        # the API may know newer fixings.
+        if (today - store.end).days > LATEST_MAX_AGE_DAYS:
+            return None
+        date = store.end
+    return store.rates(currency_from, split_codes(currency_to), date)
+
+
+def lookup_series(currency_from: str, currency_to: str, start_date: str, end_date: str):
+    """
+    Looks up the fixings between two dates in the local store.
+
+    Returns:
+        dict: The rates in the columnar format of `lib.exchange_rate`, or None when the store
+            is missing or does not cover the whole range.
+    """
+    store = load_fx_store()
+    if store is None:
+        return None
+    return store.series(currency_from, split_codes(currency_to), start_date, end_date)
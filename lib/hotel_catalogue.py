@@ -0,0 +1,237 @@
+"""
+Bulk tagging of a hotel catalogue.
+
+Hotels go through scrape -> tag -> top tags in a two-stage pipeline. Scraping and image
+preparation run in one thread pool and Gemini calls in another, so each gets its own
+concurrency limit. A semaphore bounds how many scraped hotels may wait for Gemini, so a fast
+scraper cannot run ahead of the model. Each result is appended to a JSONL file as soon as the
+hotel completes. That file is also the checkpoint: hotels already tagged in it are skipped on
+restart, and failed hotels are retried.
+
+With a tag state store, only the reviews and images not tagged in earlier runs are sent to
+Gemini and the new tags are merged into the stored ones, see `lib.tag_state`. The store is
+then the checkpoint instead: every hotel is scraped again, also when the output file already
+holds a result for it, and a hotel without new material costs no Gemini call.
+"""
+
+import json
+import pathlib
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from lib.hotel_images import covered_urls, prepare_images, to_parts
+from lib.hotel_tags import MAX_REVIEWS_PER_CALL, get_tags, get_top_tags, parse_tagging
+from lib.jalan_scraper import REVIEW_BUDGET, scrape
+
+SCRAPE_WORKERS = 4
+GEMINI_WORKERS = 8
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+
+_HOTEL_ID_PATTERN = re.compile(r"(?:yad)?(\d+)", re.IGNORECASE)
+
+
+def hotel_id(value: str) -> str:
+    """Returns the Jalan hotel ID, such as "yad306452", of a hotel ID or URL."""
+    value = value.strip()
+    match = re.search(r"yad(\d+)", value, re.IGNORECASE) or _HOTEL_ID_PATTERN.fullmatch(value)
+    if match is None:
+        raise ValueError(f"Not a Jalan hotel ID or URL: '{value}'.")
+    return f"yad{match.group(1)}"
+
+
+def hotel_url(value: str) -> str:
+    """Returns the Jalan hotel page URL of a hotel ID or URL."""
+    return f"https://www.jalan.net/{hotel_id(value)}/"
+
+
+def read_hotel_list(path: str) -> list:
+    """Reads hotel IDs or URLs, one per line, ignoring blanks, comments and repeats."""
+    lines = pathlib.Path(path).read_text(encoding="utf-8").splitlines()
+    values = [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+    return list(dict.fromkeys(hotel_id(value) for value in values))
+
+
+def read_results(path: str) -> dict:
+    """Returns the latest result per hotel ID from a JSONL output file."""
+    results = {}
+    path = pathlib.Path(path)
+    if not path.exists():
+        return results
+    with path.open(encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:  # a line cut short by an interrupted run
+                continue
+            results[record["hotel_id"]] = record
+    return results
+
+
+def completed_hotels(path: str) -> set:
+    """Returns the IDs of the hotels tagged successfully in a JSONL output file."""
+    return {
+        key for key, record in read_results(path).items() if record["status"] == STATUS_OK
+    }
+
+
+def export_parquet(jsonl_path: str, parquet_path: str):
+    """Writes the latest result per hotel from a JSONL output file to Parquet."""
+    records = list(read_results(jsonl_path).values())
+    frame = pd.DataFrame(records)
+    for column in ("top_tags", "tags"):
+        if column in frame:
+            frame[column] = frame[column].map(
+                lambda value: json.dumps(value, ensure_ascii=False) if value else None
+            )
+    frame.to_parquet(parquet_path, index=False)
+
+
+class CatalogueJob:
+    """Runs the tagging pipeline over a list of hotels, writing results as they complete."""
+
+    def __init__(
+        self,
+        output_path: str,
+        scrape_workers: int = SCRAPE_WORKERS,
+        gemini_workers: int = GEMINI_WORKERS,
+        review_budget: int = REVIEW_BUDGET,
+        state_store=None,
+    ):
+        self._output_path = pathlib.Path(output_path)
+        self._workers = {"scrape": scrape_workers, "gemini": gemini_workers}
+        self._review_budget = review_budget
+        self._state_store = state_store
+        self._write_lock = threading.Lock()
+        self._started_at = None
+        self.stats = {"ok": 0, "error": 0, "skipped": 0}
+
+    def throughput(self) -> float:
+        """Returns the hotels completed per minute since the job started."""
+        if self._started_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self._started_at
+        return (self.stats["ok"] + self.stats["error"]) / elapsed * 60 if elapsed else 0.0
+
+    def _write(self, record: dict, on_result):
+        """Appends a result to the output file and reports it."""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._write_lock:
+            with self._output_path.open("a", encoding="utf-8") as file:
+                file.write(line)
+            self.stats[record["status"]] += 1
+        if on_result is not None:
+            on_result(record)
+
+    def _scrape(self, key: str) -> dict:
+        """Scrapes a hotel and prepares its images."""
+        s_time = time.monotonic()
+        data = scrape(hotel_url(key), self._review_budget)
+        data["total_reviews"] = len(data["reviews"])
+        if self._state_store is not None:
+            data["reviews"], data["image_urls"] = self._state_store.new_material(
+                key, data["reviews"], data["image_urls"]
+            )
+        # Reviews left out are tagged on a later run when there is a tag state store.
+        data["reviews"] = data["reviews"][:MAX_REVIEWS_PER_CALL]
+        images, image_stats = prepare_images(data["image_urls"])
+        return {
+            **data,
+            "images": images,
+            "image_stats": image_stats,
+            "scrape_seconds": round(time.monotonic() - s_time, 3),
+        }
+
+    def _tag(self, key: str, data: dict) -> dict:
+        """Tags a scraped hotel and ranks its top tags."""
+        s_time = time.monotonic()
+        tagging = {"hotel_name": data["hotel_name"], "tags": {"image": [], "review": []}}
+        prompt_tokens = 0
+        if data["reviews"] or data["images"]:
+            response = get_tags(data["hotel_name"], to_parts(data["images"]), data["reviews"])
+            tagging = parse_tagging(response.text)
+            if tagging is None:
+                raise ValueError("Gemini returned no tags or incomplete tags")
+            prompt_tokens = response.usage_metadata.prompt_token_count
+        if self._state_store is not None:
+            tagging = self._state_store.merge(
+                key, data["hotel_name"], tagging["tags"], data["reviews"],
+                covered_urls(data["images"]),
+            )
+        return {
+            "hotel_id": key,
+            "url": hotel_url(key),
+            "status": STATUS_OK,
+            "hotel_name": data["hotel_name"],
+            "top_tags": get_top_tags(tagging)["tags"],
+            "tags": tagging["tags"],
+            "review_count": data["total_reviews"],
+            "new_review_count": len(data["reviews"]),
+            "image_count": data["image_stats"]["selected"],
+            "prompt_tokens": prompt_tokens,
+            "scrape_seconds": data["scrape_seconds"],
+            "tag_seconds": round(time.monotonic() - s_time, 3),
+            "completed_at": time.time(),
+        }
+
+    def _error(self, key: str, stage: str, error: Exception) -> dict:
+        """Returns the result recorded for a failed hotel."""
+        return {
+            "hotel_id": key,
+            "url": hotel_url(key),
+            "status": STATUS_ERROR,
+            "error": f"{stage}: {type(error).__name__}: {error}",
+            "completed_at": time.time(),
+        }
+
+    def run(self, hotels: list, on_result=None) -> dict:
+        """
+        Tags the hotels not yet tagged in the output file, or all hotels with a tag state
+        store.
+
+        Args:
+            hotels: Hotel IDs or URLs.
+            on_result: An optional callable receiving each result as it is written.
+
+        Returns:
+            dict: Counts of hotels tagged, failed and skipped.
+        """
+        keys = list(dict.fromkeys(hotel_id(value) for value in hotels))
+        done = set() if self._state_store is not None else completed_hotels(self._output_path)
+        todo = [key for key in keys if key not in done]
+        self.stats["skipped"] = len(keys) - len(todo)
+        self._started_at = time.monotonic()
+
+        # Bounds how many scraped hotels may wait for Gemini.
+        pending_tagging = threading.BoundedSemaphore(self._workers["gemini"] * 2)
+        tag_futures = []
+        tag_futures_lock = threading.Lock()
+        with ThreadPoolExecutor(max_workers=self._workers["gemini"]) as tag_executor:
+
+            def tag_stage(key: str, data: dict):
+                try:
+                    self._write(self._tag(key, data), on_result)
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    self._write(self._error(key, "tag", error), on_result)
+                finally:
+                    pending_tagging.release()
+
+            def scrape_stage(key: str):
+                try:
+                    data = self._scrape(key)
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    self._write(self._error(key, "scrape", error), on_result)
+                    return
+                pending_tagging.acquire()  # pylint: disable=consider-using-with
+                with tag_futures_lock:
+                    tag_futures.append(tag_executor.submit(tag_stage, key, data))
+
+            with ThreadPoolExecutor(max_workers=self._workers["scrape"]) as scrape_executor:
+                wait([scrape_executor.submit(scrape_stage, key) for key in todo])
+            wait(tag_futures)
+
+        return dict(self.stats)
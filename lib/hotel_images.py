@@ -0,0 +1,155 @@
+"""
+Image ingestion for hotel tagging.
+
+Galleries often hold dozens of photos, many of them near-duplicates. Sending every URL to
+Gemini inflates input tokens and latency. This stage downloads the gallery concurrently,
+drops near-duplicates by perceptual hash (dHash) and keeps the most diverse images. It then
+downscales them to a resolution that is still enough for tagging and returns compact inline
+JPEG parts.
+"""
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from google.genai import types
+from PIL import Image, UnidentifiedImageError
+from requests import RequestException
+
+from lib.jalan_scraper import fetch_bytes
+
+MAX_IMAGES = 12
+MAX_SIDE = 768  # pixels
+JPEG_QUALITY = 80
+DUPLICATE_DISTANCE = 6  # Hamming distance between 64-bit hashes
+MAX_WORKERS = 8
+
+
+def dhash(image: Image.Image, size: int = 8) -> int:
+    """Returns the 64-bit difference hash of an image."""
+    pixels = np.asarray(image.convert("L").resize((size + 1, size)), dtype=np.int16)
+    value = 0
+    for bit in (pixels[:, :-1] > pixels[:, 1:]).flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    """Returns the number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+def _load(url: str):
+    """Downloads and decodes an image, returning None on failure or when it is too large."""
+    try:
+        image = Image.open(io.BytesIO(fetch_bytes(url)))
+        image.load()
+        return image
+    except (RequestException, UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        return None
+
+
+def dedupe(items: list) -> list:
+    """
+    Drops images whose hash is within DUPLICATE_DISTANCE of an earlier image.
+
+    Returns:
+        list: The images kept, each with the `duplicate_urls` dropped as its near-duplicates.
+    """
+    kept = []
+    for item in items:
+        original = next(
+            (other for other in kept
+             if hamming(item["hash"], other["hash"]) <= DUPLICATE_DISTANCE),
+            None,
+        )
+        if original is None:
+            kept.append({**item, "duplicate_urls": []})
+        else:
+            original["duplicate_urls"].append(item["url"])
+    return kept
+
+
+def select_diverse(items: list, limit: int) -> list:
+    """
+    Greedily picks the images farthest from the ones already picked.
+
+    The first gallery image is kept first, since it is usually the hero shot.
+    """
+    if len(items) <= limit:
+        return items
+    selected = [items[0]]
+    remaining = items[1:]
+    while len(selected) < limit:
+        best = max(
+            remaining,
+            key=lambda item: min(hamming(item["hash"], s["hash"]) for s in selected),
+        )
+        selected.append(best)
+        remaining.remove(best)
+    return sorted(selected, key=lambda item: item["index"])
+
+
+def to_jpeg(image: Image.Image) -> bytes:
+    """Downscales an image to MAX_SIDE and encodes it as JPEG."""
+    image = image.convert("RGB")
+    image.thumbnail((MAX_SIDE, MAX_SIDE))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def prepare_images(image_urls: list, max_images: int = MAX_IMAGES):
+    """
+    Runs the image stage on a gallery.
+
+    Args:
+        image_urls: The gallery image URLs, in page order.
+        max_images: The maximum number of images to send to the model.
+
+    Returns:
+        tuple: The selected images as dicts with `url`, `data` (JPEG bytes) and the
+            `duplicate_urls` dropped in their favour, and stats about the stage.
+    """
+    unique_urls = list(dict.fromkeys(image_urls))
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        images = list(executor.map(_load, unique_urls))
+
+    items = [
+        {"index": index, "url": url, "image": image, "hash": dhash(image)}
+        for index, (url, image) in enumerate(zip(unique_urls, images))
+        if image is not None
+    ]
+    unique = dedupe(items)
+    selected = select_diverse(unique, max_images)
+    prepared = [
+        {
+            "url": item["url"],
+            "data": to_jpeg(item["image"]),
+            "duplicate_urls": item["duplicate_urls"],
+        }
+        for item in selected
+    ]
+    stats = {
+        "gallery": len(image_urls),
+        "downloaded": len(items),
+        "near_duplicates": len(items) - len(unique),
+        "selected": len(prepared),
+        "bytes": sum(len(item["data"]) for item in prepared),
+    }
+    return prepared, stats
+
+
+def covered_urls(images: list) -> list:
+    """
+    Returns the URLs of prepared images and of the near-duplicates dropped in their favour.
+
+    Tagging the prepared images also covers their near-duplicates, so both can be recorded as
+    tagged.
+    """
+    return [url for item in images for url in [item["url"], *item["duplicate_urls"]]]
+
+
+def to_parts(images: list) -> list:
+    """Returns inline parts for prepared images."""
+    return [types.Part.from_bytes(data=item["data"], mime_type="image/jpeg") for item in images]
@@ -0,0 +1,312 @@
+"""
+Hotel tag generation with Gemini.
+
+A single schema-constrained call tags the reviews and images of a hotel. The top tags are then
+ranked locally from those tags, instead of sending the whole tag list back to the model in a
+second call. The second call is kept as `get_top_tags_with_model` so the two can be compared,
+see `scripts/benchmark_hotel_tags.py`.
+"""
+
+import json
+import unicodedata
+
+from google.genai import types
+
+from lib.vertex_ai import get_vertex_ai_client
+
+MODEL = "gemini-2.0-flash-exp"
+TOP_TAGS = 5
+MIN_SCORE = 3  # mentions scored at or below this do not count towards a top tag
+CROSS_SOURCE_BONUS = 0.5  # extra weight for tags seen in both reviews and images
+# At roughly 120 output tokens of review tags per review, this leaves room for the image tags
+# within max_output_tokens. Longer outputs are cut short and are no longer valid JSON.
+MAX_REVIEWS_PER_CALL = 50
+
+SAFETY_SETTINGS = [
+    types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
+    types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
+    types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
+    types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
+]
+
+_TAG_PROPERTIES = {
+    "tag_name": {"type": "STRING"},
+    "tag_score": {"type": "INTEGER", "minimum": 1, "maximum": 5},
+}
+TAGS_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "hotel_name": {"type": "STRING"},
+        "tags": {
+            "type": "OBJECT",
+            "properties": {
+                "image": {
+                    "type": "ARRAY",
+                    "items": {
+                        "type": "OBJECT",
+                        "properties": _TAG_PROPERTIES,
+                        "required": ["tag_name", "tag_score"],
+                    },
+                },
+                "review": {
+                    "type": "ARRAY",
+                    "items": {
+                        "type": "OBJECT",
+                        "properties": {"review_title": {"type": "STRING"}, **_TAG_PROPERTIES},
+                        "required": ["review_title", "tag_name", "tag_score"],
+                        "property_ordering": ["review_title", "tag_name", "tag_score"],
+                    },
+                },
+            },
+            "required": ["image", "review"],
+        },
+    },
+    "required": ["hotel_name", "tags"],
+}
+
+tags_config = types.GenerateContentConfig(
+    temperature=0.2,
+    top_p=0.95,
+    max_output_tokens=8192,
+    response_modalities=["TEXT"],
+    response_mime_type="application/json",
+    response_schema=TAGS_RESPONSE_SCHEMA,
+    safety_settings=SAFETY_SETTINGS,
+)
+top_tags_config = types.GenerateContentConfig(
+    temperature=1,
+    top_p=0.95,
+    max_output_tokens=8192,
+    response_modalities=["TEXT"],
+    safety_settings=SAFETY_SETTINGS,
+)
+
+
+def get_tags_prompt(hotel_name: str, reviews: list) -> str:
+    """Returns the tagging prompt for a hotel."""
+    return f"""
+<instructions>
+あなたは、オンライン旅行代理店 (OTA) でホテル、ヴィラ、リゾートを強調し、宣伝するための説明的なタグを生成する専門の旅行ボットです。
+これらのタグは、レビューの内容と画像に基づいて作成されます。
+あなたのタスクは、関連する日本のホテル関連のタグを抽出し、各タグを、それぞれのソース (レビューまたは画像) 内の感情と詳細に基づいて1から5のスケールで評価することです。
+あなたの応答は常に日本語でなければなりません。以下のタグ付けとスコアリングのルールに従ってください。
+</instructions>
+
+<tags_rules>
+タグの形式: タグは日本語のenum形式でなければなりません（例：朝食、部屋の広さ）。タグ自体は中立でなければならず、感情はスコアで示されます（例：朝食を低いスコアで使用し、不満な朝食は使用しない）。具体的で明確である必要があります（例：ショッピングへの近さをショッピングの代わりに）。粒度が細かく、冗長にならないようにします（例：屋外スイミングプールをスイミングプールの代わりに。プールとスイミングプールは避けてください）。各タグは単独で成立するほど記述的である必要があります。
+
+タグの内容: ホテルの施設、部屋の設備とアメニティ、ホテルのサービス、および部屋から見える特別なアトラクション*（特定のランドマークの眺めを含む）*など、画像と記事からのホテル関連のすべての側面を含めます。旅行の適合性、近さ、雰囲気、デザイン、ホテルの眺め、ユーザーの意図、および外部または季節のイベントを含めます。すべての旅行テーマとセグメント（例：ステイケーション、家族、ビジネス、ロマンチック、季節の旅行）を含めます。非常に具体的またはありそうもない外部イベント（例：テイラースイフトのコンサート）のタグは作成しないでください。
+
+データソースの処理: 画像を視覚的な手がかりとして使用して、注目すべきランドマークや特定の眺めを含む詳細なホテルの特徴を特定します。仮定はしないでください。タグは事実に基づいた観察可能な情報に基づいていなければなりません。不一致の場合には、記事からの情報を優先してください。スコアを含む記事ごとにタグを生成します。すべての画像に対して一度タグを生成します。レビューのタグが記事または画像で説明または表示されている場合は、そのタグを生成します。
+
+タグ生成ロジック: 複数のデータソースで言及または紹介されているタグを特定することを目指します。異なるソースで同じ側面を指す場合は、同じタグ名を使用してください。既存のリストにない、新しい関連タグを生成します。
+</tags_rules>
+
+<tags_scoring_rules>
+スコアリング (1-5):
+1: 非常に否定的/状態が悪い
+2: 否定的
+3: 中立
+4: 肯定的
+5: 素晴らしい
+
+タグは、タグが由来するソースのみに基づいてスコアリングしてください。同じタグであっても、記事と画像ソースに対して別々のスコアを維持してください。
+</tags_scoring_rules>
+
+<output_format>
+画像のタグは "tags.image" に、レビューのタグはレビューのタイトルとともに "tags.review" に出力してください。
+</output_format>
+
+Hotel name: {hotel_name}
+
+Reviews: {reviews}
+
+Images:"""
+
+
+def _tags_contents(hotel_name: str, image_parts: list, reviews: list) -> list:
+    """Returns the contents of a tagging request."""
+    return [
+        types.Content(
+            role="user",
+            parts=[
+                types.Part.from_text(text=get_tags_prompt(hotel_name, reviews)),
+                *image_parts,
+            ]
+        )
+    ]
+
+
+def get_tags(hotel_name: str, image_parts: list, reviews: list):
+    """
+    Generates tags for a hotel based on its name, images, and reviews using Google Gemini.
+
+    Args:
+        hotel_name: The name of the hotel.
+        image_parts: A list of parts holding the hotel's images.
+        reviews: A list of reviews for the hotel, at most MAX_REVIEWS_PER_CALL.
+
+    Returns:
+        GenerateContentResponse: The response, whose text is JSON following
+            TAGS_RESPONSE_SCHEMA.
+    """
+    return get_vertex_ai_client().models.generate_content(
+        model=MODEL,
+        contents=_tags_contents(hotel_name, image_parts, reviews),
+        config=tags_config,
+    )
+
+
+def get_tags_stream(hotel_name: str, image_parts: list, reviews: list):
+    """
+    Streams the tags of a hotel, see `get_tags`.
+
+    Returns:
+        Iterator[GenerateContentResponse]: The response chunks. Their texts add up to the
+            JSON document and the last one carries the usage metadata.
+    """
+    return get_vertex_ai_client().models.generate_content_stream(
+        model=MODEL,
+        contents=_tags_contents(hotel_name, image_parts, reviews),
+        config=tags_config,
+    )
+
+
+def normalize_tag(tag_name: str) -> str:
+    """Returns the key under which spellings of the same tag are aggregated."""
+    return "".join(unicodedata.normalize("NFKC", tag_name).split()).lower()
+
+
+def rank_tags(tags: dict) -> list:
+    """
+    Ranks the tags of a hotel across sources.
+
+    Each mention scored above MIN_SCORE adds `score - MIN_SCORE` to the weight of its tag, so
+    frequent and highly scored tags rank first and neutral or negative ones never do. Tags
+    seen in both reviews and images get CROSS_SOURCE_BONUS on top.
+
+    Args:
+        tags: The "tags" object of a tagging response, with "image" and "review" lists.
+
+    Returns:
+        list: Dicts with `tag_name`, `weight`, `mentions`, `mean_score` and `sources`, best
+            first. The most frequent spelling is kept as the tag name.
+    """
+    groups = {}
+    for source in ("image", "review"):
+        for mention in tags.get(source) or []:
+            name = (mention.get("tag_name") or "").strip()
+            if not name:
+                continue
+            group = groups.setdefault(
+                normalize_tag(name), {"names": {}, "scores": [], "sources": set()}
+            )
+            group["names"][name] = group["names"].get(name, 0) + 1
+            group["scores"].append(int(mention.get("tag_score") or MIN_SCORE))
+            group["sources"].add(source)
+
+    ranked = []
+    for group in groups.values():
+        weight = sum(max(score - MIN_SCORE, 0) for score in group["scores"])
+        if len(group["sources"]) > 1:
+            weight *= 1 + CROSS_SOURCE_BONUS
+        ranked.append({
+            "tag_name": max(group["names"], key=group["names"].get),
+            "weight": weight,
+            "mentions": len(group["scores"]),
+            "mean_score": round(sum(group["scores"]) / len(group["scores"]), 2),
+            "sources": sorted(group["sources"]),
+        })
+    ranked.sort(key=lambda tag: (-tag["weight"], -tag["mean_score"], tag["tag_name"]))
+    return [tag for tag in ranked if tag["weight"] > 0]
+
+
+def get_top_tags(tagging: dict, top_n: int = TOP_TAGS) -> dict:
+    """
+    Returns the top tags of a hotel, in the format of the previous top tags call.
+
+    Args:
+        tagging: The parsed tagging response.
+        top_n: The number of tags to keep.
+
+    Returns:
+        dict: The hotel name and the top tags as `tag_1` to `tag_n`.
+    """
+    ranked = rank_tags(tagging.get("tags") or {})[:top_n]
+    return {
+        "hotel_name": tagging.get("hotel_name", ""),
+        "tags": {f"tag_{i}": tag["tag_name"] for i, tag in enumerate(ranked, start=1)},
+    }
+
+
+def get_top_tags_with_model(hotel_name: str, tags: str):
+    """
+    Generates top tags with a second Gemini call, as the page did before local ranking.
+
+    Args:
+        hotel_name: The name of the hotel.
+        tags: A JSON string containing all generated tags.
+
+    Returns:
+        GenerateContentResponse: The response, whose text is a JSON string containing the top
+            tags.
+    """
+    text1 = types.Part.from_text(text=f"""
+<instruction>
+あなたは、オンライン旅行代理店 (OTA) 向けの旅行ボットで、ホテル、ヴィラ、リゾートの最も魅力的なセールスポイントを特定することに特化しています。あなたのタスクは、レビューから抽出されたユーザー生成のタグのリストを分析し、ホテルの独自の価値提案を最もよく表し、潜在的な顧客を予約に誘うトップ5のタグを選択することです。選択されたこれらのタグは、モバイルアプリ内の商品カードにラベルとして表示されます。ホテルを特別なものにする本質を捉えることを目指し、際立っていて望ましい特徴を強調するタグを優先してください。ゲストエクスペリエンス、アメニティ、ロケーションの利点、全体的な雰囲気などの要素を考慮してください。より具体的で影響力のある代替案が存在する場合は、一般的なタグの選択を避けてください。
+</instruction>
+
+<output_format>
+出力は、次のJSON形式で記述してください。
+{{
+    "hotel_name": "...",
+    "tags": {{
+        "tag_1": "...",
+        "tag_2": "...",
+        "tag_3": "...",
+        "tag_4": "...",
+        "tag_5": "..."
+    }}
+}}
+JSONの結果のみを出力し、マークダウン形式や余分なテキストは含めないでください。出力タグが入力タグと同じ大文字の列挙形式であることを確認してください。
+</output_format>
+
+Hotel name: {hotel_name}
+Tags:
+{tags}
+""")
+    contents = [types.Content(role="user", parts=[text1])]
+    return get_vertex_ai_client().models.generate_content(
+        model=MODEL,
+        contents=contents,
+        config=top_tags_config,
+    )
+
+
+def parse_json(text: str) -> dict:
+    """Parses a JSON response, tolerating a surrounding markdown code fence."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1].rsplit("```", 1)[0]
+    return json.loads(text)
+
+
+def parse_tagging(text: str):
+    """
+    Parses a tagging response.
+
+    Returns:
+        dict: The tagging, or None when the response is empty or not valid JSON, e.g. because
+            it was cut short at max_output_tokens.
+    """
+    try:
+        return parse_json(text) if text.strip() else None
+    except json.JSONDecodeError:
+        return None
+
+
+def agreement(top_tags: dict, other_top_tags: dict) -> float:
+    """Returns the share of top tags two results have in common, after normalization."""
+    ours = {normalize_tag(tag) for tag in top_tags["tags"].values()}
+    theirs = {normalize_tag(tag) for tag in other_top_tags["tags"].values()}
+    return len(ours & theirs) / max(len(ours), len(theirs), 1)
@@ -0,0 +1,156 @@
+"""
+On-disk HTTP cache with conditional revalidation.
+
+Responses are stored on disk keyed by URL. Within the TTL they are served without touching
+the network. After that they are revalidated with If-None-Match/If-Modified-Since, and a 304
+reuses the stored body. Parsed results can be cached next to them, keyed by the parser and a
+hash of the page content, so an unchanged page is not parsed again either. At most
+`max_parsed` parsed results are kept, the least recently used are removed first.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
+
+
+def _sha256(value) -> str:
+    """Returns the SHA-256 hex digest of a string or bytes."""
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return hashlib.sha256(value).hexdigest()
+
+
+def _write_atomic(path: pathlib.Path, data: bytes):
+    """Writes a file through a temporary file so readers never see partial content."""
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as tmp:
+        tmp.write(data)
+    os.replace(tmp.name, path)
+
+
+class HttpCache:
+    """Disk-backed cache for GET responses and for results parsed from them."""
+
+    def __init__(self, directory: str, ttl_seconds: int, max_parsed: int = 2000):
+        self._directory = pathlib.Path(directory)
+        (self._directory / "responses").mkdir(parents=True, exist_ok=True)
+        (self._directory / "parsed").mkdir(parents=True, exist_ok=True)
+        self._ttl_seconds = ttl_seconds
+        self._max_parsed = max_parsed
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "revalidated": 0,
+            "misses": 0,
+            "bytes_saved": 0,
+            "parse_hits": 0,
+            "parse_misses": 0,
+            "parse_evictions": 0,
+        }
+
+    def _count(self, key: str, amount: int = 1):
+        """Increments a stats counter."""
+        with self._lock:
+            self.stats[key] += amount
+
+    def hit_rate(self) -> float:
+        """Returns the share of fetches served without downloading the body."""
+        served = self.stats["hits"] + self.stats["revalidated"]
+        total = served + self.stats["misses"]
+        return served / total if total else 0.0
+
+    def fetch(self, url: str, send) -> str:
+        """
+        Returns the decoded body of a URL, from the cache when possible.
+
+        Args:
+            url: The URL to fetch.
+            send: A callable taking the URL and extra request headers and returning a
+                `requests.Response`. It is only called when the cache is stale or empty.
+
+        Returns:
+            str: The decoded response body.
+        """
+        key = _sha256(url)
+        meta_path = self._directory / "responses" / f"{key}.json"
+        body_path = self._directory / "responses" / f"{key}.body"
+        meta = None
+        if meta_path.exists() and body_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if time.time() - meta["fetched_at"] < self._ttl_seconds:
+                body = body_path.read_bytes()
+                self._count("hits")
+                self._count("bytes_saved", len(body))
+                return body.decode(meta["encoding"], errors="replace")
+
+        headers = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        response = send(url, headers)
+
+        if meta and response.status_code == 304:
+            body = body_path.read_bytes()
+            meta["fetched_at"] = time.time()
+            _write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+            self._count("revalidated")
+            self._count("bytes_saved", len(body))
+            return body.decode(meta["encoding"], errors="replace")
+
+        response.raise_for_status()
+        body = response.content
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "encoding": response.apparent_encoding or "utf-8",
+            "fetched_at": time.time(),
+        }
+        _write_atomic(body_path, body)
+        _write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+        self._count("misses")
+        return body.decode(meta["encoding"], errors="replace")
+
+    def parse(self, kind: str, content: str, parse_fn):
+        """
+        Returns `parse_fn(content)`, cached on disk by content hash.
+
+        Args:
+            kind: A name for the parser, including its backend, so different parsers of one
+                page do not collide.
+            content: The page content.
+            parse_fn: A function returning a JSON-serializable result.
+        """
+        path = self._directory / "parsed" / f"{kind}-{_sha256(content)}.json"
+        try:
+            result = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)  # marks the entry as recently used
+            self._count("parse_hits")
+            return result
+        except FileNotFoundError:
+            pass
+        result = parse_fn(content)
+        _write_atomic(path, json.dumps(result, ensure_ascii=False).encode("utf-8"))
+        self._count("parse_misses")
+        self._evict_parsed()
+        return result
+
+    def _evict_parsed(self):
+        """Removes the least recently used parsed results beyond `max_parsed`."""
+        paths = list((self._directory / "parsed").glob("*.json"))
+        if len(paths) <= self._max_parsed:
+            return
+        entries = []
+        for path in paths:
+            with contextlib.suppress(FileNotFoundError):
+                entries.append((path.stat().st_mtime, path))
+        entries.sort()
+        for _, path in entries[:len(entries) - self._max_parsed]:
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
+                self._count("parse_evictions")
@@ -0,0 +1,107 @@
+"""
+Tokenization and light stemming of Indonesian text for keyword search.
+
+The stemmer is rule-based and dictionary-free: it strips particles (-lah, -kah, -pun), the
+possessive -nya, derivational suffixes (-kan, -an, -i) and prefixes (di-, ke-, se-, ber-,
+ter-, per-, and meN-/peN- with their sound changes, so "menyetor" and "penyetoran" both
+become "setor"). Nouns formed with pe-, per- or ke- take -an rather than -kan, so
+"perpajakan" becomes "pajak". Without a dictionary some roots come out wrong, but the
+same rules apply to documents and queries, so words of one family still match. Rules are
+skipped when they would leave fewer than MIN_STEM letters, which keeps short roots such as
+"bulan" or "setor" intact.
+"""
+
+import re
+import unicodedata
+
+MIN_STEM = 4
+
+STOPWORDS = frozenset(
+    """
+    ada adalah agar akan aku anda apa apakah atas atau bagaimana bagi bahwa banyak begitu
+    belum berapa bisa boleh dalam dan dapat dari dengan di dia ialah ini itu jika juga kalau
+    kami kamu kapan ke kepada maka mana masih mereka oleh pada para saat saja sama sampai
+    saya se sebagai secara sedang sehingga sejak semua seperti siapa sudah supaya tanpa
+    telah tentang tersebut tetapi tidak untuk yaitu yakni yang
+    """.split()
+)
+
+_WORD = re.compile(r"\w+(?:-\w+)*")
+_VOWELS = frozenset("aeiou")
+_PARTICLES = ("lah", "kah", "pun")
+_POSSESSIVES = ("nya",)
+_VERB_SUFFIXES = ("kan", "an")
+_NOUN_SUFFIXES = ("an",)
+_NOUN_PREFIXES = ("pe", "ke")
+_PREFIXES = ("di", "ke", "se", "ber", "ter", "per", "me", "pe")
+
+
+def _strip_suffix(word: str, suffixes: tuple) -> str:
+    """Strips the first matching suffix, unless the rest would be too short."""
+    for suffix in suffixes:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[: -len(suffix)]
+    return word
+
+
+def _strip_nasal_prefix(word: str) -> str:
+    """Strips a meN- or peN- prefix, restoring the initial sound it replaced."""
+    rest = word[2:]
+    if rest.startswith("ny") and rest[2:3] in _VOWELS:
+        return "s" + rest[2:]
+    if rest.startswith("ng"):
+        return rest[2:]
+    if rest.startswith("m"):
+        return "p" + rest[1:] if rest[1:2] in _VOWELS else rest[1:]
+    if rest.startswith("n"):
+        return "t" + rest[1:] if rest[1:2] in _VOWELS else rest[1:]
+    return rest
+
+
+def _strip_prefix(word: str) -> tuple:
+    """Strips one prefix. Returns the rest and the prefix, or the word and None."""
+    for prefix in _PREFIXES:
+        if not word.startswith(prefix):
+            continue
+        rest = _strip_nasal_prefix(word) if prefix in ("me", "pe") else word[len(prefix):]
+        if len(rest) >= MIN_STEM:
+            return rest, prefix
+    return word, None
+
+
+def stem(word: str) -> str:
+    """Returns the stem of a lowercase Indonesian word."""
+    if len(word) <= MIN_STEM or not word.isalpha():
+        return word
+    word = _strip_suffix(word, _PARTICLES)
+    word = _strip_suffix(word, _POSSESSIVES)
+    suffixes = _NOUN_SUFFIXES if word.startswith(_NOUN_PREFIXES) else _VERB_SUFFIXES
+    suffixed = _strip_suffix(word, suffixes)
+    rest, prefix = _strip_prefix(suffixed)
+    if prefix is None:
+        return suffixed
+    if suffixed == word and word.endswith("i") and len(rest) > MIN_STEM:
+        rest = rest[:-1]  # -i only follows a prefix, as in "dikenai" or "memenuhi"
+    if word.startswith(("memper", "diper")):
+        second, second_prefix = _strip_prefix(rest)
+        if second_prefix == "per":
+            rest = second
+    return rest
+
+
+def tokenize(text: str) -> list:
+    """
+    Splits a text into stemmed search terms.
+
+    Text is NFKC-normalized and lowercased, stopwords are dropped, and hyphenated words are
+    joined ("e-Bupot" becomes "ebupot") except for reduplications ("pajak-pajak" becomes
+    "pajak"). Numbers are kept, so "PPh 21" gives "pph" and "21".
+    """
+    terms = []
+    for word in _WORD.findall(unicodedata.normalize("NFKC", text).casefold()):
+        parts = word.split("-")
+        word = parts[0] if len(set(parts)) == 1 else "".join(parts)
+        if word in STOPWORDS:
+            continue
+        terms.append(stem(word))
+    return terms
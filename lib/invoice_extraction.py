@@ -0,0 +1,234 @@
+"""
+Invoice data extraction with Gemini.
+
+A single call extracts the fields of one invoice as printed, and `lib.invoice_normalization`
+normalizes the amounts and dates locally. A PDF holding several invoices is split first: the
+page ranges come from the page text layer, or, for scanned PDFs, from a lightweight
+schema-constrained model pass. Each invoice is then extracted concurrently.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from google.genai import types
+
+from lib.document_handles import get_document_part
+from lib.invoice_normalization import normalize_invoice
+from lib.invoice_splitter import detect_invoice_boundaries, get_page_texts, split_pdf
+from lib.vertex_ai import get_vertex_ai_client
+
+MODEL = "gemini-2.0-flash-001"
+MAX_WORKERS = 10
+DETECTION_MAX_OUTPUT_TOKENS = 4096  # about 200 page ranges
+REQUIRED_FIELDS = ["Invoice No.", "Invoice Date", "Invoice Amount (including VAT)"]
+
+DETECTION_TEXT_LAYER = "text layer"
+DETECTION_MODEL = "model"
+DETECTION_FALLBACK = "one page per invoice"
+
+EXTRACTION_PROMPT = """
+    Extract the following information from the provided invoice image(s).
+    If a field is not present or cannot be reliably determined, leave it blank.
+    Copy amounts and dates exactly as printed on the invoice, including separators and
+    Buddhist Era years. Do not convert or reformat them.
+
+    Extracted Information:
+    * Supplier Name: (String) The trading name prominently displayed on the invoice.
+    * Supplier Legal Name: (String) The full, legally registered name of the supplier, including the branch.
+    * Invoice Date: (String) The date the invoice was issued.
+    * Invoice No.: (String) The unique identifier for the invoice).
+    * Invoice Currency: (String) The currency the invoice is denominated in, usually follows the language -- VND, THB, IDR, etc.
+    * Invoice Amount (excluding VAT): (String) The total value of goods/services before VAT/tax.
+    * Invoice Service Charge: (String) If any, find the service charge amount in the invoice.
+    * Invoice VAT Amount: (String) The total amount of VAT/tax charged.
+    * Invoice Amount (including VAT): (String) The final total amount due, including VAT/tax.
+
+    Return the result in JSON format.
+    ```
+    {
+        "Supplier Name": "...",
+        "Supplier Legal Name": "...",
+        "Invoice Date": "...",
+        "Invoice No.": "...",
+        "Invoice Currency": "IDR/THB/VND/...",
+        "Invoice Amount (excluding VAT)": "...",
+        "Invoice Service Charge": "...",
+        "Invoice VAT Amount": "...",
+        "Invoice Amount (including VAT)": "..."
+    }
+    ```
+    """
+
+DETECTION_PROMPT = """
+    The provided PDF contains one or more invoices. List the pages of each invoice.
+    Page numbers start at 1. Do not extract any other information.
+    """
+
+PAGE_RANGES_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "start_page": {"type": "INTEGER", "minimum": 1},
+            "end_page": {"type": "INTEGER", "minimum": 1},
+        },
+        "required": ["start_page", "end_page"],
+        "property_ordering": ["start_page", "end_page"],
+    },
+}
+
+generate_content_config = types.GenerateContentConfig(
+    temperature=0.2,
+    top_p=0.8,
+    max_output_tokens=1024,
+    response_modalities=["TEXT"],
+    safety_settings=[types.SafetySetting(
+        category="HARM_CATEGORY_HATE_SPEECH",
+        threshold="OFF"
+    ), types.SafetySetting(
+        category="HARM_CATEGORY_DANGEROUS_CONTENT",
+        threshold="OFF"
+    ), types.SafetySetting(
+        category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        threshold="OFF"
+    ), types.SafetySetting(
+        category="HARM_CATEGORY_HARASSMENT",
+        threshold="OFF"
+    )],
+    response_mime_type = "application/json",
+)
+
+detection_config = types.GenerateContentConfig(
+    **{
+        **generate_content_config.model_dump(exclude_none=True),
+        "max_output_tokens": DETECTION_MAX_OUTPUT_TOKENS,
+        "response_schema": PAGE_RANGES_RESPONSE_SCHEMA,
+    }
+)
+
+
+def generate_multimodal(file_content, mime_type, prompt: str = EXTRACTION_PROMPT):
+    """Generates extracted data using the Gemini multimodal model."""
+    contents = [
+        types.Content(
+            role="user",
+            parts=[
+                types.Part.from_text(text=prompt),
+                get_document_part(file_content, mime_type)
+            ]
+        )
+    ]
+    return get_vertex_ai_client().models.generate_content(
+        model=MODEL,
+        contents=contents,
+        config=generate_content_config,
+    )
+
+
+def parse_page_ranges(text: str, page_count: int):
+    """
+    Converts the page ranges returned by the detection pass to zero-based tuples.
+
+    Returns:
+        list: Inclusive, zero-based (start_page, end_page) tuples, or None when the text is
+            not a valid list of ranges within the document, e.g. because it was cut short.
+    """
+    try:
+        ranges = [(r["start_page"] - 1, r["end_page"] - 1) for r in json.loads(text)]
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return None
+    if not ranges or any(not 0 <= start <= end < page_count for start, end in ranges):
+        return None
+    return ranges
+
+
+def detect_invoice_pages(file_content, page_count: int):
+    """
+    Lightweight first pass that finds the page range of each invoice in a scanned PDF.
+
+    Returns:
+        list: Inclusive, zero-based (start_page, end_page) tuples, one per invoice, or None
+            when the model output is not a valid list of ranges.
+    """
+    response = get_vertex_ai_client().models.generate_content(
+        model=MODEL,
+        contents=[
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part.from_text(text=DETECTION_PROMPT),
+                    get_document_part(file_content, "application/pdf")
+                ]
+            )
+        ],
+        config=detection_config,
+    )
+    return parse_page_ranges(response.text, page_count)
+
+
+def detect_ranges(file_content) -> tuple:
+    """
+    Finds the page range of each invoice in a PDF.
+
+    The ranges come from the page text layer, or from a model pass when the PDF is scanned.
+    When the model output is unusable, every page is taken as one invoice.
+
+    Returns:
+        tuple: Inclusive, zero-based (start_page, end_page) tuples, and the DETECTION_*
+            method that produced them.
+    """
+    page_texts = get_page_texts(file_content)
+    if any(text.strip() for text in page_texts):
+        return detect_invoice_boundaries(page_texts), DETECTION_TEXT_LAYER
+    ranges = detect_invoice_pages(file_content, len(page_texts))
+    if ranges is None:
+        return [(page, page) for page in range(len(page_texts))], DETECTION_FALLBACK
+    return ranges, DETECTION_MODEL
+
+
+def extract_invoice(file_content, mime_type):
+    """
+    Extracts and normalizes a single invoice.
+
+    Returns:
+        tuple: The invoice record (or an error record) and the model response.
+    """
+    response = generate_multimodal(file_content, mime_type)
+    try:
+        # Amounts and dates are normalized locally instead of by the model.
+        return normalize_invoice(json.loads(response.text)), response
+    except json.JSONDecodeError:
+        return {"error": "Could not parse extracted data as JSON.", "raw": response.text}, response
+
+
+def extract_invoices(file_content, ranges: list):
+    """
+    Splits a multi-invoice PDF and extracts every invoice in parallel.
+
+    Args:
+        file_content: The PDF content as bytes.
+        ranges: The page range of each invoice, as returned by `detect_ranges`.
+
+    Returns:
+        tuple: One invoice record per range, in document order, and the raw model output of
+            each record.
+    """
+    parts = split_pdf(file_content, ranges)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = list(executor.map(lambda part: extract_invoice(part, "application/pdf"), parts))
+    records = [record for record, _ in results]
+    for (start, end), record in zip(ranges, records):
+        record["Pages"] = f"{start + 1}-{end + 1}"
+    return records, [response.text for _, response in results]
+
+
+def completeness(records):
+    """Returns the share of required fields that were filled across invoice records."""
+    filled = 0
+    for record in records:
+        for field in REQUIRED_FIELDS:
+            value = record.get(field)
+            if isinstance(value, dict):
+                value = value["normalized_value"]
+            filled += 1 if value else 0
+    return filled / (len(records) * len(REQUIRED_FIELDS)) if records else 0
@@ -0,0 +1,193 @@
+"""
+Deterministic normalization of raw values extracted from invoices.
+
+The invoice prompt only asks Gemini for the strings as printed on the document. Thousand
+separators, Thai digits and Buddhist Era dates are resolved here, which keeps the model output
+short and the normalization rules consistent across runs.
+"""
+
+import datetime
+import re
+
+# Decimal separator used by each locale. The other separator is the thousands separator.
+DECIMAL_SEPARATORS = {
+    "IDR": ",",
+    "VND": ",",
+    "THB": ".",
+}
+DEFAULT_DECIMAL_SEPARATOR = "."
+ZERO_DECIMAL_CURRENCIES = {"IDR", "VND", "JPY", "KRW"}
+
+AMOUNT_FIELDS = [
+    "Invoice Amount (excluding VAT)",
+    "Invoice Service Charge",
+    "Invoice VAT Amount",
+    "Invoice Amount (including VAT)",
+]
+DATE_FIELDS = ["Invoice Date"]
+
+BUDDHIST_ERA_OFFSET = 543
+
+MONTHS = {
+    # English and Indonesian
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "mei": 5, "jun": 6, "jul": 7,
+    "aug": 8, "agu": 8, "agt": 8, "sep": 9, "oct": 10, "okt": 10, "nov": 11,
+    "dec": 12, "des": 12,
+    # Thai abbreviations and full names
+    "ม.ค.": 1, "ก.พ.": 2, "มี.ค.": 3, "เม.ย.": 4, "พ.ค.": 5, "มิ.ย.": 6,
+    "ก.ค.": 7, "ส.ค.": 8, "ก.ย.": 9, "ต.ค.": 10, "พ.ย.": 11, "ธ.ค.": 12,
+    "มกราคม": 1, "กุมภาพันธ์": 2, "มีนาคม": 3, "เมษายน": 4, "พฤษภาคม": 5, "มิถุนายน": 6,
+    "กรกฎาคม": 7, "สิงหาคม": 8, "กันยายน": 9, "ตุลาคม": 10, "พฤศจิกายน": 11, "ธันวาคม": 12,
+}
+MONTH_ABBR = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+              "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+_THAI_DIGITS = str.maketrans("๐๑๒๓๔๕๖๗๘๙", "0123456789")
+_VIETNAMESE_DATE = re.compile(
+    r"ng[àa]y\s*(\d{1,2})\s*th[áa]ng\s*(\d{1,2})\s*n[ăa]m\s*(\d{2,4})", re.IGNORECASE
+)
+_ISO_DATE = re.compile(r"(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})")
+_NUMERIC_DATE = re.compile(r"(\d{1,2})[-/.](\d{1,2})[-/.](\d{2,4})")
+_TEXT_DATE = re.compile(r"(\d{1,2})[\s\-]*([^\d\s\-,]+)[\s\-,]*(\d{2,4})")
+_MONTH_FIRST_DATE = re.compile(
+    r"([^\d\s\-,]+)[\s\-]*(\d{1,2})(?:st|nd|rd|th)?[\s\-,]+(\d{2,4})", re.IGNORECASE
+)
+
+
+def parse_amount(value, currency: str = None):
+    """
+    Parses an amount string using the separator conventions of the invoice currency.
+
+    Args:
+        value: The amount as printed, e.g. "1.234.567,89", "฿ 12,500.00" or "50.000 đ".
+        currency: The invoice currency code, used to resolve ambiguous separators.
+
+    Returns:
+        float | None: The parsed amount, or None when the value holds no number.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    text = str(value).translate(_THAI_DIGITS)
+    negative = text.strip().startswith("-") or "(" in text
+    digits = re.sub(r"[^\d.,]", "", text).strip(".,")
+    if not re.search(r"\d", digits):
+        return None
+
+    decimal_sep = DECIMAL_SEPARATORS.get((currency or "").upper(), DEFAULT_DECIMAL_SEPARATOR)
+    if "." in digits and "," in digits:
+        # The right-most separator is the decimal one.
+        decimal_sep = "." if digits.rfind(".") > digits.rfind(",") else ","
+    elif "." in digits or "," in digits:
+        sep = "." if "." in digits else ","
+        fraction = digits.rpartition(sep)[2]
+        if digits.count(sep) > 1:
+            decimal_sep = None
+        elif len(fraction) == 3:
+            # "12,500" or "1.500": thousands unless the locale uses it as decimal separator
+            # for a currency with minor units.
+            is_decimal = (
+                sep == decimal_sep
+                and (currency or "").upper() not in ZERO_DECIMAL_CURRENCIES
+            )
+            decimal_sep = sep if is_decimal else None
+        else:
+            decimal_sep = sep
+
+    if decimal_sep is None:
+        number = digits.replace(".", "").replace(",", "")
+    else:
+        thousands_sep = "," if decimal_sep == "." else "."
+        number = digits.replace(thousands_sep, "").replace(decimal_sep, ".")
+    try:
+        amount = float(number)
+    except ValueError:
+        return None
+    return -amount if negative else amount
+
+
+def _to_gregorian(year: int, currency: str = None) -> int:
+    """Converts Buddhist Era and two-digit years to a Gregorian year."""
+    if year < 100:
+        if (currency or "").upper() == "THB" and year >= 40:
+            return 2500 + year - BUDDHIST_ERA_OFFSET
+        return 2000 + year
+    if year >= 2400:
+        return year - BUDDHIST_ERA_OFFSET
+    return year
+
+
+def _month(name: str):
+    """Returns the number of a month name or abbreviation, or None."""
+    name = name.lower().rstrip(".") if name.isascii() else name.lower()
+    return MONTHS.get(name) or MONTHS.get(name[:3])
+
+
+def normalize_date(value, currency: str = None):
+    """
+    Normalizes an invoice date to DD-MMM-YYYY, converting Buddhist Era years.
+
+    Args:
+        value: The date as printed, e.g. "11/10/2566", "11 ต.ค. 2566", "11 Oct 2023" or
+            "Oct 11, 2023".
+        currency: The invoice currency code, used to interpret two-digit Thai years.
+
+    Returns:
+        str | None: The date in DD-MMM-YYYY format, or None when it cannot be parsed.
+    """
+    if not value:
+        return None
+    text = str(value).translate(_THAI_DIGITS).strip()
+
+    day = month = year = None
+    if match := _VIETNAMESE_DATE.search(text):
+        day, month, year = (int(g) for g in match.groups())
+    elif match := _ISO_DATE.search(text):
+        year, month, day = (int(g) for g in match.groups())
+    elif match := _NUMERIC_DATE.search(text):
+        # Invoices from the supported locales are day-first.
+        day, month, year = (int(g) for g in match.groups())
+    elif match := _TEXT_DATE.search(text):
+        month = _month(match.group(2))
+        day, year = int(match.group(1)), int(match.group(3))
+    if not month and (match := _MONTH_FIRST_DATE.search(text)):
+        month = _month(match.group(1))
+        day, year = int(match.group(2)), int(match.group(3))
+
+    if not (day and month and year):
+        return None
+    try:
+        date = datetime.date(_to_gregorian(year, currency), month, day)
+    except ValueError:
+        return None
+    return f"{date.day:02d}-{MONTH_ABBR[date.month - 1]}-{date.year}"
+
+
+def normalize_invoice(raw: dict) -> dict:
+    """
+    Expands the raw model output into extracted and normalized values.
+
+    Args:
+        raw: The model output, where amounts and dates are the strings as printed.
+
+    Returns:
+        dict: The invoice record with `extracted_value`/`normalized_value` pairs for each
+            amount and date field.
+    """
+    currency = raw.get("Invoice Currency")
+    record = dict(raw)
+    for field in DATE_FIELDS:
+        if field in raw:
+            record[field] = {
+                "extracted_value": raw[field],
+                "normalized_value": normalize_date(raw[field], currency),
+            }
+    for field in AMOUNT_FIELDS:
+        if field in raw:
+            record[field] = {
+                "extracted_value": raw[field],
+                "normalized_value": parse_amount(raw[field], currency),
+            }
+    return record
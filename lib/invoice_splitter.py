@@ -0,0 +1,81 @@
+"""
+Splits a PDF holding several invoices into one PDF per invoice.
+
+Boundaries are detected cheaply from the page text layer: a page starts a new invoice when it
+shows an invoice number different from the one the current invoice already showed, or a
+"page 1 of N" marker. Scanned PDFs have no text layer, in which case the caller should detect
+the boundaries with a lightweight model pass and use `split_pdf` with the returned page
+ranges.
+"""
+
+import io
+import re
+
+from pypdf import PdfReader, PdfWriter
+
+# Invoice number labels in the languages supported by the invoice demo.
+INVOICE_NUMBER_PATTERN = re.compile(
+    r"(?:invoice\s*(?:no\.?|number|#)|no\.?\s*invoice|nomor\s*(?:faktur|invoice)"
+    r"|s[oố]\s*h[oó]a\s*[dđ][oơ]n|เลขที่(?:ใบกำกับภาษี|ใบแจ้งหนี้))"
+    r"\s*[:.#]?\s*([A-Za-z0-9][\w/\-.]{2,})",
+    re.IGNORECASE,
+)
+FIRST_PAGE_PATTERN = re.compile(
+    r"(?:page|halaman|trang|หน้า)\s*1\s*(?:of|dari|/|จาก)\s*\d+", re.IGNORECASE
+)
+
+
+def get_page_texts(file_content: bytes) -> list:
+    """Returns the text layer of each page in a PDF."""
+    reader = PdfReader(io.BytesIO(file_content))
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def detect_invoice_boundaries(page_texts: list) -> list:
+    """
+    Groups pages into invoices using the page text layer.
+
+    Args:
+        page_texts: The text of each page, as returned by `get_page_texts`.
+
+    Returns:
+        list: Inclusive, zero-based (start_page, end_page) tuples, one per invoice.
+    """
+    ranges = []
+    current_number = None
+    for index, text in enumerate(page_texts):
+        match = INVOICE_NUMBER_PATTERN.search(text)
+        number = match.group(1) if match else None
+        starts_invoice = index == 0 or FIRST_PAGE_PATTERN.search(text) is not None or (
+            number is not None and current_number is not None and number != current_number
+        )
+        if starts_invoice:
+            ranges.append([index, index])
+            current_number = number
+        else:
+            ranges[-1][1] = index
+            current_number = current_number or number
+    return [tuple(r) for r in ranges]
+
+
+def split_pdf(file_content: bytes, ranges: list) -> list:
+    """
+    Writes each page range of a PDF to a separate PDF.
+
+    Args:
+        file_content: The PDF file content as bytes.
+        ranges: Inclusive, zero-based (start_page, end_page) tuples.
+
+    Returns:
+        list: The PDF content of each range, as bytes.
+    """
+    reader = PdfReader(io.BytesIO(file_content))
+    parts = []
+    for start, end in ranges:
+        writer = PdfWriter()
+        for page in reader.pages[start:end + 1]:
+            writer.add_page(page)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        parts.append(buffer.getvalue())
+    return parts
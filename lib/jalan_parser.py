@@ -0,0 +1,131 @@
+"""
+Parsers for Jalan.net hotel and review pages.
+
+Only a handful of nodes are needed from each page, so the default backend hands lxml a filter
+that builds just those subtrees instead of the whole document. The backend is chosen with
+JALAN_PARSER:
+
+- "html.parser": full BeautifulSoup tree with the pure-Python parser (previous behavior).
+- "lxml": BeautifulSoup with lxml, only materializing the targeted nodes.
+- "selectolax": CSS selectors over the Lexbor parser. Requires the optional `selectolax`
+  package.
+
+All backends return the same output, see `scripts/benchmark_jalan_parsers.py`.
+"""
+
+import re
+
+from bs4 import BeautifulSoup
+from bs4.filter import ElementFilter
+from decouple import config
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # selectolax is an optional dependency
+    LexborHTMLParser = None
+
+PARSER = config("JALAN_PARSER", default="lxml")
+BACKENDS = ["html.parser", "lxml", "selectolax"]
+
+HOTEL_NAME_ID = "yado_header_hotel_name"
+IMAGE_CLASS = "jlnpc-slideImage__item--img"
+REVIEW_CLASS = "jlnpc-kuchikomiCassette__rightArea"
+REVIEW_TITLE_CLASS = "jlnpc-kuchikomiCassette__lead"
+REVIEW_BODY_CLASS = "jlnpc-kuchikomiCassette__postBody"
+
+_REVIEW_PAGE_PATTERN = re.compile(r"kuchikomi/(\d+)\.HTML", re.IGNORECASE)
+
+
+def _classes(attrs: dict) -> list:
+    """Returns the classes of a tag from its raw attributes."""
+    value = attrs.get("class") or []
+    return value.split() if isinstance(value, str) else list(value)
+
+
+class _TargetFilter(ElementFilter):
+    """Lets the parser build only the top-level subtrees accepted by a predicate."""
+
+    def __init__(self, predicate):
+        super().__init__()
+        self._predicate = predicate
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return self._predicate(name, attrs or {})
+
+    def allow_string_creation(self, string):
+        return False
+
+
+_HOTEL_PAGE_FILTER = _TargetFilter(
+    lambda name, attrs: name == "p" and IMAGE_CLASS in _classes(attrs)
+)
+_REVIEW_PAGE_FILTER = _TargetFilter(
+    lambda name, attrs: (
+        name == "div" and (attrs.get("id") == HOTEL_NAME_ID or REVIEW_CLASS in _classes(attrs))
+    ) or (
+        name == "a" and bool(_REVIEW_PAGE_PATTERN.search(attrs.get("href") or ""))
+    )
+)
+
+
+def _soup(html: str, backend: str, parse_only: ElementFilter) -> BeautifulSoup:
+    """Builds a BeautifulSoup tree for the html.parser and lxml backends."""
+    if backend == "html.parser":
+        return BeautifulSoup(html, 'html.parser')
+    return BeautifulSoup(html, 'lxml', parse_only=parse_only)
+
+
+def _check_backend(backend: str):
+    """Raises a ValueError for unknown or unavailable backends."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown parser backend '{backend}', expected one of {BACKENDS}.")
+    if backend == "selectolax" and LexborHTMLParser is None:
+        raise ValueError("The selectolax backend requires the selectolax package.")
+
+
+def parse_hotel_page(html: str, backend: str = PARSER) -> list:
+    """Returns the gallery image URLs of a hotel page."""
+    _check_backend(backend)
+    if backend == "selectolax":
+        tree = LexborHTMLParser(html)
+        return [node.attributes['src'] for node in tree.css(f"p.{IMAGE_CLASS} img")]
+
+    soup = _soup(html, backend, _HOTEL_PAGE_FILTER)
+    image_comps = soup.find_all("p", { 'class': IMAGE_CLASS })
+    return [i.find('img')['src'] for i in image_comps]
+
+
+def parse_review_page(html: str, backend: str = PARSER):
+    """
+    Parses a review page.
+
+    Returns:
+        tuple: The hotel name, the reviews on the page and the number of review pages.
+    """
+    _check_backend(backend)
+    if backend == "selectolax":
+        tree = LexborHTMLParser(html)
+        hotel_name = tree.css_first(f"#{HOTEL_NAME_ID} a").text()
+        reviews = [
+            {
+                'title': node.css_first(f"p.{REVIEW_TITLE_CLASS} a").text(),
+                'body': node.css_first(f"p.{REVIEW_BODY_CLASS}").text(),
+            }
+            for node in tree.css(f"div.{REVIEW_CLASS}")
+        ]
+        hrefs = [node.attributes.get('href') or "" for node in tree.css("a[href]")]
+    else:
+        soup = _soup(html, backend, _REVIEW_PAGE_FILTER)
+        hotel_name = soup.find("div", { 'id': HOTEL_NAME_ID }).find('a').text
+        reviews = []
+        for i in soup.find_all('div', { 'class': REVIEW_CLASS }):
+            reviews.append({
+                'title': (i.find('p', {'class': REVIEW_TITLE_CLASS})).find('a').text,
+                'body': (i.find('p', {'class': REVIEW_BODY_CLASS})).text,
+            })
+        hrefs = [link['href'] for link in soup.find_all('a', href=True)]
+
+    page_numbers = [
+        int(match.group(1)) for href in hrefs if (match := _REVIEW_PAGE_PATTERN.search(href))
+    ]
+    return hotel_name, reviews, max(page_numbers, default=1)
@@ -0,0 +1,145 @@
+"""
+Scraper for hotel pages and reviews on Jalan.net.
+
+Pages are fetched concurrently through a pooled keep-alive session. Each host gets a
+concurrency cap and a politeness delay between request starts. All paginated review pages are
+read, up to a review budget, so the tagging prompt sees more than the first page of reviews.
+Responses and parsed results are cached on disk, see `lib.http_cache` and `get_http_cache`.
+"""
+
+import contextlib
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+import requests
+import streamlit as st
+from decouple import config
+from requests.adapters import HTTPAdapter
+
+from lib.http_cache import HttpCache
+from lib.jalan_parser import PARSER, parse_hotel_page, parse_review_page
+
+HEADERS = {
+    'Referer': 'https://www.jalan.net/',
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)'
+        'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.127 Safari/537.36',
+}
+MAX_CONCURRENCY_PER_HOST = 4
+POLITENESS_DELAY = 0.2  # seconds between request starts on the same host
+IMAGE_POLITENESS_DELAY = 0.0  # gallery images are served by a CDN
+REVIEW_BUDGET = 100
+TIMEOUT = 10
+CACHE_DIR = config("JALAN_CACHE_DIR", default=".cache/jalan")
+CACHE_TTL = config("JALAN_CACHE_TTL", default=60 * 60, cast=int)
+PARSE_CACHE_SIZE = config("JALAN_PARSE_CACHE_SIZE", default=2000, cast=int)
+
+class HostLimiter:  # pylint: disable=too-few-public-methods
+    """Caps concurrent requests to a host and spaces out their start times."""
+
+    def __init__(self, max_concurrency: int, delay: float):
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._delay = delay
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Waits for a free slot and the politeness delay, then holds the slot."""
+        with self._semaphore:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._next_start - now
+                self._next_start = max(now, self._next_start) + self._delay
+            if wait > 0:
+                time.sleep(wait)
+            yield
+
+
+def _create_session() -> requests.Session:
+    """Creates a keep-alive session whose pool fits the per-host concurrency cap."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONCURRENCY_PER_HOST)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_session = _create_session()
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _get_limiter(url: str, delay: float = POLITENESS_DELAY) -> HostLimiter:
+    """Returns the limiter of the host of a URL, created with `delay` on first use."""
+    host = urlparse(url).netloc
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = HostLimiter(MAX_CONCURRENCY_PER_HOST, delay)
+        return _limiters[host]
+
+
+@st.cache_resource
+def get_http_cache() -> HttpCache:
+    """Returns a cached, process-wide cache of Jalan pages and their parsed results."""
+    return HttpCache(CACHE_DIR, CACHE_TTL, PARSE_CACHE_SIZE)
+
+
+def _send(url: str, headers: dict) -> requests.Response:
+    """Sends a GET through the shared session, honoring the host limits."""
+    with _get_limiter(url).slot():
+        return _session.get(url, headers=headers, timeout=TIMEOUT)
+
+
+def fetch(url: str) -> str:
+    """Fetches a page, served from the on-disk cache when it is fresh or unchanged."""
+    return get_http_cache().fetch(url, _send)
+
+
+def fetch_bytes(url: str) -> bytes:
+    """Fetches a binary resource, such as a gallery image, through the shared session."""
+    with _get_limiter(url, IMAGE_POLITENESS_DELAY).slot():
+        response = _session.get(url, timeout=TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+
+def scrape(url: str, review_budget: int = REVIEW_BUDGET):
+    """
+    Scrapes hotel information and reviews from Jalan.net.
+
+    Args:
+        url: The URL of the hotel page on Jalan.net.
+        review_budget: The maximum number of reviews to collect. Review pages beyond the
+            budget are not fetched.
+
+    Returns:
+        dict: A dictionary containing the hotel name, image URLs, and reviews.
+    """
+    url = url if url.endswith("/") else url + "/"
+    reviews_url = url + "kuchikomi/"
+    cache = get_http_cache()
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY_PER_HOST) as executor:
+        hotel_page = executor.submit(fetch, url)
+        hotel_name, reviews, page_count = cache.parse(
+            f"review_page-{PARSER}", fetch(reviews_url), parse_review_page
+        )
+
+        # The first page tells how many reviews a page holds and how many pages there are.
+        per_page = max(len(reviews), 1)
+        pages_needed = min(page_count, math.ceil(review_budget / per_page))
+        page_urls = [urljoin(reviews_url, f"{n}.HTML") for n in range(2, pages_needed + 1)]
+        for html in executor.map(fetch, page_urls):
+            reviews.extend(cache.parse(f"review_page-{PARSER}", html, parse_review_page)[1])
+
+        image_urls = cache.parse(f"hotel_page-{PARSER}", hotel_page.result(), parse_hotel_page)
+
+    return {
+        'hotel_name': hotel_name,
+        'image_urls': image_urls,
+        'reviews': reviews[:review_budget],
+    }
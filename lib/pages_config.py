@@ -34,6 +34,12 @@ PAGES = [
         "icon": "📄",
         "group": "Finance Demos",
     },
+    {
+        "path": "app/finops-history.py",
+        "title": "Extraction History",
+        "icon": "🗂️",
+        "group": "Finance Demos",
+    },
     {
         "path": "app/jp-hotel-tags.py",
         "title": "ホテルタグ (Hotel Tags)",
@@ -0,0 +1,135 @@
+"""
+Helpers for rendering streamed model output.
+
+Streamed chunks rarely end on a boundary that is safe to render: a JSON document may stop in
+the middle of a string or an escape sequence. `parse_partial_json` turns such a prefix into
+something that can be displayed, and `TimedStream` records the time to first token next to
+the total time.
+"""
+
+import json
+import re
+import time
+
+RENDER_INTERVAL = 0.1  # seconds between re-renders of a growing response
+
+_CLOSERS = {"{": "}", "[": "]"}
+_PARTIAL_ESCAPE = re.compile(r"\\(u[0-9a-fA-F]{0,3})?$")
+
+
+class TimedStream:  # pylint: disable=too-few-public-methods
+    """Iterates over the text of streamed chunks, timing the first and the last one."""
+
+    def __init__(self, chunks, get_text=str):
+        self._chunks = chunks
+        self._get_text = get_text
+        self._started_at = time.monotonic()
+        self.ttft = None
+        self.total = None
+        self.last_chunk = None
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            self.last_chunk = chunk
+            text = self._get_text(chunk) or ""
+            if text and self.ttft is None:
+                self.ttft = time.monotonic() - self._started_at
+            yield text
+        self.total = time.monotonic() - self._started_at
+
+
+def render_stream(stream, render, interval: float = RENDER_INTERVAL) -> str:
+    """
+    Accumulates a text stream and re-renders it at most once per interval.
+
+    Args:
+        stream: An iterable of text pieces.
+        render: A callable receiving the text so far.
+        interval: The minimum number of seconds between two renders.
+
+    Returns:
+        str: The full text.
+    """
+    buffer = ""
+    rendered_at = 0.0
+    for text in stream:
+        buffer += text
+        if time.monotonic() - rendered_at >= interval:
+            render(buffer)
+            rendered_at = time.monotonic()
+    render(buffer)
+    return buffer
+
+
+def _closers(stack: list) -> str:
+    """Returns the characters closing the open containers."""
+    return "".join(_CLOSERS[c] for c in reversed(stack))
+
+
+def _scan_json(text: str) -> dict:
+    """
+    Scans a JSON prefix.
+
+    Returns:
+        dict: The open containers at the end, the start of a value string still open at the
+            end (or None), and the end of the longest prefix that is valid once closed,
+            together with its closers.
+    """
+    stack = []
+    expect_key = []  # per open container, whether the next string is an object key
+    string_start = None
+    string_is_key = False
+    escaped = False
+    safe = None
+    for index, char in enumerate(text):
+        if string_start is not None:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                string_start = None
+                if not string_is_key:
+                    safe = (index + 1, _closers(stack))
+        elif char == '"':
+            string_start = index
+            string_is_key = bool(stack) and expect_key[-1]
+        elif char in "{[":
+            stack.append(char)
+            expect_key.append(char == "{")
+            safe = (index + 1, _closers(stack))
+        elif char in "}]" and stack:
+            stack.pop()
+            expect_key.pop()
+            safe = (index + 1, _closers(stack))
+        elif char in ":," and stack:
+            expect_key[-1] = char == "," and stack[-1] == "{"
+    if string_is_key:
+        string_start = None
+    return {"stack": stack, "string_start": string_start, "safe": safe}
+
+
+def parse_partial_json(text: str):
+    """
+    Parses the longest renderable prefix of a streamed JSON document.
+
+    Open objects and arrays are closed, and a string value still being streamed is kept up to
+    its last complete character. Keys without a value and unfinished numbers or literals are
+    dropped.
+
+    Returns:
+        The parsed value, or None if nothing can be parsed yet.
+    """
+    scan = _scan_json(text)
+    if scan["string_start"] is not None:
+        start = scan["string_start"]
+        partial = _PARTIAL_ESCAPE.sub("", text[start:])
+        candidate = text[:start] + partial + '"' + _closers(scan["stack"])
+    elif scan["safe"] is not None:
+        candidate = text[:scan["safe"][0]] + scan["safe"][1]
+    else:
+        candidate = text
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        return None
@@ -0,0 +1,141 @@
+"""
+Per-hotel tag state for incremental re-tagging.
+
+For every hotel, the store keeps the tag mentions scored so far and the reviews (by content
+hash) and images (by URL hash) they were scored from. A re-run only sends the reviews and
+images not seen before to Gemini and appends the new mentions to the stored ones. The top tags
+are then ranked from the merged mentions, so the cost of a re-run scales with the new content
+rather than with the whole history.
+"""
+
+import datetime
+import hashlib
+import json
+import sqlite3
+import threading
+
+import streamlit as st
+from decouple import config
+
+TAG_STATE_PATH = config("TAG_STATE_PATH", default="tag_state.db")
+
+KIND_REVIEW = "review"
+KIND_IMAGE = "image"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hotel_tags (
+    hotel_id TEXT PRIMARY KEY,
+    hotel_name TEXT,
+    tags TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tagged_items (
+    hotel_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    item_hash TEXT NOT NULL,
+    tagged_at TEXT NOT NULL,
+    PRIMARY KEY (hotel_id, kind, item_hash)
+);
+"""
+
+
+def review_hash(review: dict) -> str:
+    """Returns the SHA-256 hex digest of the title and body of a review."""
+    content = f"{review.get('title', '')}\n{review.get('body', '')}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def image_hash(image_url: str) -> str:
+    """Returns the SHA-256 hex digest of an image URL."""
+    return hashlib.sha256(image_url.encode("utf-8")).hexdigest()
+
+
+class TagStateStore:
+    """Thread-safe wrapper around the SQLite tag state database."""
+
+    def __init__(self, path: str = TAG_STATE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+
+    def get(self, hotel_id: str):
+        """Returns the stored tagging of a hotel, or None if it was never tagged."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hotel_name, tags FROM hotel_tags WHERE hotel_id = ?", (hotel_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"hotel_name": row[0], "tags": json.loads(row[1])}
+
+    def _tagged(self, hotel_id: str, kind: str) -> set:
+        """Returns the hashes of the items of a kind already tagged for a hotel."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_hash FROM tagged_items WHERE hotel_id = ? AND kind = ?",
+                (hotel_id, kind),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def new_material(self, hotel_id: str, reviews: list, image_urls: list):
+        """
+        Filters out the reviews and images already tagged for a hotel.
+
+        Returns:
+            tuple: The new reviews and the new image URLs, in their original order.
+        """
+        tagged_reviews = self._tagged(hotel_id, KIND_REVIEW)
+        tagged_images = self._tagged(hotel_id, KIND_IMAGE)
+        new_reviews = [r for r in reviews if review_hash(r) not in tagged_reviews]
+        new_image_urls = [u for u in image_urls if image_hash(u) not in tagged_images]
+        return new_reviews, new_image_urls
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def merge(
+        self, hotel_id: str, hotel_name: str, tags: dict, reviews: list, image_urls: list
+    ) -> dict:
+        """
+        Appends newly scored tag mentions to the stored ones.
+
+        Args:
+            hotel_id: The Jalan hotel ID.
+            hotel_name: The name of the hotel.
+            tags: The "tags" object of a tagging response over the new material only.
+            reviews: The reviews that were sent, recorded as tagged.
+            image_urls: The image URLs that were sent, and those of their near-duplicates
+                dropped before the call, recorded as tagged. Images left out for other
+                reasons, or whose download failed, stay new for later runs.
+
+        Returns:
+            dict: The merged tagging, with the hotel name and all tag mentions so far.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        items = [(hotel_id, KIND_REVIEW, review_hash(r), now) for r in reviews]
+        items += [(hotel_id, KIND_IMAGE, image_hash(u), now) for u in image_urls]
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT tags FROM hotel_tags WHERE hotel_id = ?", (hotel_id,)
+            ).fetchone()
+            merged = json.loads(row[0]) if row else {KIND_IMAGE: [], KIND_REVIEW: []}
+            for source in (KIND_IMAGE, KIND_REVIEW):
+                merged[source] = merged.get(source, []) + (tags.get(source) or [])
+            self._conn.execute(
+                "INSERT INTO hotel_tags (hotel_id, hotel_name, tags, updated_at) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (hotel_id) DO UPDATE SET "
+                "hotel_name = excluded.hotel_name, tags = excluded.tags, "
+                "updated_at = excluded.updated_at",
+                (hotel_id, hotel_name, json.dumps(merged, ensure_ascii=False), now),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tagged_items (hotel_id, kind, item_hash, tagged_at) "
+                "VALUES (?, ?, ?, ?)",
+                items,
+            )
+        return {"hotel_name": hotel_name, "tags": merged}
+
+
+@st.cache_resource
+def get_tag_state_store():
+    """Returns a cached, process-wide tag state store."""
+    return TagStateStore()
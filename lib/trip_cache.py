@@ -0,0 +1,187 @@
+"""
+Response cache for the trip planner.
+
+Most users ask about the same few dozen destinations, spelled in many ways ("Bangkok",
+"bangkok", "Bangkok, Thailand"). Answers are cached under a normalized destination and a
+weather bucket, so all those spellings and similar weather share one generated plan. The cache
+is process-wide, entries expire after TRIP_CACHE_TTL seconds, and the least recently used
+entries are evicted beyond TRIP_CACHE_SIZE. With TRIP_CACHE_WARM set, the top destinations are
+generated in the background when the first session starts.
+"""
+
+import collections
+import re
+import threading
+import time
+import unicodedata
+
+import streamlit as st
+from decouple import config
+
+TRIP_CACHE_TTL = config("TRIP_CACHE_TTL", default=24 * 60 * 60, cast=int)
+TRIP_CACHE_SIZE = config("TRIP_CACHE_SIZE", default=500, cast=int)
+TRIP_CACHE_WARM = config("TRIP_CACHE_WARM", default=False, cast=bool)
+
+TOP_DESTINATIONS = [
+    "bali", "bangkok", "singapore", "tokyo", "kyoto", "osaka", "seoul", "hong kong", "taipei",
+    "kuala lumpur", "jakarta", "yogyakarta", "phuket", "chiang mai", "ho chi minh", "hanoi",
+    "manila", "sydney", "paris", "london",
+]
+
+ALIASES = {
+    "bkk": "bangkok",
+    "krung thep": "bangkok",
+    "krung thep maha nakhon": "bangkok",
+    "sg": "singapore",
+    "singapura": "singapore",
+    "kl": "kuala lumpur",
+    "jogja": "yogyakarta",
+    "jogjakarta": "yogyakarta",
+    "djogjakarta": "yogyakarta",
+    "saigon": "ho chi minh",
+    "ho chi minh city": "ho chi minh",
+    "hcmc": "ho chi minh",
+    "nyc": "new york",
+    "new york city": "new york",
+    "hk": "hong kong",
+    "denpasar": "bali",
+    "tokyo to": "tokyo",
+}
+
+COUNTRIES = {
+    "australia", "china", "france", "hong kong sar", "indonesia", "japan", "korea", "malaysia",
+    "philippines", "singapore", "south korea", "taiwan", "thailand", "uk", "united kingdom",
+    "united states", "usa", "vietnam", "viet nam",
+}
+
+_UNDECOMPOSABLE = str.maketrans({"đ": "d", "ø": "o", "ł": "l", "ı": "i"})
+_NON_WORD = re.compile(r"[^\w\s,]")
+_SPACES = re.compile(r"\s+")
+_TEMPERATURE = re.compile(r"(-?\d+(?:\.\d+)?)\s*°?\s*C", re.IGNORECASE)
+_PRECIPITATION = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+
+
+def normalize_destination(destination: str) -> str:
+    """
+    Folds a destination to its cache key.
+
+    Case, whitespace, punctuation and diacritics are folded, a trailing known country is
+    dropped ("Bangkok, Thailand"), and known aliases are resolved ("Saigon").
+    """
+    text = unicodedata.normalize("NFKD", destination)
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = text.translate(_UNDECOMPOSABLE)
+    text = _SPACES.sub(" ", _NON_WORD.sub(" ", text)).strip()
+    parts = [part.strip() for part in text.split(",") if part.strip()]
+    if len(parts) > 1 and parts[-1] in COUNTRIES:
+        parts = parts[:-1]
+    text = " ".join(parts)
+    return ALIASES.get(text, text)
+
+
+def weather_bucket(weather: str) -> str:
+    """
+    Buckets a weather description such as "29 C with 5% precipitation".
+
+    Temperatures are rounded down to 5 degrees and precipitation is folded to dry, showers or
+    wet, so plans written for similar weather are shared.
+    """
+    temperature = _TEMPERATURE.search(weather)
+    precipitation = _PRECIPITATION.search(weather)
+    parts = []
+    if temperature:
+        low = int(float(temperature.group(1)) // 5 * 5)
+        parts.append(f"{low}-{low + 5}C")
+    if precipitation:
+        chance = float(precipitation.group(1))
+        parts.append("dry" if chance < 20 else "showers" if chance < 60 else "wet")
+    return "/".join(parts) or weather.strip().casefold()
+
+
+def cache_key(destination: str, weather: str) -> tuple:
+    """Returns the cache key of a destination and weather."""
+    return normalize_destination(destination), weather_bucket(weather)
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with a TTL, remembering how long each entry took to generate."""
+
+    def __init__(self, max_entries: int = TRIP_CACHE_SIZE, ttl_seconds: int = TRIP_CACHE_TTL):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "seconds_saved": 0.0}
+
+    def get(self, key: tuple):
+        """
+        Returns a fresh entry, or None.
+
+        Returns:
+            dict: The cached `content` and the `generation_seconds` it took.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry["created_at"] >= self._ttl_seconds:
+                self._entries.pop(key, None)
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            self.stats["seconds_saved"] += entry["generation_seconds"]
+            return entry
+
+    def put(self, key: tuple, content: str, generation_seconds: float):
+        """Stores an entry, evicting the least recently used ones beyond the size limit."""
+        with self._lock:
+            self._entries[key] = {
+                "content": content,
+                "generation_seconds": generation_seconds,
+                "created_at": time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def __contains__(self, key: tuple) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.time() - entry["created_at"] < self._ttl_seconds
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@st.cache_resource
+def get_trip_cache():
+    """Returns the process-wide trip plan cache, shared by all sessions."""
+    return ResponseCache()
+
+
+def warm(cache: ResponseCache, generate, weather: str, destinations: list = None) -> int:
+    """
+    Generates and caches plans for destinations not cached yet.
+
+    Args:
+        cache: The cache to fill.
+        generate: A callable taking a destination and weather and returning the plan.
+        weather: The weather to generate the plans for.
+        destinations: The destinations, TOP_DESTINATIONS by default.
+
+    Returns:
+        int: The number of plans generated.
+    """
+    generated = 0
+    for destination in destinations or TOP_DESTINATIONS:
+        key = cache_key(destination, weather)
+        if key in cache:
+            continue
+        s_time = time.time()
+        try:
+            content = generate(destination, weather)
+        except Exception:  # pylint: disable=broad-exception-caught
+            continue  # warming is best effort, a user request will retry
+        cache.put(key, content, time.time() - s_time)
+        generated += 1
+    return generated
@@ -0,0 +1,155 @@
+"""
+Trip plan format for the trip planner.
+
+The model returns a small JSON plan: an intro and the text of each section. The HTML is
+rendered locally from the plan with the icons in `static/`, so neither the prompt nor the
+output carries markup. The previous prompt, which had the model write the whole HTML from an
+example, is kept as HTML_TEMPLATE for `scripts/benchmark_trip_planner.py`.
+"""
+
+import html
+
+SECTIONS = [
+    ("packing", "Packing Essentials", "packing-essentials.png"),
+    ("landmarks", "Iconic Landmarks", "landmarks.png"),
+    ("culture", "Cultural Gems", "culture.png"),
+    ("cuisine", "Culinary Delights", "meal.png"),
+]
+
+PLAN_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "title": {"type": "STRING"},
+        "intro": {"type": "STRING"},
+        **{key: {"type": "STRING"} for key, _, _ in SECTIONS},
+    },
+    "required": ["title", "intro", *(key for key, _, _ in SECTIONS)],
+    "property_ordering": ["title", "intro", *(key for key, _, _ in SECTIONS)],
+}
+
+PLAN_TEMPLATE = """You are an AI Trip Planner.
+You are a helpful and informative bot that answers the questions using text from reference information provided below.
+Be sure to respond in a complete sentence, being comprehensive, including all relevant background information.
+However, you are talking to a non-technical audience, so be sure to break down complicated concepts and strike a friendly and conversational tone.
+You will provide with location and weather conditions of the place of your journey.
+You will tell about popular places of the location, cultural gems and cuisine.
+Also you will be provided with weather condition so you can tell about how to plan the journey.
+Keep it about 300 words in total. Write plain text without markup.
+
+Fill in these fields:
+- title: a short welcome title, e.g. "Welcome to the Vibrant Heart of Thailand: Bangkok".
+- intro: two or three sentences introducing the place and the expected weather.
+- packing: what to pack for the weather.
+- landmarks: iconic landmarks to visit.
+- culture: cultural gems to explore.
+- cuisine: culinary delights to try.
+
+Now plan the trip about '{location}' and weather is '{weather}'.
+Round off the temperature. Do not mention the travel dates. Answer in English only.
+"""
+
+HTML_TEMPLATE = """You are an AI Trip Planner.
+You are a helpful and informative bot that answers the questions using text from reference information provided below.
+Be sure to respond in a complete sentence, being comprehensive, including all relevant background information.
+However, you are talking to a non-technical audience, so be sure to break down complicated concepts and strike a friendly and conversational tone.
+You will provide with location and weather conditions of the place of your journey.
+You will tell about popular places of the location, cultural gems and cuisine.
+Also you will be provided with weather condition so you can tell about how to plan the journey.
+Keep it about 300 words. Do not include pictures.
+Here is an example how the answer should be, when location is Bangkok and weather is 24 C and 5% precipitation, 24 C and 0% precipitation and 26 C and 0% precipitation.
+
+<div class="planner-wrapper">
+    <h5>Welcome to the Vibrant Heart of Thailand: Bangkok</h5>
+    <p>Prepare to be captivated by the vibrant streets, cultural gems, and delectable cuisine of Bangkok, Thailand.
+    With temperatures hovering around 28°C to 35°C and low chances of rain during your visit, you'll enjoy
+    pleasant weather for exploring this bustling metropolis.</p>
+    <hr>
+    <!-- Packing Essential -->
+    <div class="planner-card">
+        <div class="planner-icon" style="margin-bottom: 0.5rem;">
+            <img src="app/static/packing-essentials.png" alt="Packing Essentials" height="32" width="32">
+        </div>
+        <div class="planner-info">
+            <h5>Packing Essentials</h5>
+            <p>To ensure a comfortable stay, pack light and breathable clothing. Shorts, t-shirts, and sandals are
+            ideal for the warm and humid weather. Consider bringing a light jacket or cardigan for evenings or
+            air-conditioned places. Remember to stay hydrated by carrying a reusable water bottle.</p>
+        </div>
+    </div>
+    <!-- Iconic Landmarks -->
+    <div class="planner-card">
+        <div class="planner-icon" style="margin-bottom: 0.5rem;">
+            <img src="app/static/landmarks.png" alt="Iconic Landmarks" height="32" width="32">
+        </div>
+        <div class="planner-info">
+            <h5>Iconic Landmarks</h5>
+            <p>Make sure to visit the Grand Palace, a stunning architectural complex that houses the Temple of the Emerald Buddha, Thailand's most sacred temple.
+            Don't miss the opportunity to take a boat tour along the Chao Phraya River, offering breathtaking views of the city's skyline.</p>
+        </div>
+    </div>
+    <!-- Cultural Gems -->
+    <div class="planner-card">
+        <div class="planner-icon" style="margin-bottom: 0.5rem;">
+            <img src="app/static/culture.png" alt="Cultural Gems" height="32" width="32">
+        </div>
+        <div class="planner-info">
+            <h5>Cultural Gems</h5>
+            <p>Immerse yourself in the rich culture of Bangkok by visiting the Jim Thompson House, a beautiful traditional Thai house showcasing exquisite silk and home décor.
+            Explore the vibrant Chatuchak Weekend Market, one of the largest weekend markets in the world, where you can find a vast array of local crafts, souvenirs, and street food.</p>
+        </div>
+    </div>
+    <!-- Culinary Delights -->
+    <div class="planner-card">
+        <div class="planner-icon" style="margin-bottom: 0.5rem;">
+            <img src="app/static/meal.png" alt="Culinary Delights" height="32" width="32">
+        </div>
+        <div class="planner-info">
+            <h5>Culinary Delights</h5>
+            <p>Indulge in Bangkok's vibrant street food scene, where you can savor authentic Thai flavors. Visit Yaowarat Road, Bangkok's Chinatown, renowned for its delicious street food stalls.
+            For a more refined dining experience, try one of the many rooftop restaurants offering panoramic views of the city.</p>
+        </div>
+    </div>
+</div>
+
+Now provide the information and plan the trip about '{location}' and weather is '{weather}'. Write your answer in English only.
+Always wrap the answer text with same html tags as provided in the example. Use same class in html tags as provided in example everytime.
+Main div should always be planner-wrapper. Each category should be in planner-card div. Use same planner-icon html as provided. In planner-info, add the relevant answer.
+Round off the temperature in answer. Write content within html tags in English only. Do not mention the travel dates. Answer in English only.
+
+Output format:
+{{
+    "result": "<div>...</div>"
+}}
+"""
+
+
+def _paragraph(text: str) -> str:
+    """Escapes plain text and keeps its line breaks."""
+    return html.escape(text.strip()).replace("\n", "<br>")
+
+
+def render_plan(plan: dict) -> str:
+    """
+    Renders a plan with the planner-* classes and icons of the previous model output.
+
+    Missing fields are skipped, so a plan that is still being streamed can be rendered too.
+    """
+    parts = ['<div class="planner-wrapper">']
+    if plan.get("title"):
+        parts.append(f"<h5>{html.escape(plan['title'])}</h5>")
+    if plan.get("intro"):
+        parts.append(f"<p>{_paragraph(plan['intro'])}</p>")
+        parts.append("<hr>")
+    for key, title, icon in SECTIONS:
+        if not plan.get(key):
+            continue
+        parts.append(
+            '<div class="planner-card">'
+            '<div class="planner-icon" style="margin-bottom: 0.5rem;">'
+            f'<img src="app/static/{icon}" alt="{title}" height="32" width="32">'
+            "</div>"
+            f'<div class="planner-info"><h5>{title}</h5><p>{_paragraph(plan[key])}</p></div>'
+            "</div>"
+        )
+    parts.append("</div>")
+    return "\n".join(parts)
@@ -1,12 +1,21 @@
-"""Deploy reasoning engine to Google Cloud Vertex AI"""
+"""
+Deploy reasoning engine to Google Cloud Vertex AI
+
+Run from the repository root with `PYTHONPATH=.`, so the tool in `lib/exchange_rate.py` and
+the local FX store ship with the agent.
+"""
+
+import pathlib
 
-import requests
 import vertexai
 from decouple import config
 from langchain_google_vertexai import HarmBlockThreshold, HarmCategory
 from vertexai import agent_engines
 from vertexai.preview.reasoning_engines import LangchainAgent
 
+from lib.exchange_rate import get_exchange_rate
+from lib.fx_store import FX_STORE_DIR
+
 DISPLAY_NAME = "Get Exchange Rate"
 MODEL = "gemini-2.0-flash"
 PROJECT_ID = config("PROJECT_ID", default="YOUR_PROJECT_ID")
@@ -30,38 +39,6 @@ model_kwargs = {
 }
 
 
-def get_exchange_rate(
-    currency_from: str = "USD",
-    currency_to: str = "EUR",
-    currency_date: str = "latest",
-):
-    """Retrieves the exchange rate between two currencies on a specified date.
-
-    Uses the Frankfurter API (https://api.frankfurter.app/) to obtain
-    exchange rate data.
-
-    Args:
-        currency_from: The base currency (3-letter currency code).
-            Defaults to "USD" (US Dollar).
-        currency_to: The target currency (3-letter currency code).
-            Defaults to "EUR" (Euro).
-        currency_date: The date for which to retrieve the exchange rate.
-            Defaults to "latest" for the most recent exchange rate data.
-            Can be specified in YYYY-MM-DD format for historical rates.
-
-    Returns:
-        dict: A dictionary containing the exchange rate information.
-            Example: {"amount": 1.0, "base": "USD", "date": "2023-11-24",
-                "rates": {"EUR": 0.95534}}
-    """
-    response = requests.get(
-        f"https://api.frankfurter.app/{currency_date}",
-        params={"from": currency_from, "to": currency_to},
-        timeout=10,
-    )
-    return response.json()
-
-
 vertexai.init(
     project=PROJECT_ID,
     location=REGION,
@@ -78,6 +55,15 @@ remote_app = agent_engines.create(
     requirements=[
         "cloudpickle==3.1.1",
         "google-cloud-aiplatform[agent_engines,langchain]",
+        "numpy",
+        "pandas",
+        "python-decouple",
+        "requests",
+    ],
+    extra_packages=[
+        "lib/exchange_rate.py",
+        "lib/fx_store.py",
+        *([FX_STORE_DIR] if pathlib.Path(FX_STORE_DIR).exists() else []),
     ],
     display_name=DISPLAY_NAME,
 )
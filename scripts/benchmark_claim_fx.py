@@ -0,0 +1,121 @@
+"""
+Check and time the currency check of employee claims with a local rate stand-in.
+
+A synthetic report of travel items in a few currencies over a few weeks is checked once with
+one rate lookup per item, and once with `validate_items`, which batches the lookups per
+(currency, date). The stand-in answers like `get_exchange_rate` after a fixed delay. Every
+tenth item gets a wrong entity amount and must be flagged; the others carry a card spread
+of up to 1% and must pass. Finally the report is checked with a rate source that fails for
+one currency, whose items must be left unchecked while the others are still checked.
+
+Usage: python -m scripts.benchmark_claim_fx [items] [latency_ms]
+"""
+
+import datetime
+import random
+import sys
+import threading
+import time
+
+import requests
+
+from lib.claim_fx import (
+    CHECK_MISMATCH,
+    CHECK_NO_RATE,
+    CHECK_OK,
+    CHECK_SAME_CURRENCY,
+    validate_items,
+)
+
+item_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+EUR_RATES = {"EUR": 1.0, "IDR": 17250.0, "USD": 1.08, "SGD": 1.45, "JPY": 162.0, "THB": 38.5}
+lookups = []
+lock = threading.Lock()
+
+
+def reference_rate(currency_from: str, currency_to: str, day: str) -> float:
+    """Returns the stand-in rate of a pair, drifting slightly from day to day."""
+    drift = 1 + datetime.date.fromisoformat(day).toordinal() % 5 / 1000
+    return round(EUR_RATES[currency_to] / EUR_RATES[currency_from] * drift, 6)
+
+
+def stand_in_rates(currency_from: str, currency_to: str, currency_date: str) -> dict:
+    """Answers like `get_exchange_rate` after a fixed delay."""
+    time.sleep(latency)
+    with lock:
+        lookups.append((currency_from, currency_to, currency_date))
+    return {
+        "amount": 1.0,
+        "base": currency_from,
+        "date": currency_date,
+        "rates": {
+            code: reference_rate(currency_from, code, currency_date)
+            for code in currency_to.split(",")
+        },
+    }
+
+
+def make_report() -> tuple:
+    """Returns synthetic claim items and the indexes of the wrong ones."""
+    random.seed(7)
+    start = datetime.date(2024, 5, 6)
+    report, wrong = [], set()
+    for i in range(item_count):
+        currency = random.choice(["IDR", "USD", "SGD", "JPY", "THB"])
+        day = (start + datetime.timedelta(days=random.randrange(21))).isoformat()
+        original = round(random.uniform(5, 500) * EUR_RATES[currency], 2)
+        converted = original * reference_rate(currency, "IDR", day) * random.uniform(1, 1.01)
+        if i % 10 == 9:
+            converted *= random.choice([0.5, 1.2, 10])
+            wrong.add(i)
+        report.append(
+            {
+                "description": f"Item {i}",
+                "transaction_date": day,
+                "original_currency": currency,
+                "original_amount": original,
+                "entity_currency": "IDR",
+                "entity_amount": round(converted, 2),
+            }
+        )
+    return report, wrong
+
+
+items, expected_wrong = make_report()
+
+s_time = time.perf_counter()
+for item in items:
+    stand_in_rates(item["original_currency"], item["entity_currency"], item["transaction_date"])
+per_item_time = time.perf_counter() - s_time
+PER_ITEM_LOOKUPS = len(lookups)
+
+lookups.clear()
+s_time = time.perf_counter()
+validate_items(items, get_rates=stand_in_rates)
+batched_time = time.perf_counter() - s_time
+
+flagged = {i for i, item in enumerate(items) if item["fx_check"] == CHECK_MISMATCH}
+passed = {i for i, item in enumerate(items) if item["fx_check"] in (CHECK_OK, CHECK_SAME_CURRENCY)}
+assert flagged == expected_wrong, sorted(flagged ^ expected_wrong)
+assert len(passed) + len(flagged) == len(items)
+
+print(f"One lookup per item: {PER_ITEM_LOOKUPS} lookups in {per_item_time:.3f}s")
+print(f"Batched per currency and date: {len(lookups)} lookups in {batched_time:.3f}s")
+print(f"Flagged {len(flagged)} of {len(items)} items, all of them wrong on purpose.")
+
+
+def offline_for_usd(currency_from: str, currency_to: str, currency_date: str) -> dict:
+    """Fails like an unreachable API for USD and answers like the stand-in otherwise."""
+    if currency_from == "USD":
+        raise requests.ConnectionError("offline")
+    return stand_in_rates(currency_from, currency_to, currency_date)
+
+
+validate_items(items, get_rates=offline_for_usd)
+unchecked = {i for i, item in enumerate(items) if item["fx_check"] == CHECK_NO_RATE}
+assert unchecked == {i for i, item in enumerate(items) if item["original_currency"] == "USD"}
+assert {i for i, item in enumerate(items) if item["fx_check"] == CHECK_MISMATCH} == (
+    expected_wrong - unchecked
+)
+print(f"With USD rates unreachable: {len(unchecked)} items left unchecked, the rest checked.")
@@ -0,0 +1,94 @@
+"""
+Report what context packing saves on a fixed Tanya Pajak question set.
+
+Reads questions with their expected sources and, optionally, keywords the answer must
+contain, one JSON object per line:
+{"question": "Berapa tarif PPh 21?", "sources": ["pph21.txt"], "keywords": ["tarif"]}
+
+For every question the retrieved passages are packed into the token budget. The script
+reports the estimated context tokens and passages before and after, the near-duplicates
+dropped, the time packing takes, and whether the expected sources are still in the context.
+With --llm it also answers each question with Gemini from the full and the packed context
+and reports the answer latency and how many answers contain all their keywords; this needs
+Google Cloud credentials.
+
+Usage: python -m scripts.benchmark_context_packing questions.jsonl [--mode local]
+    [--budget 1500] [--llm]
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from lib.context_packing import CONTEXT_TOKEN_BUDGET, estimate_tokens, pack
+from lib.tanya_pajak import RETRIEVAL_MODE, build_chain, build_retriever, get_llm
+
+parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+parser.add_argument("questions", help="JSONL file of questions, sources and keywords")
+parser.add_argument("--mode", default=RETRIEVAL_MODE, help="Retrieval mode")
+parser.add_argument("--budget", type=int, default=CONTEXT_TOKEN_BUDGET, help="Token budget")
+parser.add_argument("--llm", action="store_true", help="Also answer with Gemini")
+args = parser.parse_args()
+
+with open(args.questions, encoding="utf-8") as file:
+    questions = [json.loads(line) for line in file if line.strip()]
+
+
+def context_recall(question: dict, documents: list) -> float:
+    """Returns the share of expected sources among the documents."""
+    sources = [document.metadata.get("source", "") for document in documents]
+    found = [any(s.endswith(expected) for s in sources) for expected in question["sources"]]
+    return sum(found) / len(found) if found else 1.0
+
+
+def answer(search, question: dict) -> tuple:
+    """Answers a question without history. Returns the latency and the keyword check."""
+    chain = build_chain(get_llm(), search)
+    chain.verbose = False
+    start = time.perf_counter()
+    text = chain.invoke({"question": question["question"]})["answer"].casefold()
+    elapsed = time.perf_counter() - start
+    return elapsed, all(keyword.casefold() in text for keyword in question.get("keywords", []))
+
+
+retriever = build_retriever(args.mode, budget=0)
+rows = []
+for item in questions:
+    retrieved = retriever.invoke(item["question"])
+    s_time = time.perf_counter()
+    packed, duplicates = pack(item["question"], retrieved, args.budget)
+    rows.append(
+        {
+            "pack_ms": (time.perf_counter() - s_time) * 1000,
+            "tokens_in": sum(estimate_tokens(d.page_content) for d in retrieved),
+            "tokens_out": sum(estimate_tokens(d.page_content) for d in packed),
+            "passages_in": len(retrieved),
+            "passages_out": len(packed),
+            "duplicates": duplicates,
+            "recall_in": context_recall(item, retrieved),
+            "recall_out": context_recall(item, packed),
+        }
+    )
+
+
+def mean(key: str) -> float:
+    """Returns the mean of a column of the report."""
+    return statistics.mean(row[key] for row in rows)
+
+
+print(f"{len(rows)} questions, {args.mode} retrieval, budget {args.budget} tokens")
+print(f"Context tokens: {mean('tokens_in'):.0f} -> {mean('tokens_out'):.0f} per question")
+print(f"Passages: {mean('passages_in'):.1f} -> {mean('passages_out'):.1f} per question")
+print(f"Near-duplicates dropped: {sum(row['duplicates'] for row in rows)}")
+print(f"Packing time: {mean('pack_ms'):.2f}ms per question")
+print(f"Expected sources in context: {mean('recall_in'):.2f} -> {mean('recall_out'):.2f}")
+
+if args.llm:
+    packed_retriever = build_retriever(args.mode, budget=args.budget)
+    for label, candidate in [("Full context", retriever), ("Packed context", packed_retriever)]:
+        results = [answer(candidate, item) for item in questions]
+        print(
+            f"{label}: {statistics.mean(r[0] for r in results):.2f}s per answer, "
+            f"{sum(r[1] for r in results)}/{len(results)} answers with all keywords"
+        )
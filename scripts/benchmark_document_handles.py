@@ -0,0 +1,51 @@
+"""
+Compare the request payload of inline documents with upload-once document handles.
+
+Uses the local stand-in uploader, so it runs offline. The first call on a document uploads
+it, later calls (Stage 1 retries, re-clicks, follow-up stages) reuse the handle.
+
+Usage: python -m scripts.benchmark_document_handles path/to/document.pdf [calls]
+"""
+
+import pathlib
+import sys
+import tempfile
+import time
+
+from google.genai import types
+
+from lib.document_handles import DocumentHandleRegistry, LocalUploader
+
+path = pathlib.Path(sys.argv[1])
+calls = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+file_content = path.read_bytes()
+mime_type = "application/pdf" if path.suffix == ".pdf" else f"image/{path.suffix[1:]}"
+
+
+def payload_size(part: types.Part) -> int:
+    """Returns the size of the serialized request content for a part."""
+    return len(types.Content(role="user", parts=[part]).model_dump_json())
+
+
+s_time = time.perf_counter()
+inline_bytes = sum(
+    payload_size(types.Part.from_bytes(data=file_content, mime_type=mime_type))
+    for _ in range(calls)
+)
+inline_ms = (time.perf_counter() - s_time) * 1000
+
+with tempfile.TemporaryDirectory() as directory:
+    uploader = LocalUploader(directory)
+    registry = DocumentHandleRegistry(uploader)
+    s_time = time.perf_counter()
+    handle_bytes = sum(
+        payload_size(registry.get_part(file_content, mime_type)) for _ in range(calls)
+    )
+    handle_ms = (time.perf_counter() - s_time) * 1000
+
+print(f"{calls} calls on {path.name} ({len(file_content)} bytes)")
+print(f"Inline:  {inline_bytes} request bytes, {inline_ms:.1f}ms to build")
+print(
+    f"Handles: {handle_bytes} request bytes + {len(file_content)} uploaded once, "
+    f"{handle_ms:.1f}ms to build ({registry.stats})"
+)
@@ -0,0 +1,35 @@
+"""
+Measure the e-Bupot text-layer fast path over a folder of PDFs.
+
+Usage: python -m scripts.benchmark_e_bupot path/to/e-bupot/pdfs
+"""
+
+import pathlib
+import sys
+import time
+
+from lib.e_bupot import parse_e_bupot
+
+folder = pathlib.Path(sys.argv[1] if len(sys.argv) > 1 else ".")
+files = sorted(folder.glob("*.pdf"))
+hits = 0
+latencies = []
+for path in files:
+    s_time = time.perf_counter()
+    _, problems = parse_e_bupot(path.read_bytes())
+    latencies.append((time.perf_counter() - s_time) * 1000)
+    if problems:
+        print(f"{path.name}: fallback to Gemini ({'; '.join(problems)})")
+    else:
+        hits += 1
+        print(f"{path.name}: fast path in {latencies[-1]:.1f}ms")
+
+if files:
+    latencies.sort()
+    print(f"Fast-path hit rate: {hits}/{len(files)} ({hits / len(files):.0%})")
+    print(
+        f"Latency p50: {latencies[len(latencies) // 2]:.1f}ms, "
+        f"max: {latencies[-1]:.1f}ms"
+    )
+else:
+    print(f"No PDF found in {folder}.")
@@ -0,0 +1,185 @@
+"""
+Check and time the get_exchange_rate tool against a local Frankfurter stub.
+
+A basket of currencies over a date range is fetched once per day and currency, as the agent
+had to before, and with one range call. Both must return the same rates. The script reports
+the requests made and the time taken, and checks that repeating the range call is served
+from the cache.
+
+It then replays a typical agent workload, a few questions asked over and over, once with a
+bare `requests.get` per call, as the deployed tool did before, and once with the tool's
+pooled session and cache, and checks that the tool retries a failing API. The stub is plain
+HTTP, so the TLS setup saved by keep-alive in production is not part of the timings.
+
+Usage: python -m scripts.benchmark_exchange_rate_tool [latency_ms]
+"""
+
+import datetime
+import http.server
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+latency = (int(sys.argv[1]) if len(sys.argv) > 1 else 50) / 1000
+requests_seen = []
+failures = []  # one entry per upcoming request to answer with 503
+
+
+def stub_rate(symbol: str, day: datetime.date) -> float:
+    """Returns a deterministic EUR-based rate for a currency and date."""
+    return round((sum(map(ord, symbol)) / 100) * (1 + day.toordinal() % 7 / 100), 6)
+
+
+def stub_response(path: str, query: dict) -> dict:
+    """Answers a Frankfurter request from stub rates, skipping weekends."""
+    base = query.get("from", ["EUR"])[0]
+    symbols = query["to"][0].split(",")
+
+    def rates_on(day):
+        return {s: round(stub_rate(s, day) / stub_rate(base, day), 6) for s in symbols}
+
+    if ".." in path:
+        start, end = (datetime.date.fromisoformat(part) for part in path.split(".."))
+        period = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+        return {
+            "amount": 1.0,
+            "base": base,
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "rates": {d.isoformat(): rates_on(d) for d in period if d.weekday() < 5},
+        }
+    day = datetime.date.today() if path == "latest" else datetime.date.fromisoformat(path)
+    while day.weekday() >= 5:
+        day -= datetime.timedelta(days=1)
+    return {"amount": 1.0, "base": base, "date": day.isoformat(), "rates": rates_on(day)}
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """Serves stub Frankfurter responses after a fixed delay."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name,missing-function-docstring
+        time.sleep(latency)
+        url = urllib.parse.urlparse(self.path)
+        requests_seen.append(url.path)
+        if failures:
+            failures.pop()
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps(
+            stub_response(url.path.strip("/"), urllib.parse.parse_qs(url.query))
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+os.environ["FRANKFURTER_URL"] = f"http://127.0.0.1:{server.server_port}"
+os.environ["FX_STORE_DIR"] = tempfile.mkdtemp()  # no local store, every call hits the stub
+
+# pylint: disable=wrong-import-position
+import requests
+
+from lib.exchange_rate import clear_cache, get_exchange_rate
+
+basket = ["USD", "SGD", "JPY"]
+end_day = datetime.date(2024, 3, 28)
+start_day = end_day - datetime.timedelta(days=29)
+days = [start_day + datetime.timedelta(days=i) for i in range(30)]
+business_days = [d for d in days if d.weekday() < 5]
+
+s_time = time.perf_counter()
+per_call = {
+    (d.isoformat(), code): get_exchange_rate("IDR", code, d.isoformat())["rates"][code]
+    for d in business_days
+    for code in basket
+}
+per_call_time = time.perf_counter() - s_time
+PER_CALL_REQUESTS = len(requests_seen)
+
+requests_seen.clear()
+s_time = time.perf_counter()
+columnar = get_exchange_rate("IDR", ",".join(basket), end_day.isoformat(), days=30)
+range_time = time.perf_counter() - s_time
+RANGE_REQUESTS = len(requests_seen)
+
+requests_seen.clear()
+s_time = time.perf_counter()
+repeated = get_exchange_rate("IDR", ",".join(basket), start_day.isoformat(), end_day.isoformat())
+cached_time = time.perf_counter() - s_time
+assert repeated == columnar and not requests_seen, requests_seen
+
+single = get_exchange_rate("IDR", "USD,SGD", "2024-03-30")
+assert single["date"] == "2024-03-29" and set(single["rates"]) == {"USD", "SGD"}, single
+assert columnar["dates"] == [d.isoformat() for d in business_days], columnar["dates"]
+for code in basket:
+    for date, value in zip(columnar["dates"], columnar["rates"][code]):
+        assert value == per_call[(date, code)], (date, code)
+
+print(f"Per day and currency: {PER_CALL_REQUESTS} requests in {per_call_time:.3f}s")
+print(f"One range call: {RANGE_REQUESTS} request in {range_time:.3f}s")
+print(f"Repeated range call: {cached_time * 1000:.2f}ms from the cache")
+print(f"Columnar payload: {len(json.dumps(columnar))} bytes for {len(per_call)} rates")
+print("All rates match.")
+
+questions = [
+    ("USD", "IDR", "latest"),
+    ("SGD", "IDR", "latest"),
+    ("USD", "JPY", "2024-01-02"),
+    ("EUR", "IDR", "2023-12-29"),
+    ("USD", "IDR", "2020-01-01"),
+] * 6
+
+clear_cache()
+requests_seen.clear()
+s_time = time.perf_counter()
+bare = [
+    requests.get(
+        f"{os.environ['FRANKFURTER_URL']}/{date}",
+        params={"from": base, "to": target},
+        timeout=10,
+    ).json()
+    for base, target, date in questions
+]
+bare_time = time.perf_counter() - s_time
+BARE_REQUESTS = len(requests_seen)
+
+requests_seen.clear()
+s_time = time.perf_counter()
+pooled = [get_exchange_rate(base, target, date) for base, target, date in questions]
+pooled_time = time.perf_counter() - s_time
+assert pooled == bare
+print(
+    f"Agent workload, bare requests.get: {BARE_REQUESTS} requests, "
+    f"{bare_time / len(questions) * 1000:.1f}ms per tool call"
+)
+print(
+    f"Agent workload, pooled and cached: {len(requests_seen)} requests, "
+    f"{pooled_time / len(questions) * 1000:.1f}ms per tool call"
+)
+
+requests_seen.clear()
+failures.extend([503, 503])
+retried = get_exchange_rate("JPY", "IDR", "latest")
+assert "rates" in retried and len(requests_seen) == 3, (retried, requests_seen)
+print("Two 503 responses were retried.")
+
+restored = pickle.loads(pickle.dumps(get_exchange_rate))
+assert restored is get_exchange_rate and restored("USD", "IDR") == pooled[0]
+print("The tool pickles after use.")
+server.shutdown()
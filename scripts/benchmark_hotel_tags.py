@@ -0,0 +1,62 @@
+"""
+Compare local top-tag ranking with the previous second Gemini call.
+
+Each hotel is scraped and tagged once. The same tags are then ranked locally and sent to the
+model as the page used to, and the time, tokens and agreement of the two top 5s are reported.
+Agreement is the share of top tags both results have in common.
+
+Usage: python -m scripts.benchmark_hotel_tags https://www.jalan.net/yad306452 ...
+"""
+
+import json
+import sys
+import time
+
+from lib.hotel_images import prepare_images, to_parts
+from lib.hotel_tags import agreement, get_tags, get_top_tags, get_top_tags_with_model, parse_json
+from lib.jalan_scraper import scrape
+
+urls = sys.argv[1:]
+totals = {"tagging": 0.0, "local": 0.0, "model": 0.0, "model_tokens": 0, "agreement": 0.0}
+for url in urls:
+    data = scrape(url)
+    images, _ = prepare_images(data["image_urls"])
+
+    s_time = time.perf_counter()
+    tagging = parse_json(get_tags(data["hotel_name"], to_parts(images), data["reviews"]).text)
+    tagging_time = time.perf_counter() - s_time
+
+    s_time = time.perf_counter()
+    local_top = get_top_tags(tagging)
+    local_time = time.perf_counter() - s_time
+
+    s_time = time.perf_counter()
+    response = get_top_tags_with_model(
+        data["hotel_name"], json.dumps(tagging, ensure_ascii=False)
+    )
+    model_top = parse_json(response.text)
+    model_time = time.perf_counter() - s_time
+
+    score = agreement(local_top, model_top)
+    totals["tagging"] += tagging_time
+    totals["local"] += local_time
+    totals["model"] += model_time
+    totals["model_tokens"] += response.usage_metadata.total_token_count
+    totals["agreement"] += score
+    print(f"{data['hotel_name']}: tagging {tagging_time:.2f}s")
+    print(f"  local {local_time * 1000:.2f}ms {list(local_top['tags'].values())}")
+    print(
+        f"  model {model_time:.2f}s, {response.usage_metadata.total_token_count} tokens "
+        f"{list(model_top['tags'].values())}"
+    )
+    print(f"  agreement {score:.0%}")
+
+if urls:
+    count = len(urls)
+    print(f"Hotels: {count}")
+    print(f"Mean tagging call: {totals['tagging'] / count:.2f}s")
+    print(
+        f"Mean top tags: local {totals['local'] / count * 1000:.2f}ms, "
+        f"model {totals['model'] / count:.2f}s and {totals['model_tokens'] // count} tokens"
+    )
+    print(f"Mean agreement: {totals['agreement'] / count:.0%}")
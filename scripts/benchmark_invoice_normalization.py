@@ -0,0 +1,147 @@
+"""
+Compare output tokens and latency of the invoice prompt before and after local normalization.
+
+Before, the model returned an `extracted_value` and a `normalized_value` for every amount and
+date, applying separator rules and Buddhist Era conversion itself. After, it returns the
+strings as printed and `lib.invoice_normalization` normalizes them. Every invoice in the
+folder is extracted with both prompts. The script reports the output and input tokens and the
+latency of each, the time local normalization adds, and how many normalized values of the
+two agree. This needs Google Cloud credentials.
+
+Usage: python -m scripts.benchmark_invoice_normalization path/to/invoices [runs]
+"""
+
+import json
+import pathlib
+import statistics
+import sys
+import time
+
+from lib.invoice_extraction import EXTRACTION_PROMPT, generate_multimodal
+from lib.invoice_normalization import AMOUNT_FIELDS, DATE_FIELDS, normalize_invoice
+
+MIME_TYPES = {".pdf": "application/pdf", ".png": "image/png", ".jpg": "image/jpeg",
+              ".jpeg": "image/jpeg"}
+
+# The prompt of the invoice page before amounts and dates were normalized locally.
+LEGACY_PROMPT = """
+    Extract the following information from the provided invoice image(s).
+    If a field is not present or cannot be reliably determined, leave it blank.
+    Ensure numerical values are extracted with appropriate decimal precision and presented as number.
+    Follow the output format as indicated in the sample.
+
+    Extracted Information:
+    * Supplier Name: (String) The trading name prominently displayed on the invoice.
+    * Supplier Legal Name: (String) The full, legally registered name of the supplier, including the branch.
+    * Invoice Date: (String) Day, Month, and Year the invoice was issued. Format as DD-MMM-YYYY, e.g., 11-Oct-2023
+    * Invoice No.: (String) The unique identifier for the invoice).
+    * Invoice Currency: (String) The currency the invoice is denominated in, usually follows the language -- VND, THB, IDR, etc.
+    * Invoice Amount (excluding VAT): (Number) The total value of goods/services before VAT/tax.
+    * Invoice Service Charge: (Number) If any, find the service charge amount in the invoice.
+    * Invoice VAT Amount: (Number) The total amount of VAT/tax charged.
+    * Invoice Amount (including VAT): (Number) The final total amount due, including VAT/tax.
+
+    Pay attention to the thousand separators when normalizing string to number.
+
+    Return the result in JSON format.
+    ```
+    {
+        "Supplier Name": "...",
+        "Supplier Legal Name": "...",
+        "Invoice Date": {
+            "extracted_value": "...",
+            "normalized_value": "DD-MMM-YYYY"
+        },
+        "Invoice No.": "...",
+        "Invoice Currency": "IDR/THB/VND/...",
+        "Invoice Amount (excluding VAT)": {
+            "extracted_value": "...",
+            "normalized_value": "..."  // number
+        },
+        "Invoice Service Charge": {
+            "extracted_value": "...",
+            "normalized_value": "..."  // number
+        },
+        "Invoice VAT Amount": {
+            "extracted_value": "...",
+            "normalized_value": "..."  // number
+        },
+        "Invoice Amount (including VAT)": {
+            "extracted_value": "...",
+            "normalized_value": "..."  // number
+        }
+    }
+    ```
+
+    Notes on Thai Invoices:
+    * Thai invoices dates might be in Buddhist Era (BE) format, which is 543 years ahead of the Gregorian calendar.
+    * Be mindful of the date format and convert it to DD-MMM-YYYY.
+    """
+
+folder = pathlib.Path(sys.argv[1] if len(sys.argv) > 1 else ".")
+runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+paths = sorted(p for p in folder.iterdir() if p.suffix.lower() in MIME_TYPES)
+
+
+def run(prompt: str, document: bytes, document_type: str) -> tuple:
+    """Extracts an invoice once. Returns the response and its latency in seconds."""
+    start = time.perf_counter()
+    response = generate_multimodal(document, document_type, prompt)
+    return response, time.perf_counter() - start
+
+
+def normalized_values(record: dict) -> dict:
+    """Returns the normalized amount and date values of an invoice record."""
+    values = {}
+    for name in AMOUNT_FIELDS + DATE_FIELDS:
+        entry = record.get(name)
+        values[name] = entry.get("normalized_value") if isinstance(entry, dict) else entry
+    return values
+
+
+def same(model_value, local_value) -> bool:
+    """Compares a normalized value of the model with one normalized locally."""
+    try:
+        return abs(float(model_value) - float(local_value)) < 0.005
+    except (TypeError, ValueError):
+        return str(model_value or "").strip().casefold() == str(
+            local_value or ""
+        ).strip().casefold()
+
+
+results = {"before": [], "after": []}
+normalize_ms = []
+agreeing = compared = 0
+for path in paths:
+    content, mime_type = path.read_bytes(), MIME_TYPES[path.suffix.lower()]
+    for _ in range(runs):
+        before, before_seconds = run(LEGACY_PROMPT, content, mime_type)
+        after, after_seconds = run(EXTRACTION_PROMPT, content, mime_type)
+        results["before"].append((before.usage_metadata, before_seconds))
+        results["after"].append((after.usage_metadata, after_seconds))
+        try:
+            before_record, raw = json.loads(before.text), json.loads(after.text)
+        except json.JSONDecodeError:
+            continue
+        s_time = time.perf_counter()
+        after_record = normalize_invoice(raw)
+        normalize_ms.append((time.perf_counter() - s_time) * 1000)
+        after_values = normalized_values(after_record)
+        for field, value in normalized_values(before_record).items():
+            compared += 1
+            agreeing += same(value, after_values[field])
+
+print(f"{len(paths)} invoices, {runs} runs each")
+for label, calls in results.items():
+    if calls:
+        output_tokens = statistics.mean(u.candidates_token_count or 0 for u, _ in calls)
+        input_tokens = statistics.mean(u.prompt_token_count or 0 for u, _ in calls)
+        print(
+            f"{label.capitalize()}: {output_tokens:.0f} output tokens, "
+            f"{input_tokens:.0f} input tokens, "
+            f"{statistics.mean(seconds for _, seconds in calls):.2f}s per invoice"
+        )
+if normalize_ms:
+    print(f"Local normalization: {statistics.mean(normalize_ms):.3f}ms per invoice")
+if compared:
+    print(f"Normalized values agreeing: {agreeing}/{compared}")
@@ -0,0 +1,108 @@
+"""
+Measure invoice splitting and extraction over a folder of multi-invoice PDFs.
+
+An optional `expected.json` in the folder maps file names to the expected invoices, in
+document order, each with its "Pages" (e.g. "1-2") and the expected field values, with
+amounts as numbers and dates as DD-MMM-YYYY:
+{"march.pdf": [{"Pages": "1-2", "Invoice No.": "INV-001", "Invoice Date": "11-Oct-2023",
+                "Invoice Amount (including VAT)": 1500000}]}
+A plain number instead of the list only checks the invoice count.
+
+Boundaries are detected from the page text layer. The script reports the invoices found and
+the page ranges and invoice numbers matching the expected ones. With --extract, every invoice
+is also extracted with Gemini, which needs Google Cloud credentials, and the extracted fields
+are compared with the expected values.
+
+Usage: python -m scripts.benchmark_invoice_split path/to/multi-invoice/pdfs [--extract]
+"""
+
+import argparse
+import json
+import math
+import pathlib
+import time
+
+from lib.invoice_extraction import detect_ranges, extract_invoices
+from lib.invoice_splitter import (
+    INVOICE_NUMBER_PATTERN,
+    detect_invoice_boundaries,
+    get_page_texts,
+    split_pdf,
+)
+
+parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+parser.add_argument("folder", nargs="?", default=".", help="Folder of multi-invoice PDFs")
+parser.add_argument("--extract", action="store_true", help="Also extract with Gemini")
+args = parser.parse_args()
+
+folder = pathlib.Path(args.folder)
+expected_path = folder / "expected.json"
+expected = json.loads(expected_path.read_text()) if expected_path.exists() else {}
+
+
+def same_value(extracted, reference) -> bool:
+    """Compares an extracted field, normalized if it has a normalized value, to the expected."""
+    if isinstance(extracted, dict):
+        extracted = extracted.get("normalized_value")
+    if isinstance(reference, (int, float)):
+        return isinstance(extracted, (int, float)) and math.isclose(
+            extracted, reference, abs_tol=0.005
+        )
+    return str(extracted or "").strip().casefold() == str(reference).strip().casefold()
+
+
+def page_label(first: int, last: int) -> str:
+    """Returns the one-based page range label used in invoice records."""
+    return f"{first + 1}-{last + 1}"
+
+
+totals = dict.fromkeys(["found", "expected", "listed", "pages", "numbers", "fields", "correct"], 0)
+s_total = time.perf_counter()
+for path in sorted(folder.glob("*.pdf")):
+    s_time = time.perf_counter()
+    content = path.read_bytes()
+    page_texts = get_page_texts(content)
+    ranges = detect_invoice_boundaries(page_texts)
+    split_pdf(content, ranges)
+    elapsed = (time.perf_counter() - s_time) * 1000
+    totals["found"] += len(ranges)
+    line = f"{path.name}: {len(ranges)} invoices in {elapsed:.1f}ms"
+
+    wanted = expected.get(path.name)
+    if isinstance(wanted, int):
+        totals["expected"] += wanted
+        line += f" (expected {wanted})"
+    elif wanted:
+        totals["expected"] += len(wanted)
+        totals["listed"] += len(wanted)
+        found_pages = {page_label(start, end): start for start, end in ranges}
+        for invoice in wanted:
+            start = found_pages.get(invoice.get("Pages"))
+            if start is None:
+                continue
+            totals["pages"] += 1
+            match = INVOICE_NUMBER_PATTERN.search(page_texts[start])
+            if match and same_value(match.group(1), invoice.get("Invoice No.", "")):
+                totals["numbers"] += 1
+        line += f" (expected {len(wanted)})"
+
+        if args.extract:
+            records, _ = extract_invoices(content, detect_ranges(content)[0])
+            by_pages = {record.get("Pages"): record for record in records}
+            for invoice in wanted:
+                record = by_pages.get(invoice.get("Pages"), {})
+                for field, value in invoice.items():
+                    if field != "Pages":
+                        totals["fields"] += 1
+                        totals["correct"] += same_value(record.get(field), value)
+    print(line)
+
+elapsed_total = time.perf_counter() - s_total
+print(f"Split {totals['found']} invoices in {elapsed_total:.3f}s")
+if totals["expected"]:
+    print(f"Invoices found: {totals['found']} of {totals['expected']} expected")
+if totals["listed"]:
+    print(f"Page ranges matching: {totals['pages']}/{totals['listed']}")
+    print(f"Invoice numbers matching on the first page: {totals['numbers']}/{totals['listed']}")
+if totals["fields"]:
+    print(f"Extracted fields matching: {totals['correct']}/{totals['fields']}")
@@ -0,0 +1,54 @@
+"""
+Compare parse time and peak memory of the Jalan parser backends over saved pages.
+
+Every `*.html`/`*.HTML` file in the corpus folder whose path contains `kuchikomi` is parsed
+as a review page, every other file as a hotel page. Outputs are checked against the
+html.parser backend.
+
+Usage: python -m scripts.benchmark_jalan_parsers path/to/corpus [repeat]
+"""
+
+import pathlib
+import sys
+import time
+import tracemalloc
+
+from lib.jalan_parser import BACKENDS, LexborHTMLParser, parse_hotel_page, parse_review_page
+
+corpus = pathlib.Path(sys.argv[1])
+repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+pages = [
+    (path, path.read_text(encoding="utf-8", errors="replace"))
+    for path in sorted(corpus.rglob("*"))
+    if path.suffix.lower() == ".html"
+]
+
+
+def parse(html_path, page_html, page_backend):
+    """Parses a page with the parser matching its kind."""
+    if "kuchikomi" in html_path.parts:
+        return parse_review_page(page_html, page_backend)
+    return parse_hotel_page(page_html, page_backend)
+
+
+expected = [parse(path, html, "html.parser") for path, html in pages]
+print(f"{len(pages)} pages, {repeat} runs each")
+for backend in BACKENDS:
+    if backend == "selectolax" and LexborHTMLParser is None:
+        print(f"{backend}: skipped, selectolax is not installed")
+        continue
+
+    s_time = time.perf_counter()
+    for _ in range(repeat):
+        for path, html in pages:
+            parse(path, html, backend)
+    elapsed = (time.perf_counter() - s_time) * 1000 / (repeat * max(len(pages), 1))
+
+    tracemalloc.start()
+    results = [parse(path, html, backend) for path, html in pages]
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    matches = sum(1 for result, exp in zip(results, expected) if result == exp)
+    print(f"{backend}: {elapsed:.2f}ms/page, peak {peak / 1024:.0f} KiB, "
+          f"{matches}/{len(pages)} outputs match html.parser")
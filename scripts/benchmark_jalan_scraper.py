@@ -0,0 +1,78 @@
+"""
+Benchmark hotel scraping against saved Jalan HTML served by a local HTTP stub.
+
+The fixture folder mirrors the Jalan URL layout, e.g. `yad306452/index.html`,
+`yad306452/kuchikomi/index.html` and `yad306452/kuchikomi/2.HTML`. Every response is delayed
+to simulate network latency.
+
+Usage: python -m scripts.benchmark_jalan_scraper path/to/fixtures yad306452 [latency_ms]
+"""
+
+import functools
+import http.server
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from lib import jalan_scraper
+from lib.http_cache import HttpCache
+
+fixtures, hotel_id = sys.argv[1], sys.argv[2]
+latency = (int(sys.argv[3]) if len(sys.argv) > 3 else 100) / 1000
+
+
+class SlowHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves fixture files after a fixed delay."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(latency)
+        super().do_GET()
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+server = http.server.ThreadingHTTPServer(
+    ("127.0.0.1", 0), functools.partial(SlowHandler, directory=fixtures)
+)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+url = f"http://127.0.0.1:{server.server_port}/{hotel_id}/"
+
+
+def scrape_first_page_only(hotel_url):
+    """Previous behavior: two sequential requests without a session."""
+    html_1 = requests.get(hotel_url, headers=jalan_scraper.HEADERS, timeout=10)
+    html_1.encoding = html_1.apparent_encoding
+    image_urls = jalan_scraper.parse_hotel_page(html_1.text)
+    html = requests.get(hotel_url + "kuchikomi/", headers=jalan_scraper.HEADERS, timeout=10)
+    html.encoding = html.apparent_encoding
+    hotel_name, reviews, _ = jalan_scraper.parse_review_page(html.text)
+    return {'hotel_name': hotel_name, 'image_urls': image_urls, 'reviews': reviews}
+
+
+def run_benchmark(name, run):
+    """Runs one scraper and prints its fetch time and review coverage."""
+    s_time = time.perf_counter()
+    data = run(url)
+    elapsed = time.perf_counter() - s_time
+    print(f"{name}: {len(data['reviews'])} reviews, {len(data['image_urls'])} images "
+          f"in {elapsed:.3f}s")
+
+
+with tempfile.TemporaryDirectory() as cache_dir:
+    run_benchmark("first page, sequential", scrape_first_page_only)
+    fresh_cache = HttpCache(cache_dir, ttl_seconds=3600)
+    jalan_scraper.get_http_cache = lambda: fresh_cache
+    run_benchmark("all pages, pooled, cold cache", jalan_scraper.scrape)
+    run_benchmark("all pages, pooled, fresh cache", jalan_scraper.scrape)
+    stale_cache = HttpCache(cache_dir, ttl_seconds=0)
+    jalan_scraper.get_http_cache = lambda: stale_cache
+    run_benchmark("all pages, pooled, revalidated cache", jalan_scraper.scrape)
+    print(f"Revalidation stats: {stale_cache.stats}")
+
+server.shutdown()
@@ -0,0 +1,179 @@
+"""
+Check and time the Tanya Pajak chain pool and caches with a local LLM and retriever.
+
+A conversation of a few turns is answered twice: once building a new chain, LLM and retriever
+for every message, as the page did before, and once through `ChainPool` with shared LLM and
+retriever. The stand-ins take a fixed time to construct, standing for the client setup of
+VertexAI and Vertex AI Search, and to answer. The script reports the per-message latency of
+both, and checks that only the pooled chain passes the earlier turns to the LLM.
+
+Then sessions opening with paraphrases of a few common questions, each followed by a
+follow-up, are answered without and with the retrieval and answer caches. The script reports
+the hit rates and latencies, and checks that no answer is served for a question about another
+tax article. Finally pairs of similar questions with opposite meanings, such as "pegawai
+tetap" and "pegawai tidak tetap", are checked to never answer each other from the cache.
+
+Usage: python -m scripts.benchmark_tanya_pajak [setup_ms] [call_ms]
+"""
+
+import random
+import sys
+import time
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.language_models.llms import LLM
+from langchain_core.retrievers import BaseRetriever
+
+from lib.answer_cache import CachedRetriever, SemanticAnswerCache
+from lib.trip_cache import ResponseCache
+from lib.tanya_pajak import CACHE_VERSION, ChainPool, ask, build_chain
+
+setup = (int(sys.argv[1]) if len(sys.argv) > 1 else 300) / 1000
+call = (int(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+QUESTIONS = [
+    "Berapa tarif PPh 21 untuk penghasilan di atas 500 juta?",
+    "Bagaimana kalau penghasilannya dari luar negeri?",
+    "Kapan batas waktu pelaporannya?",
+    "Apa sanksinya kalau terlambat?",
+]
+
+
+class StandInLLM(LLM):  # pylint: disable=abstract-method
+    """Answers every prompt with its turn number and records the prompts."""
+
+    prompts: list = []
+
+    def __init__(self, **kwargs):
+        time.sleep(setup)
+        super().__init__(**kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "stand-in"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        time.sleep(call)
+        self.prompts.append(prompt)
+        if "Standalone question:" in prompt:
+            opener = prompt.split("Human: ")[1].split("\n")[0]
+            return f"{prompt.split('Follow Up Input: ')[1].splitlines()[0]} ({opener})"
+        return f"Jawaban {len(self.prompts)}"
+
+
+class StandInRetriever(BaseRetriever):
+    """Returns the same tax document for every query."""
+
+    def __init__(self, **kwargs):
+        time.sleep(setup)
+        super().__init__(**kwargs)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list:
+        time.sleep(call)
+        return [Document(page_content="Tarif PPh 21 ...", metadata={"source": "pph21.pdf"})]
+
+
+def converse(get_chain) -> tuple:
+    """Asks all questions, returning the per-message latencies and the prompts of the last."""
+    latencies = []
+    prompts = []
+    for question in QUESTIONS:
+        s_time = time.perf_counter()
+        chain = get_chain()
+        chain.combine_docs_chain.llm_chain.llm.prompts = prompts = []
+        chain.invoke({"question": question})
+        latencies.append(time.perf_counter() - s_time)
+    return latencies, prompts
+
+
+def quiet(chain):
+    """Turns off the verbose output of a chain."""
+    chain.verbose = False
+    chain.combine_docs_chain.verbose = False
+    chain.combine_docs_chain.llm_chain.verbose = False
+    chain.question_generator.verbose = False
+    return chain
+
+
+before, before_prompts = converse(
+    lambda: quiet(build_chain(StandInLLM(), StandInRetriever()))
+)
+
+shared_llm, shared_retriever = StandInLLM(), StandInRetriever()
+pool = ChainPool(lambda history: quiet(build_chain(shared_llm, shared_retriever, history)))
+after, after_prompts = converse(lambda: pool.get("session"))
+
+assert "Jawaban" not in before_prompts[-1], "a new chain per message should have no history"
+assert QUESTIONS[-2] in after_prompts[0], "the pooled chain should condense with the history"
+assert pool.stats == {"created": 1, "reused": len(QUESTIONS) - 1, "evicted": 0}, pool.stats
+
+print(f"New chain per message: {sum(before) / len(before) * 1000:.0f}ms per message")
+print(
+    f"Pooled chain: {sum(after) / len(after) * 1000:.0f}ms per message, "
+    f"{after[0] * 1000:.0f}ms for the first"
+)
+print(
+    f"Pooled chain calls the LLM {len(after_prompts)} times per follow-up "
+    "(condensing the question, then answering) and sees the earlier turns."
+)
+
+OPENERS = [
+    "Berapa tarif PPh 21 untuk karyawan?",
+    "Tarif PPh 21 karyawan berapa?",
+    "berapa tarif pph 21 untuk karyawan",
+    "Bagaimana cara daftar NPWP?",
+    "Bagaimana cara mendaftar NPWP?",
+    "Kapan batas waktu lapor e-Bupot?",
+    "Kapan batas waktu pelaporan e-Bupot?",
+    "Berapa tarif PPh 23 untuk jasa?",
+]
+FOLLOW_UP = "Apa sanksinya kalau terlambat?"
+
+
+def run_sessions(retriever, answer_cache) -> list:
+    """Answers 30 two-turn sessions, returning the per-message latencies."""
+    random.seed(3)
+    sessions = ChainPool(lambda history: quiet(build_chain(shared_llm, retriever, history)))
+    latencies = []
+    for session in range(30):
+        opener = random.choice(OPENERS)
+        for question in (opener, FOLLOW_UP):
+            s_time = time.perf_counter()
+            results = ask(sessions.get(str(session)), question, answer_cache)
+            latencies.append(time.perf_counter() - s_time)
+            if "cached" in results:
+                assert "23" in results["cached"]["question"] or "23" not in question, results
+    return latencies
+
+
+uncached = run_sessions(shared_retriever, None)
+retrieval_cache = ResponseCache(100, 3600)
+answers = SemanticAnswerCache(100, 3600)
+cached = run_sessions(
+    CachedRetriever(retriever=shared_retriever, cache=retrieval_cache, version=CACHE_VERSION),
+    answers,
+)
+print(f"Without caches: {sum(uncached) / len(uncached) * 1000:.0f}ms per message")
+print(f"With caches: {sum(cached) / len(cached) * 1000:.0f}ms per message")
+for label, cache in [("Retrieval", retrieval_cache), ("Answer", answers)]:
+    lookups = cache.stats["hits"] + cache.stats["misses"]
+    print(f"{label} cache: {cache.stats['hits']}/{lookups} hits")
+
+assert answers.get(OPENERS[0], CACHE_VERSION) and not answers.get(OPENERS[0], "other")
+
+MUST_MISS = [
+    ("Berapa tarif PPh 21 untuk pegawai tetap?", "Berapa tarif PPh 21 untuk pegawai tidak tetap?"),
+    ("Berapa PTKP untuk wajib pajak kawin?", "Berapa PTKP untuk wajib pajak tidak kawin?"),
+    ("Apakah hadiah undian kena PPh?", "Apakah hadiah undian tidak kena PPh?"),
+    ("Bagaimana cara membuat bukti potong?", "Bagaimana cara membatalkan bukti potong?"),
+    ("Berapa PPh 21 atas penghasilan 5.000.000?", "Berapa PPh 21 atas penghasilan 5.000?"),
+    ("Berapa PPh 21 atas penghasilan 5.000.000?", "Berapa PPh 21 atas penghasilan 5.000.000.000?"),
+]
+opposites = SemanticAnswerCache(100, 3600)
+for cached_question, opposite in MUST_MISS:
+    opposites.put(cached_question, CACHE_VERSION, "Jawaban", [], 1.0)
+    assert opposites.get(opposite, CACHE_VERSION) is None, (cached_question, opposite)
+    assert opposites.get(cached_question.lower(), CACHE_VERSION), cached_question
+print(f"Opposite questions: 0/{len(MUST_MISS)} served from the cache")
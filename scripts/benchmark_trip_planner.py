@@ -0,0 +1,66 @@
+"""
+Compare the HTML trip planner prompt with the compact plan schema.
+
+Each destination is planned with the previous prompt, where the model writes the HTML, and
+with the plan schema rendered locally. Input and output tokens and latency are reported per
+destination and on average.
+
+Usage: python -m scripts.benchmark_trip_planner [destination ...]
+"""
+
+import json
+import sys
+import time
+
+from google.genai import types
+
+from lib.trip_plan import HTML_TEMPLATE, PLAN_RESPONSE_SCHEMA, PLAN_TEMPLATE, render_plan
+from lib.vertex_ai import get_vertex_ai_client
+
+MODEL = "gemini-2.5-flash-lite"
+WEATHER = "29 C with 5% precipitation"
+VARIANTS = {
+    "html": (
+        HTML_TEMPLATE,
+        types.GenerateContentConfig(
+            max_output_tokens=2048, response_mime_type="application/json"
+        ),
+    ),
+    "schema": (
+        PLAN_TEMPLATE,
+        types.GenerateContentConfig(
+            max_output_tokens=2048,
+            response_mime_type="application/json",
+            response_schema=PLAN_RESPONSE_SCHEMA,
+        ),
+    ),
+}
+
+client = get_vertex_ai_client()
+destinations = sys.argv[1:] or ["Bangkok", "Bali", "Tokyo", "Seoul", "Singapore"]
+totals = {name: {"input": 0, "output": 0, "seconds": 0.0} for name in VARIANTS}
+for destination in destinations:
+    for name, (template, generate_config) in VARIANTS.items():
+        prompt = template.format(location=destination, weather=WEATHER)
+        s_time = time.perf_counter()
+        response = client.models.generate_content(
+            model=MODEL, contents=prompt, config=generate_config
+        )
+        if name == "schema":
+            render_plan(json.loads(response.text))
+        elapsed = time.perf_counter() - s_time
+        usage = response.usage_metadata
+        totals[name]["input"] += usage.prompt_token_count
+        totals[name]["output"] += usage.candidates_token_count
+        totals[name]["seconds"] += elapsed
+        print(
+            f"{destination} [{name}]: {usage.prompt_token_count} input, "
+            f"{usage.candidates_token_count} output tokens in {elapsed:.2f}s"
+        )
+
+count = len(destinations)
+for name, total in totals.items():
+    print(
+        f"Mean [{name}]: {total['input'] // count} input, {total['output'] // count} output "
+        f"tokens in {total['seconds'] / count:.2f}s"
+    )
@@ -0,0 +1,32 @@
+"""
+Build the local BM25 index of the Tanya Pajak knowledge base.
+
+Reads an export of the data store, e.g. a copy of the bucket it was imported from made with
+`gcloud storage cp -r gs://bucket/path export/`, and writes the index to BM25_INDEX_DIR. Pass
+the gs:// URI of the copied folder as --source-prefix so the sources of local results match
+the ones Vertex AI Search returns, which hybrid retrieval relies on.
+
+Usage: python -m scripts.build_tax_index export/ [--source-prefix gs://bucket/path/]
+    [--output .cache/bm25]
+"""
+
+import argparse
+import time
+
+from lib.bm25 import BM25_INDEX_DIR, BM25Index, chunk, read_export
+
+parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+parser.add_argument("export", help="Directory or file exported from the data store")
+parser.add_argument("--source-prefix", default="", help="Prepended to relative file paths")
+parser.add_argument("--output", default=BM25_INDEX_DIR, help="Index directory")
+args = parser.parse_args()
+
+s_time = time.perf_counter()
+documents = read_export(args.export, args.source_prefix)
+passages = chunk(documents)
+index = BM25Index.build(passages)
+index.save(args.output)
+print(
+    f"Indexed {len(documents)} documents as {len(passages)} passages in "
+    f"{time.perf_counter() - s_time:.1f}s to {args.output}."
+)
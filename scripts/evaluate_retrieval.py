@@ -0,0 +1,46 @@
+"""
+Compare the recall and latency of the Tanya Pajak retrieval modes.
+
+Reads questions with the sources expected among the results, one JSON object per line:
+{"question": "Berapa tarif PPh 21?", "sources": ["gs://bucket/pmk-168-2023.pdf"]}
+An expected source is found when a retrieved document's source ends with it, so file names
+can be given without the bucket. The vertex and hybrid modes need Google Cloud credentials
+and DATA_STORE_ID, the local mode only the index built by `scripts/build_tax_index.py`.
+
+Usage: python -m scripts.evaluate_retrieval questions.jsonl [--modes local,vertex,hybrid]
+    [--k 10]
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from lib.tanya_pajak import MAX_DOCUMENTS, RETRIEVAL_MODES, build_retriever
+
+parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+parser.add_argument("questions", help="JSONL file of questions and expected sources")
+parser.add_argument("--modes", default="local", help=f"Any of {','.join(RETRIEVAL_MODES)}")
+parser.add_argument("--k", type=int, default=MAX_DOCUMENTS, help="Documents considered")
+args = parser.parse_args()
+
+with open(args.questions, encoding="utf-8") as file:
+    questions = [json.loads(line) for line in file if line.strip()]
+
+print(f"{'mode':<8} {'recall@' + str(args.k):>10} {'hit rate':>9} {'mean ms':>9} {'p95 ms':>8}")
+for mode in args.modes.split(","):
+    retriever = build_retriever(mode.strip())
+    recalls, hits, latencies = [], [], []
+    for item in questions:
+        s_time = time.perf_counter()
+        documents = retriever.invoke(item["question"])[: args.k]
+        latencies.append((time.perf_counter() - s_time) * 1000)
+        sources = [document.metadata.get("source", "") for document in documents]
+        found = [any(s.endswith(expected) for s in sources) for expected in item["sources"]]
+        recalls.append(sum(found) / len(found) if found else 1.0)
+        hits.append(any(found))
+    p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+    print(
+        f"{mode:<8} {statistics.mean(recalls):>10.2f} {statistics.mean(hits):>9.2f} "
+        f"{statistics.mean(latencies):>9.2f} {p95:>8.2f}"
+    )
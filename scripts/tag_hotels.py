@@ -0,0 +1,63 @@
+"""
+Tag a catalogue of Jalan hotels in bulk.
+
+Reads hotel IDs or URLs, one per line, and appends one JSON result per hotel to the output
+file as it completes. Rerunning with the same output file skips hotels already tagged.
+
+Usage: python -m scripts.tag_hotels hotels.txt tags.jsonl [--parquet tags.parquet]
+    [--scrape-workers 4] [--gemini-workers 8] [--incremental]
+
+With --incremental, every hotel is scraped again, also when the output file already holds a
+result for it. Only reviews and images not tagged in earlier runs are sent to Gemini and
+merged into the tag state store (TAG_STATE_PATH), and the new result is appended.
+"""
+
+import argparse
+
+from tqdm import tqdm
+
+from lib.hotel_catalogue import (
+    GEMINI_WORKERS, SCRAPE_WORKERS, CatalogueJob, completed_hotels, export_parquet,
+    read_hotel_list
+)
+from lib.tag_state import TagStateStore
+
+parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+parser.add_argument("hotels", help="File with one hotel ID or URL per line")
+parser.add_argument("output", help="JSONL file results are appended to")
+parser.add_argument("--parquet", help="Also export the results to this Parquet file")
+parser.add_argument("--scrape-workers", type=int, default=SCRAPE_WORKERS)
+parser.add_argument("--gemini-workers", type=int, default=GEMINI_WORKERS)
+parser.add_argument(
+    "--incremental", action="store_true", help="Only tag new reviews and images"
+)
+args = parser.parse_args()
+
+hotels = read_hotel_list(args.hotels)
+job = CatalogueJob(
+    args.output,
+    args.scrape_workers,
+    args.gemini_workers,
+    state_store=TagStateStore() if args.incremental else None,
+)
+already_tagged = 0 if args.incremental else len(completed_hotels(args.output) & set(hotels))
+with tqdm(total=len(hotels), initial=already_tagged, unit="hotel") as progress:
+
+    def report(record):
+        """Advances the progress bar and shows the throughput."""
+        progress.update()
+        progress.set_postfix(
+            hotels_per_min=f"{job.throughput():.1f}", errors=job.stats["error"]
+        )
+        if record["status"] != "ok":
+            progress.write(f"{record['hotel_id']}: {record['error']}")
+
+    stats = job.run(hotels, on_result=report)
+
+print(
+    f"Tagged {stats['ok']}, failed {stats['error']}, skipped {stats['skipped']} already "
+    f"tagged, at {job.throughput():.1f} hotels/min."
+)
+if args.parquet:
+    export_parquet(args.output, args.parquet)
+    print(f"Exported results to {args.parquet}.")
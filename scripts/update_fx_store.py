@@ -0,0 +1,27 @@
+"""
+Build or update the local FX rate store.
+
+The first run loads the full ECB history, later runs append the fixings published since the
+last update. Pass a path or URL to reload the history from a downloaded ECB file instead.
+
+Usage: python -m scripts.update_fx_store [path/to/eurofxref-hist.zip]
+"""
+
+import sys
+import time
+
+from lib.fx_store import ECB_HISTORY_URL, FX_STORE_DIR, FxStore, bulk_load, update
+
+s_time = time.perf_counter()
+if len(sys.argv) > 1 or not FxStore.exists(FX_STORE_DIR):
+    bulk_load(sys.argv[1] if len(sys.argv) > 1 else ECB_HISTORY_URL, FX_STORE_DIR)
+    print(f"Loaded the ECB history in {time.perf_counter() - s_time:.1f}s.")
+else:
+    count = update(FX_STORE_DIR)
+    print(f"Added {count} fixings in {time.perf_counter() - s_time:.1f}s.")
+
+store = FxStore(FX_STORE_DIR)
+print(
+    f"{FX_STORE_DIR}: {len(store.currencies)} currencies from {store.start} to {store.end}, "
+    f"{len(store.active_currencies())} still published."
+)